@@ -0,0 +1,74 @@
+"""This is part of PyGameBoy, a Game Boy emulator written in Python 3.
+Source: https://github.com/BoboTiG/PyGameBoy
+
+Reproducible benchmarks, results are machine-readable to compare commits:
+
+    $ PYTHONPATH=src python -m benchmarks --output before.json
+    $ git checkout ...
+    $ PYTHONPATH=src python -m benchmarks --output after.json --compare before.json
+"""
+
+from __future__ import annotations
+
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from timeit import Timer
+from typing import TYPE_CHECKING, Any, NamedTuple
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+__all__ = ("Result", "bench", "compare", "environment")
+
+
+class Result(NamedTuple):
+    """Timings of a benchmark, in seconds per call.
+    *operations* is the work done by a call, like emulated instructions, to compute rates.
+    """
+
+    name: str
+    calls: int
+    best: float
+    median: float
+    operations: int = 1
+
+    @property
+    def rate(self) -> float:
+        """Operations per second, of the best timing."""
+        return self.operations / self.best
+
+
+def bench(name: str, func: Callable[[], object], *, repeat: int = 5, operations: int = 1) -> Result:
+    """Time *func*: calls are grouped to last at least 0.2 second, and that is done
+    *repeat* times. The best timing is the most reproducible one.
+    """
+    timer = Timer(func)
+    calls, _ = timer.autorange()
+    timings = [timing / calls for timing in timer.repeat(repeat=repeat, number=calls)]
+    return Result(name=name, calls=calls, best=min(timings), median=statistics.median(timings), operations=operations)
+
+
+def environment() -> dict[str, Any]:
+    """Details needed to compare results."""
+    try:
+        commit = subprocess.check_output(["git", "rev-parse", "HEAD"], text=True, stderr=subprocess.DEVNULL).strip()  # noqa: S607
+    except (OSError, subprocess.CalledProcessError):
+        commit = ""
+    return {
+        "commit": commit,
+        "date": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "machine": platform.machine(),
+        "python": sys.version.split()[0],
+        "implementation": platform.python_implementation(),
+    }
+
+
+def compare(old: dict[str, Any], new: dict[str, Any]) -> dict[str, float]:
+    """Return the ratio of new to old best timings, by benchmark name (> 1 is slower)."""
+    before = {result["name"]: result["best"] for result in old["results"]}
+    return {
+        result["name"]: result["best"] / before[result["name"]] for result in new["results"] if result["name"] in before
+    }
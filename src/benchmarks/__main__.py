@@ -0,0 +1,50 @@
+"""This is part of PyGameBoy, a Game Boy emulator written in Python 3.
+Source: https://github.com/BoboTiG/PyGameBoy
+"""
+
+import json
+import sys
+from argparse import ArgumentParser
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from benchmarks import cartridge, compare, cpu, environment
+
+SUITES = {
+    "cartridge": cartridge.run,
+    "cpu": cpu.run,
+}
+
+
+def main(args: list[str]) -> int:
+    """Run benchmarks, and print results as JSON."""
+    parser = ArgumentParser(prog="python -m benchmarks")
+    parser.add_argument("suites", nargs="*", help=f"suites to run among {', '.join(SUITES)} (default: all)")
+    parser.add_argument("-o", "--output", type=Path, help="also write results to that file")
+    parser.add_argument("-c", "--compare", type=Path, help="compare with results of a previous run")
+    parser.add_argument("-q", "--quick", action="store_true", help="fewer runs, to check benchmarks work")
+    options = parser.parse_args(args)
+    if unknown := set(options.suites) - set(SUITES):
+        parser.error(f"unknown suites: {', '.join(sorted(unknown))}")
+
+    results = []
+    with TemporaryDirectory() as folder:
+        for suite in options.suites or SUITES:
+            for result in SUITES[suite](Path(folder), quick=options.quick):
+                rate = f" {result.rate:16,.0f} /s" if result.operations > 1 else ""
+                print(f"{result.name:<40} {result.best * 1e6:12.2f} µs{rate}", file=sys.stderr)
+                results.append(result._asdict())
+
+    report = {"environment": environment(), "results": results}
+    if options.compare:
+        report["compare"] = compare(json.loads(options.compare.read_text()), report)
+
+    output = json.dumps(report, indent=2)
+    if options.output:
+        options.output.write_text(output)
+    print(output)
+    return 0
+
+
+if __name__ == "__main__":  # pragma: nocover
+    sys.exit(main(sys.argv[1:]))
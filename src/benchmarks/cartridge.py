@@ -0,0 +1,75 @@
+"""This is part of PyGameBoy, a Game Boy emulator written in Python 3.
+Source: https://github.com/BoboTiG/PyGameBoy
+
+Cartridge loading, parsing, and validation.
+"""
+
+from __future__ import annotations
+
+import random
+from pathlib import Path
+from typing import TYPE_CHECKING
+from zipfile import ZIP_DEFLATED, ZipFile
+
+from benchmarks import Result, bench
+from gameboy import offset
+from gameboy.cartridge import Cartridge
+from gameboy.debug import hexdump
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+
+ROMS = Path(__file__).parent.parent / "tests" / "roms"
+MARIO = ROMS / "Super Mario Land (JUE) (V1.1) [!].gb"
+MARIO_ZIP = ROMS / "Super Mario Land (W) (V1.1).zip"
+
+# Synthetic ROM sizes, in MiB
+SIZES = (1, 2, 4, 8)
+
+
+def synthetic_rom(size: int) -> bytes:
+    """Craft a valid ROM of *size* bytes: the Super Mario Land header followed by
+    reproducible random data, with the global checksum fixed.
+    """
+    data = bytearray(random.Random(size).randbytes(size))  # noqa: S311
+    data[: offset.HEADER.stop] = MARIO.read_bytes()[: offset.HEADER.stop]
+    checksum = (sum(data) - sum(data[offset.GLOBAL_CHECKSUM])) & 0xFFFF
+    data[offset.GLOBAL_CHECKSUM] = checksum.to_bytes(2, "big")
+    return bytes(data)
+
+
+def run(folder: Path, *, quick: bool = False) -> Iterator[Result]:
+    """Run all benchmarks, synthetic ROMs are written into *folder*."""
+    repeat = 1 if quick else 5
+    data = MARIO.read_bytes()
+
+    yield bench("cartridge.init.gb", lambda: Cartridge(MARIO), repeat=repeat)
+    yield bench("cartridge.init.gb.lazy", lambda: Cartridge(MARIO, lazy=True), repeat=repeat)
+    yield bench("cartridge.init.gb.mmap", lambda: Cartridge(MARIO, memory_map=True).close(), repeat=repeat)
+    yield bench("cartridge.init.zip", lambda: Cartridge(MARIO_ZIP), repeat=repeat)
+    yield bench("cartridge.init.bytes", lambda: Cartridge(data), repeat=repeat)
+    yield bench("cartridge.init.str", lambda: Cartridge(str(MARIO)), repeat=repeat)
+
+    yield bench("cartridge.parse", lambda: Cartridge(data).parse(), repeat=repeat)
+    yield bench("cartridge.header_checksum", lambda: Cartridge(data).header_checksum, repeat=repeat)
+    yield bench("cartridge.global_checksum", lambda: Cartridge(data).global_checksum, repeat=repeat)
+    yield bench("debug.hexdump", lambda: hexdump(data[offset.HEADER]), repeat=repeat)
+
+    for size in SIZES[:1] if quick else SIZES:
+        rom = folder / f"synthetic-{size}MiB.gb"
+        rom.write_bytes(synthetic_rom(size * 1024 * 1024))
+        with ZipFile(rom.with_suffix(".zip"), "w", compression=ZIP_DEFLATED) as zfile:
+            zfile.write(rom, rom.name)
+
+        yield bench(f"cartridge.{size}MiB.gb.check", lambda: Cartridge(rom).is_valid(complete=True), repeat=repeat)  # noqa: B023
+        yield bench(
+            f"cartridge.{size}MiB.gb.check.lazy",
+            lambda: Cartridge(rom, lazy=True).is_valid(complete=True),  # noqa: B023
+            repeat=repeat,
+        )
+        yield bench(
+            f"cartridge.{size}MiB.zip.check.lazy",
+            lambda: Cartridge(rom.with_suffix(".zip"), lazy=True).is_valid(complete=True),  # noqa: B023
+            repeat=repeat,
+        )
+        yield bench(f"cartridge.{size}MiB.gb.dump", lambda: Cartridge(rom, lazy=True).parse(), repeat=repeat)  # noqa: B023
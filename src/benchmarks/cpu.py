@@ -0,0 +1,65 @@
+"""This is part of PyGameBoy, a Game Boy emulator written in Python 3.
+Source: https://github.com/BoboTiG/PyGameBoy
+
+CPU throughput, running Blargg's test ROMs headless.
+
+Rates of "cpu.<ROM>" results are emulated instructions per second, and rates of
+"cpu.<ROM>.mcycles" results are emulated M-cycles per second: real-time speed is
+1,048,576 M-cycles per second. "cpu.<ROM>.blocks" results are the same, with compiled
+basic blocks instead of the interpreter.
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from benchmarks import Result, bench
+from gameboy.cartridge import Cartridge
+from gameboy.emulator import CYCLES_PER_FRAME, Emulator
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+
+ROMS = Path(__file__).parent.parent / "tests" / "roms" / "cpu"
+
+# ROMs to run, from the most branchy to the most arithmetic one
+NAMES = ("01-special", "09-op r,r", "10-bit ops")
+
+# Emulated frames per call, 60 frames is about one second
+FRAMES = 60
+
+
+def instructions(emulator: Emulator, frames: int) -> int:
+    """Count instructions executed while running *frames* frames, the slow way."""
+    cpu = emulator.cpu
+    scheduler = emulator.scheduler
+    count = 0
+    until = cpu.cycles + frames * CYCLES_PER_FRAME
+    scheduler.schedule(until, emulator.pause)
+    while cpu.cycles < until:
+        count += not cpu.halted
+        elapsed = cpu.step()
+        cpu.cycles += elapsed
+        if cpu.cycles >= scheduler.deadline:
+            scheduler.run(cpu.cycles)
+    return count
+
+
+def run(folder: Path, *, quick: bool = False) -> Iterator[Result]:  # noqa: ARG001
+    """Run all benchmarks."""
+    repeat = 1 if quick else 5
+    frames = FRAMES // 6 if quick else FRAMES
+    for name in NAMES[:1] if quick else NAMES:
+        data = (ROMS / f"{name}.gb").read_bytes()
+        count = instructions(Emulator(Cartridge(data)), frames)
+        for blocks in (False, True):
+            suffix = ".blocks" if blocks else ""
+            result = bench(
+                f"cpu.{name}{suffix}",
+                lambda: Emulator(Cartridge(data), blocks=blocks).run_frames(frames),  # noqa: B023
+                repeat=repeat,
+                operations=count,
+            )
+            yield result
+            yield result._replace(name=f"cpu.{name}{suffix}.mcycles", operations=frames * CYCLES_PER_FRAME // 4)
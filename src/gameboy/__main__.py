@@ -7,10 +7,13 @@ start when packaged (see https://github.com/pyinstaller/pyinstaller/issues/2560)
 
 import os
 import sys
+from argparse import ArgumentParser
+from collections.abc import Iterator
 from functools import lru_cache
 from os.path import expandvars
 from pathlib import Path
 
+from gameboy import library
 from gameboy.cartridge import Cartridge
 
 
@@ -35,52 +38,163 @@ YELLOW = "\033[33m" if supports_color() else ""
 MAGENTA = "\033[35m" if supports_color() else ""
 
 
+def cartridges(rom: Path) -> Iterator[Cartridge]:
+    """Yield all cartridges of a ROM file, ZIP files may contain several ROMs."""
+    if rom.suffix.lower() == ".zip":
+        yield from Cartridge.iter_zip(rom)
+    else:
+        yield Cartridge(rom, lazy=True)
+
+
 def check(rom: Path) -> int:
     """Check the ROM validity."""
-    cartridge = Cartridge(rom)
-    if not cartridge.is_valid(complete=True):
-        print(f"[{RED}NG{NONE}]", rom.name)
-        return 1
-    print(f"[{GREEN}OK{NONE}]", rom.name)
-    return 0
+    ret = 0
+    for cartridge in cartridges(rom):
+        name = f"{rom.name}:{cartridge.member}" if cartridge.member else rom.name
+        if cartridge.is_valid(complete=True):
+            print(f"[{GREEN}OK{NONE}]", name)
+        else:
+            print(f"[{RED}NG{NONE}]", name)
+            ret = 1
+    return ret
+
+
+def check_folder(folder: Path, index: Path) -> int:
+    """Check the validity of all ROMs of a folder, only new and modified files are read."""
+    library.scan(folder, index)
+    ret = 0
+    for path, member, valid in library.validity(index, folder):
+        name = f"{path}:{member}" if member else path
+        if valid:
+            print(f"[{GREEN}OK{NONE}]", name)
+        else:
+            print(f"[{RED}NG{NONE}]", name)
+            ret = 1
+    return ret
 
 
 def dump(rom: Path) -> int:
     """Print ROM headers."""
-    cartridge = Cartridge(rom)
-    for header, value in cartridge.parse().__dict__.items():
-        # Fancy colors!
-        if isinstance(value, bool):
-            color = GREEN if value else RED
-        elif isinstance(value, (int, float)):
-            color = MAGENTA
-        else:
-            color = YELLOW
+    for idx, cartridge in enumerate(cartridges(rom)):
+        if idx:
+            print()
+        if cartridge.member:
+            print(f"{NONE}{'member'.ljust(16, '.')}{NONE}", f"{YELLOW}{cartridge.member}{NONE}")
+        # Only the header is read, the global checksum is the job of 'check'
+        for header, value in cartridge.parse(complete=False)._asdict().items():
+            # Fancy colors!
+            if value is None:
+                continue
+            if isinstance(value, bool):
+                color = GREEN if value else RED
+            elif isinstance(value, (int, float)):
+                color = MAGENTA
+            else:
+                color = YELLOW
+
+            print(f"{NONE}{header.ljust(16, '.')}{NONE}", f"{color}{value}{NONE}")
+    return 0
+
 
-        print(f"{NONE}{header.ljust(16, '.')}{NONE}", f"{color}{value}{NONE}")
+def run(rom: Path, *args: str) -> int:
+    """Run the ROM without any display, as fast as possible, and print the speed."""
+    # The emulator is loaded only when needed, other actions start faster
+    from gameboy.emulator import headless  # noqa: PLC0415
+
+    parser = ArgumentParser(prog=f"pygameboy {rom} run")
+    parser.add_argument("--frames", type=int, default=0, help="frames to run")
+    parser.add_argument("--cycles", type=int, default=0, help="clock cycles to run, on top of frames")
+    parser.add_argument("--headless", action="store_true", help="no display (the only mode, for now)")
+    parser.add_argument("--sampling", type=int, default=1, help="render one frame out of that many (0: none)")
+    parser.add_argument("--blocks", action="store_true", help="run compiled basic blocks")
+    options = parser.parse_args(args)
+    if not options.frames and not options.cycles:
+        parser.error("--frames, or --cycles, is required")
+
+    report = headless(
+        Cartridge(rom),
+        frames=options.frames,
+        cycles=options.cycles,
+        sampling=options.sampling,
+        blocks=options.blocks,
+    )
+    print(
+        f"{MAGENTA}{report.frames}{NONE} frames in {MAGENTA}{report.seconds:.3f}{NONE} seconds:"
+        f" {GREEN}{report.fps:.1f}{NONE} FPS ({GREEN}{report.speed:.2f}x{NONE})"
+    )
     return 0
 
 
+def scan(folder: Path, index: Path) -> int:
+    """Index all ROMs of a folder."""
+    found, parsed, evicted = library.scan(folder, index)
+    print(
+        f"{MAGENTA}{found}{NONE} files indexed into {GREEN}{index}{NONE}"
+        f" ({MAGENTA}{parsed}{NONE} parsed, {MAGENTA}{evicted}{NONE} evicted)"
+    )
+    return 0
+
+
+def test(path: Path, *args: str) -> int:
+    """Run Blargg's test ROMs (a file, or all of a folder) in a pool of processes, and print their results."""
+    from gameboy import blargg  # noqa: PLC0415
+    from gameboy.emulator import CYCLES_PER_FRAME  # noqa: PLC0415
+
+    parser = ArgumentParser(prog=f"pygameboy {path} test")
+    parser.add_argument("--frames", type=int, default=blargg.BUDGET // CYCLES_PER_FRAME, help="budget of every ROM")
+    parser.add_argument("--workers", type=int, help="processes to use (default: the number of CPUs)")
+    options = parser.parse_args(args)
+
+    files = sorted(path.rglob("*.gb")) if path.is_dir() else [path]
+    ret = 0
+    for result in blargg.run(files, cycles=options.frames * CYCLES_PER_FRAME, workers=options.workers):
+        if result.passed:
+            status = f"{GREEN}OK{NONE}"
+        else:
+            status = f"{RED}NG{NONE}" if result.passed is False else f"{YELLOW}??{NONE}"
+            ret = 1
+        name = Path(result.path).relative_to(path) if path.is_dir() else Path(result.path).name
+        print(
+            f"[{status}]", name, f"({MAGENTA}{result.seconds:.2f}{NONE} s, {result.cycles // CYCLES_PER_FRAME} frames)"
+        )
+    return ret
+
+
 def usage() -> int:
     """Print the usage."""
     print(f"Usage: pygameboy {GREEN}FILE{NONE} [{YELLOW}ACTION{NONE}]")
     print()
     print(f"Possible {YELLOW}ACTION{NONE}:")
-    print(f"  {YELLOW}check{NONE}: check the ROM {GREEN}FILE{NONE} integrity.")
-    print(f"  {YELLOW}dump{NONE} : print ROM {GREEN}FILE{NONE} headers.")
+    print(f"  {YELLOW}check{NONE}: check the ROM {GREEN}FILE{NONE} integrity (all ROMs of a ZIP file).")
+    print(f"         When {GREEN}FILE{NONE} is a folder, its index is used (see {YELLOW}scan{NONE}).")
+    print(f"  {YELLOW}dump{NONE} : print ROM {GREEN}FILE{NONE} headers (all ROMs of a ZIP file).")
+    print(f"  {YELLOW}run{NONE}  : run the ROM {GREEN}FILE{NONE} headless, as fast as possible, and print the speed.")
+    print("         Options: --frames N, --cycles N, --sampling N (render one frame out of N), --blocks.")
+    print(f"  {YELLOW}test{NONE} : run Blargg's test ROM {GREEN}FILE{NONE} (all of a folder) headless, in parallel.")
+    print("         Options: --frames N (budget of every ROM), --workers N.")
+    print(f"  {YELLOW}scan{NONE} : index all ROMs of the {GREEN}FILE{NONE} folder into an SQLite database.")
+    print(f"         The database file can be given as 3rd argument (default: {library.INDEX}).")
     return -1
 
 
-def main(file: Path | str, action: str) -> int:
+def main(file: Path | str, action: str, *args: str) -> int:
     """Entry point."""
     # Resolve shell variables and ~
     rom = Path(expandvars(file)).expanduser()
 
     match action:
+        case "check" if rom.is_dir():
+            return check_folder(rom, Path(args[0] if args else library.INDEX))
         case "check":
             return check(rom)
         case "dump":
             return dump(rom)
+        case "run":
+            return run(rom, *args)
+        case "test":
+            return test(rom, *args)
+        case "scan":
+            return scan(rom, Path(args[0] if args else library.INDEX))
         case _:
             msg = f"Invalid {action =}"
             raise ValueError(msg)
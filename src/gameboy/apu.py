@@ -0,0 +1,407 @@
+"""This is part of PyGameBoy, a Game Boy emulator written in Python 3.
+Source: https://github.com/BoboTiG/PyGameBoy
+
+The APU: two square channels (the first one with a frequency sweep), a wave channel,
+and a noise channel. The frame sequencer clocks length counters, the sweep, and volume
+envelopes at 512 Hz, on falling edges of bit 4 of DIV: its steps are events of the scheduler.
+
+Samples are not produced one by one: the state of each channel (volume, waveform, and
+period) is logged along with the clock cycle it changed at, and whole buffers of samples
+are synthesized at once with NumPy, at the requested sample rate.
+"""
+
+from __future__ import annotations
+
+import math
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from . import offset
+from .cpu import FREQUENCY
+
+if TYPE_CHECKING:
+    from .cpu import CPU
+    from .scheduler import Scheduler
+    from .timer import Timer
+
+__all__ = ("APU",)
+
+# Clock cycles between two steps of the frame sequencer
+SEQUENCER_CYCLES = 0x2000
+
+# Bits always read as 1, from NR10 to NR52
+MASKS = bytes.fromhex("803f00ffbfff3f00ffbf7fff9fffbfffff0000bf000070")
+
+# Square waveforms, by duty cycle
+DUTIES = np.array(
+    [
+        [0, 0, 0, 0, 0, 0, 0, 1],
+        [1, 0, 0, 0, 0, 0, 0, 1],
+        [1, 0, 0, 0, 0, 1, 1, 1],
+        [0, 1, 1, 1, 1, 1, 1, 0],
+    ],
+    dtype=np.uint8,
+)
+
+# Clock cycles between two shifts of the noise LFSR, by divisor code (before the shift of NR43)
+DIVISORS = (8, 16, 32, 48, 64, 80, 96, 112)
+
+
+def lfsr(width: int) -> np.ndarray:
+    """Output bits of the noise channel, from the reset of its *width*-bit LFSR, over a whole period."""
+    state = (1 << width) - 1
+    bits = []
+    for _ in range(state):
+        bits.append(~state & 1)
+        feedback = (state ^ state >> 1) & 1
+        state = state >> 1 | feedback << (width - 1)
+    return np.array(bits, dtype=np.uint8)
+
+
+# Noise waveforms, by width mode: 15 bits, and 7 bits
+NOISE = (lfsr(15), lfsr(7))
+
+# Phases of channels are kept modulo a multiple of all waveform lengths
+PHASES = 32 * len(NOISE[0]) * len(NOISE[1])
+
+# A state of a channel: since that clock cycle, the volume, the waveform, clock cycles per waveform step,
+# and whether the waveform restarts
+State = tuple[int, int, int, float, bool]
+
+
+class Channel:
+    """The state of a sound channel, besides its registers."""
+
+    __slots__ = ("dac", "enabled", "length", "length_enabled", "maximum", "timer", "volume")
+
+    def __init__(self, maximum: int) -> None:
+        self.maximum = maximum  # The length counter is loaded with *maximum* minus the written length
+        self.length = 0
+        self.length_enabled = False
+        self.enabled = False
+        self.dac = False
+        self.volume = 0
+        self.timer = 0  # Of the volume envelope
+
+
+class APU:
+    """Sound registers, the wave RAM, and sound channels.
+    Samples are synthesized at *sample_rate*, stereo and 16-bit, unless it is zero: only registers are emulated then.
+    """
+
+    def __init__(self, cpu: CPU, scheduler: Scheduler, timer: Timer, sample_rate: int = 0) -> None:
+        self.cpu = cpu
+        self.scheduler = scheduler
+        self.timer = timer
+        self.sample_rate = sample_rate
+
+        self.registers = bytearray(len(MASKS))
+        self.wave = bytearray(offset.WAVE.stop - offset.WAVE.start)
+        self.channels = (Channel(64), Channel(64), Channel(256), Channel(64))
+        self.step = 0  # The next step of the frame sequencer
+
+        # The frequency sweep of channel 1
+        self.shadow = 0
+        self.sweep_timer = 0
+        self.sweep_enabled = False
+        self.negated = False  # A decreasing frequency was computed since the last trigger
+
+        # States of channels, and of the mixer (NR50 and NR51), not synthesized yet
+        self.clock = 0.0  # The next sample
+        self.states: list[list[State]] = []
+        self.phases: list[float] = []
+        self.mixes: list[tuple[int, int, int]] = []
+        self.buffer: list[np.ndarray] = []
+        self.resync(cpu.cycles)
+
+        # Sound on, as left by the DMG boot ROM (the envelope of its sound is over)
+        self.power(on=True)
+        self.registers[offset.NR11 - offset.NR10] = 0x80
+        self.registers[offset.NR12 - offset.NR10] = 0xF3
+        self.registers[offset.NR50 - offset.NR10] = 0x77
+        self.registers[offset.NR51 - offset.NR10] = 0xF3
+        self.channels[0].enabled = self.channels[0].dac = True
+        self.record(cpu.cycles)
+
+    @property
+    def powered(self) -> bool:
+        return bool(self.registers[offset.NR52 - offset.NR10])
+
+    def read(self, address: int) -> int:
+        """Read a register, or the wave RAM."""
+        if address >= offset.WAVE.start:
+            return self.wave[address - offset.WAVE.start]
+        index = address - offset.NR10
+        if address == offset.NR52:
+            status = sum(channel.enabled << number for number, channel in enumerate(self.channels))
+            return self.registers[index] | MASKS[index] | status
+        return self.registers[index] | MASKS[index] if index < len(MASKS) else 0xFF
+
+    def write(self, address: int, value: int) -> None:
+        """Write a register, or the wave RAM."""
+        if address >= offset.WAVE.start:
+            if self.sample_rate:
+                self.synthesize(self.cpu.cycles)
+            self.wave[address - offset.WAVE.start] = value
+            return
+        index = address - offset.NR10
+        if index >= len(MASKS):
+            return
+        if address == offset.NR52:
+            self.power(on=bool(value & 0x80))
+        elif self.powered:
+            self.registers[index] = value
+            if index < offset.NR50 - offset.NR10:
+                self.write_channel(*divmod(index, 5), value)
+        elif address in {offset.NR11, offset.NR21, offset.NR31, offset.NR41}:
+            # Length counters are writable while the sound is off
+            channel = self.channels[index // 5]
+            channel.length = channel.maximum - (value & (channel.maximum - 1))
+        self.record(self.cpu.cycles)
+
+    def write_channel(self, number: int, register: int, value: int) -> None:
+        """Write the *register* (0 for NRx0, to 4 for NRx4) of the channel *number*."""
+        channel = self.channels[number]
+        match register:
+            case 0:
+                if number == 0 and self.negated and not value & 0x08:
+                    # Back to an increasing frequency, after a decreasing one was computed
+                    channel.enabled = False
+                elif number == 2:
+                    channel.dac = bool(value & 0x80)
+                    channel.enabled &= channel.dac
+            case 1:
+                channel.length = channel.maximum - (value & (channel.maximum - 1))
+            case 2:
+                if number != 2:
+                    channel.dac = bool(value & 0xF8)
+                    channel.enabled &= channel.dac
+            case 4:
+                self.control(number, value)
+
+    def control(self, number: int, value: int) -> None:
+        """Write NRx4 of the channel *number*: the length counter enabling, and the trigger.
+        In the first half of a length period, enabling the length counter clocks it.
+        """
+        channel = self.channels[number]
+        first_half = self.step & 1
+        trigger = value & 0x80
+        if first_half and value & 0x40 and not channel.length_enabled and channel.length:
+            channel.length -= 1
+            if not channel.length and not trigger:
+                channel.enabled = False
+        channel.length_enabled = bool(value & 0x40)
+        if not trigger:
+            return
+
+        if not channel.length:
+            channel.length = channel.maximum - (1 if channel.length_enabled and first_half else 0)
+        channel.enabled = channel.dac
+        envelope = self.registers[number * 5 + 2]
+        channel.volume = envelope >> 4
+        channel.timer = envelope & 0x07 or 8
+        if number == 0:
+            self.trigger_sweep()
+        self.record(self.cpu.cycles, restart=number)
+
+    def frequency(self, number: int) -> int:
+        """The 11-bit frequency register of the channel *number*."""
+        return self.registers[number * 5 + 3] | (self.registers[number * 5 + 4] & 0x07) << 8
+
+    def trigger_sweep(self) -> None:
+        """Channel 1 was triggered: the sweep restarts, and checks for an overflow right away."""
+        nr10 = self.registers[0]
+        period = nr10 >> 4 & 0x07
+        self.shadow = self.frequency(0)
+        self.sweep_timer = period or 8
+        self.sweep_enabled = bool(nr10 & 0x77)
+        self.negated = False
+        if nr10 & 0x07:
+            self.sweep()
+
+    def sweep(self) -> int:
+        """The next frequency of channel 1, the channel is disabled if it overflows."""
+        nr10 = self.registers[0]
+        delta = self.shadow >> (nr10 & 0x07)
+        if nr10 & 0x08:
+            self.negated = True
+            frequency = self.shadow - delta
+        else:
+            frequency = self.shadow + delta
+        if frequency > 0x7FF:
+            self.channels[0].enabled = False
+        return frequency
+
+    def clock_sweep(self) -> None:
+        """Clock the frequency sweep of channel 1."""
+        self.sweep_timer -= 1
+        if self.sweep_timer:
+            return
+        nr10 = self.registers[0]
+        period = nr10 >> 4 & 0x07
+        self.sweep_timer = period or 8
+        if not self.sweep_enabled or not period:
+            return
+        frequency = self.sweep()
+        if frequency <= 0x7FF and nr10 & 0x07:
+            self.shadow = frequency
+            self.registers[3] = frequency & 0xFF
+            self.registers[4] = (self.registers[4] & 0xF8) | frequency >> 8
+            self.sweep()
+
+    def clock_envelopes(self) -> None:
+        """Clock volume envelopes."""
+        for number in (0, 1, 3):
+            channel = self.channels[number]
+            envelope = self.registers[number * 5 + 2]
+            if not envelope & 0x07:
+                continue
+            channel.timer -= 1
+            if channel.timer:
+                continue
+            channel.timer = envelope & 0x07
+            if envelope & 0x08:
+                channel.volume = min(15, channel.volume + 1)
+            else:
+                channel.volume = max(0, channel.volume - 1)
+
+    def sequence(self, cycle: int) -> None:
+        """A step of the frame sequencer: length counters on even steps, the sweep on steps 2 and 6,
+        and volume envelopes on step 7.
+        """
+        step = self.step
+        self.step = (step + 1) & 7
+        if not step & 1:
+            for channel in self.channels:
+                if channel.length_enabled and channel.length:
+                    channel.length -= 1
+                    channel.enabled &= channel.length > 0
+            if step & 2:
+                self.clock_sweep()
+        elif step == 7:
+            self.clock_envelopes()
+        self.record(cycle)
+        self.scheduler.schedule(cycle + SEQUENCER_CYCLES, self.sequence)
+
+    def power(self, *, on: bool) -> None:
+        """Turn the sound on, or off: registers are cleared, as if zero was written to each of them."""
+        if on == self.powered:
+            return
+        if on:
+            self.registers[offset.NR52 - offset.NR10] = 0x80
+            self.step = 0
+            now = self.cpu.cycles
+            self.scheduler.schedule(now + SEQUENCER_CYCLES - (self.timer.counter & 0x1FFF), self.sequence)
+            return
+        self.registers[:] = bytes(len(self.registers))
+        for channel in self.channels:
+            channel.enabled = channel.dac = channel.length_enabled = False
+            channel.length = channel.maximum
+            channel.volume = 0
+        self.negated = self.sweep_enabled = False
+        self.scheduler.cancel(self.sequence)
+
+    def reset_div(self) -> None:
+        """DIV is written, and the timer counter reset: the frame sequencer steps if bit 4 of DIV falls."""
+        if not self.powered:
+            return
+        now = self.cpu.cycles
+        if self.timer.counter & 0x1000:
+            self.sequence(now)
+        else:
+            self.scheduler.schedule(now + SEQUENCER_CYCLES, self.sequence)
+
+    def resync(self, cycle: int) -> None:
+        """Forget states not synthesized yet, and samples not read: synthesis starts over at *cycle*."""
+        self.clock = float(cycle)
+        self.states = [[(cycle, 0, 0, math.inf, True)] for _ in self.channels]
+        self.phases = [0.0] * len(self.channels)
+        self.mixes = [(cycle, 0, 0)]
+        self.buffer.clear()
+
+    def record(self, cycle: int, restart: int = -1) -> None:
+        """Log states of channels that changed at *cycle*, the channel *restart* was triggered."""
+        if not self.sample_rate:
+            return
+        registers = self.registers
+        for number, (channel, states) in enumerate(zip(self.channels, self.states, strict=True)):
+            volume = channel.volume if channel.enabled else 0
+            if number == 2:
+                state = (registers[12] >> 5 & 0x03 if channel.enabled else 0, 0, (2048 - self.frequency(2)) * 2.0)
+            elif number == 3:
+                nr43 = registers[18]
+                period = float(DIVISORS[nr43 & 0x07] << (nr43 >> 4)) if nr43 >> 4 < 14 else math.inf
+                state = (volume, nr43 >> 3 & 0x01, period)
+            else:
+                state = (volume, registers[number * 5 + 1] >> 6, (2048 - self.frequency(number)) * 4.0)
+            if number == restart or states[-1][1:4] != state:
+                states.append((cycle, *state, number == restart))
+        mix = (registers[offset.NR50 - offset.NR10], registers[offset.NR51 - offset.NR10])
+        if self.mixes[-1][1:] != mix:
+            self.mixes.append((cycle, *mix))
+
+    def levels(self, number: int, times: np.ndarray, until: int) -> np.ndarray:
+        """Output levels (0 to 15) of the channel *number* at *times*, from its states logged until *until*."""
+        states = self.states[number]
+        cycles = np.array([state[0] for state in states], dtype=np.float64)
+        volumes = np.array([state[1] for state in states], dtype=np.intp)
+        waveforms = np.array([state[2] for state in states], dtype=np.intp)
+        periods = np.array([state[3] for state in states], dtype=np.float64)
+
+        # Phases, in waveform steps, at every change of state
+        phases = np.empty(len(states))
+        phase = self.phases[number]
+        previous = states[0]
+        for index, state in enumerate(states):
+            if state[4]:
+                phase = 0.0
+            elif index:
+                phase += (state[0] - previous[0]) / previous[3]
+            phases[index] = phase
+            previous = state
+        self.phases[number] = (phase + (until - previous[0]) / previous[3]) % PHASES
+        self.states[number] = [(until, *previous[1:4], False)]
+
+        change = np.searchsorted(cycles, times, side="right") - 1
+        steps = (phases[change] + (times - cycles[change]) / periods[change]).astype(np.int64)
+        volume = volumes[change]
+        waveform = waveforms[change]
+        if number == 2:
+            samples = np.frombuffer(self.wave, dtype=np.uint8)
+            samples = np.stack((samples >> 4, samples & 0x0F), axis=1).ravel()
+            return np.where(volume > 0, samples[steps & 31] >> np.maximum(volume - 1, 0), 0)
+        if number == 3:
+            return np.where(waveform, NOISE[1][steps % len(NOISE[1])], NOISE[0][steps % len(NOISE[0])]) * volume
+        return DUTIES[waveform, steps & 7] * volume
+
+    def synthesize(self, until: int) -> None:
+        """Synthesize samples up to the clock cycle *until*."""
+        period = FREQUENCY / self.sample_rate
+        count = max(0, math.ceil((until - self.clock) / period))
+        times = self.clock + np.arange(count) * period
+        self.clock += count * period
+
+        mixes = np.array(self.mixes)
+        mix = np.searchsorted(mixes[:, 0], times, side="right") - 1
+        nr50, nr51 = mixes[mix, 1], mixes[mix, 2]
+        self.mixes = [(until, *self.mixes[-1][1:])]
+        left = np.zeros(count)
+        right = np.zeros(count)
+        for number in range(len(self.channels)):
+            levels = self.levels(number, times, until) / 15
+            left += np.where(nr51 >> (number + 4) & 1, levels, 0)
+            right += np.where(nr51 >> number & 1, levels, 0)
+
+        # Four channels, and eight master volume levels
+        left *= ((nr50 >> 4 & 0x07) + 1) / 32
+        right *= ((nr50 & 0x07) + 1) / 32
+        self.buffer.append((np.stack((left, right), axis=1) * 0x7FFF).astype(np.int16))
+
+    def samples(self) -> np.ndarray:
+        """Samples synthesized since the last call, as an array of (left, right) pairs."""
+        if self.sample_rate:
+            self.synthesize(self.cpu.cycles)
+        samples = np.concatenate(self.buffer) if self.buffer else np.zeros((0, 2), dtype=np.int16)
+        self.buffer.clear()
+        return samples
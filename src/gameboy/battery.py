@@ -0,0 +1,131 @@
+"""This is part of PyGameBoy, a Game Boy emulator written in Python 3.
+Source: https://github.com/BoboTiG/PyGameBoy
+
+Battery-backed cartridge RAM: the RAM is a memory-mapped save file, the emulated code
+writes it through the page tables, with no overhead at all.
+
+Flushing writes modified pages back to the file, and only them: they are found by
+comparing the RAM with a copy taken at the last flush, page by page, with NumPy.
+Flushes happen every few emulated seconds (an event of the scheduler), and on close.
+
+The real time clock of MBC3 cartridges is stored after the RAM, in the 48-byte format
+of most emulators: current, and latched, registers as 32-bit integers, and the UNIX
+time of the save. The clock keeps running while the emulator does not.
+"""
+
+from __future__ import annotations
+
+import mmap
+import struct
+import time
+from contextlib import suppress
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from .cpu import FREQUENCY
+from .memory import PAGE_SIZE
+
+if TYPE_CHECKING:
+    from .cartridge import Cartridge
+    from .mbc import RTC
+    from .mmu import MMU
+
+__all__ = ("Battery",)
+
+# Clock cycles between two flushes
+FLUSH_CYCLES = 5 * FREQUENCY
+
+# Current registers, latched ones, and the UNIX time
+RTC_FORMAT = struct.Struct("<10IQ")
+
+
+def clock_state(rtc: RTC) -> tuple[object, ...]:
+    """What the clock was set to, it changes only when the emulated code writes it."""
+    return rtc.cycles, rtc.origin, rtc.halted, rtc.carry, rtc.latched
+
+
+class Battery:
+    """The cartridge RAM (and clock) of the *cartridge*, persisted in the save file at *path*."""
+
+    def __init__(self, cartridge: Cartridge, mmu: MMU, path: Path | str, *, interval: int = FLUSH_CYCLES) -> None:
+        self.mmu = mmu
+        self.path = Path(path)
+        self.interval = interval
+        mbc = mmu.mbc
+        self.rtc: RTC | None = getattr(mbc, "rtc", None) if "TIMER" in cartridge.type else None
+
+        # The file is extended as needed, a new one is filled with zeros
+        self.size = len(mbc.ram)
+        total = self.size + (RTC_FORMAT.size if self.rtc else 0)
+        self.path.touch()
+        with self.path.open("r+b") as file:
+            if self.path.stat().st_size < total:
+                file.truncate(total)
+            self.map = mmap.mmap(file.fileno(), total)
+        self.ram = memoryview(self.map)[: self.size]
+        self.saved = np.array(self.ram, dtype=np.uint8)
+        mbc.attach_ram(self.ram)
+        mbc.map_ram()
+
+        self.closed = False
+        self.clock: tuple[object, ...] = ()
+        if self.rtc:
+            self.load_clock(self.rtc)
+        mmu.scheduler.schedule(mmu.cpu.cycles + interval, self.tick)
+
+    def load_clock(self, rtc: RTC) -> None:
+        """Set the clock from the save file, plus the time elapsed since then (unless halted)."""
+        *registers, timestamp = RTC_FORMAT.unpack_from(self.map, self.size)
+        if timestamp:
+            seconds, minutes, hours, days_low, days_high = (value & 0xFF for value in registers[:5])
+            rtc.halted = bool(days_high & 0x40)
+            rtc.carry = bool(days_high & 0x80)
+            rtc.set(seconds, minutes, hours, (days_high & 0x01) << 8 | days_low)
+            rtc.latched = bytes(value & 0xFF for value in registers[5:])
+            if not rtc.halted:
+                rtc.cycles += max(0, int(time.time()) - timestamp) * FREQUENCY
+        self.clock = clock_state(rtc)
+
+    def tick(self, cycle: int) -> None:
+        """Time to flush."""
+        self.flush()
+        self.mmu.scheduler.schedule(cycle + self.interval, self.tick)
+
+    def flush(self, *, clock: bool = False) -> int:
+        """Write pages modified since the last flush back to the save file, and return how many there were.
+        The clock is written when it was set, or with *clock*.
+        """
+        ram = np.frombuffer(self.ram, dtype=np.uint8).reshape(-1, PAGE_SIZE)
+        saved = self.saved.reshape(-1, PAGE_SIZE)
+        dirty = np.flatnonzero((ram != saved).any(axis=1))
+        saved[dirty] = ram[dirty]
+        offsets = {int(page) * PAGE_SIZE // mmap.PAGESIZE * mmap.PAGESIZE for page in dirty}
+
+        if (rtc := self.rtc) and (clock or clock_state(rtc) != self.clock):
+            RTC_FORMAT.pack_into(self.map, self.size, *rtc.registers(), *rtc.latched, int(time.time()))
+            self.clock = clock_state(rtc)
+            offsets.add(self.size // mmap.PAGESIZE * mmap.PAGESIZE)
+
+        for start in sorted(offsets):
+            self.map.flush(start, min(mmap.PAGESIZE, len(self.map) - start))
+        return len(dirty)
+
+    def close(self) -> None:
+        """Write everything back, the clock included, and release the save file.
+        The emulator keeps running on a copy of the RAM, not persisted anymore.
+        """
+        if self.closed:
+            return
+        self.closed = True
+        self.flush(clock=True)
+        self.mmu.scheduler.cancel(self.tick)
+
+        mbc = self.mmu.mbc
+        mbc.attach_ram(bytearray(self.ram))
+        mbc.map_ram()
+        self.ram.release()
+        # Views still held elsewhere keep the mapping alive, it is released along with them
+        with suppress(BufferError):
+            self.map.close()
@@ -0,0 +1,110 @@
+"""This is part of PyGameBoy, a Game Boy emulator written in Python 3.
+Source: https://github.com/BoboTiG/PyGameBoy
+
+A harness running Blargg's test ROMs headless, in a pool of processes.
+
+Test ROMs print their output through the serial port, and end it with "Passed" or
+"Failed". Some of them (sound, and OAM bug tests) only write it to the cartridge RAM,
+at A000h: a status byte (80h while running, 0 on success), the DE B0 61 signature,
+and the text.
+"""
+
+from __future__ import annotations
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from time import perf_counter
+from typing import TYPE_CHECKING, NamedTuple
+
+from .cartridge import Cartridge
+from .emulator import CYCLES_PER_FRAME, Emulator
+from .exceptions import EmulationError
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Iterator
+
+__all__ = ("Result", "run", "run_rom")
+
+# The emulated time given to a ROM, by default: one minute
+BUDGET = 3600 * CYCLES_PER_FRAME
+# Results are checked every that many frames
+FRAMES = 10
+# Results written to the cartridge RAM, after the status byte
+SIGNATURE = b"\xde\xb0\x61"
+RUNNING = 0x80
+
+
+class Result(NamedTuple):
+    """The outcome of a test ROM."""
+
+    path: str
+    passed: bool | None  # None when the ROM did not end within its budget
+    output: str  # Text printed by the ROM
+    cycles: int  # Clock cycles emulated
+    seconds: float  # Wall-clock time
+
+
+def outcome(emulator: Emulator) -> tuple[bool | None, str]:
+    """The verdict of the ROM running in *emulator* so far, and its output."""
+    output = emulator.serial.decode(errors="replace")
+    if "Passed" in output:
+        return True, output
+    if "Failed" in output:
+        return False, output
+
+    ram = emulator.mmu.mbc.ram
+    if len(ram) > 4 and bytes(ram[1:4]) == SIGNATURE:
+        text = bytes(ram[4:]).split(b"\0", 1)[0].decode(errors="replace")
+        if ram[0] != RUNNING:
+            return ram[0] == 0, text
+        output = text
+    return None, output
+
+
+def run_rom(file: Path | str, *, cycles: int = BUDGET, blocks: bool = True) -> Result:
+    """Run the test ROM *file* until it reports a result, or for at most *cycles* clock cycles.
+    Invalid ROMs, and emulation errors, are failures.
+    """
+    start = perf_counter()
+    cartridge = Cartridge(file)
+    if not cartridge.is_valid():
+        return Result(str(file), passed=False, output="Invalid ROM header", cycles=0, seconds=perf_counter() - start)
+
+    passed, output, elapsed = None, "", 0
+    try:
+        emulator = Emulator(cartridge, blocks=blocks)
+        cpu = emulator.cpu
+        origin = cpu.cycles
+        while elapsed < cycles:
+            emulator.run(min(FRAMES * CYCLES_PER_FRAME, cycles - elapsed))
+            elapsed = cpu.cycles - origin
+            passed, output = outcome(emulator)
+            if passed is not None:
+                break
+    except EmulationError as error:
+        passed, output = False, f"{output}{error}"
+    return Result(str(file), passed, output, elapsed, perf_counter() - start)
+
+
+def run(
+    files: Iterable[Path | str],
+    *,
+    cycles: int = BUDGET,
+    blocks: bool = True,
+    workers: int | None = None,
+) -> Iterator[Result]:
+    """Run test ROM *files* using a pool of *workers* processes (defaults to the number of CPUs),
+    and yield their results in the same order.
+    """
+    jobs = [Path(file) for file in files]
+    workers = min(len(jobs), workers or os.cpu_count() or 1)
+    if workers <= 1:
+        for file in jobs:
+            yield run_rom(file, cycles=cycles, blocks=blocks)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(run_rom, file, cycles=cycles, blocks=blocks) for file in jobs]
+        for future in futures:
+            yield future.result()
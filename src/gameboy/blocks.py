@@ -0,0 +1,251 @@
+"""This is part of PyGameBoy, a Game Boy emulator written in Python 3.
+Source: https://github.com/BoboTiG/PyGameBoy
+
+Basic blocks translation: straight-line runs of instructions of the cartridge ROM
+are compiled into a single Python function, built from the same templates as the
+interpreter dispatch tables. Immediate operands become constants, and there is no
+decoding nor dispatching left between instructions of a block.
+
+ROM blocks are cached by bank and address, and are valid forever. Work RAM blocks
+are dropped as soon as their code is overwritten, and code running from other RAMs
+is always interpreted.
+
+A block ends on branches (and HALT, STOP, EI), on writes to MBC registers at a
+constant address, or at the end of a ROM bank. Writes through a register pair are
+checked at run time: the block is left right after the ones to MBC registers.
+
+Interrupts are checked between blocks, and memory accesses of a block see the clock
+as it was at the start of the block: that is why instructions accessing I/O registers
+at a constant address are alone in their block (LDH, and the like).
+"""
+
+from __future__ import annotations
+
+import re
+from collections.abc import Callable
+from typing import TYPE_CHECKING
+
+from .cpu import CB_INSTRUCTIONS, INSTRUCTIONS
+
+if TYPE_CHECKING:
+    from .cpu import CPU, Instruction
+    from .mmu import MMU
+
+__all__ = ("BlockCache",)
+
+# A compiled block: it executes all instructions, and returns elapsed cycles
+Block = Callable[["CPU"], int]
+
+# Blocks are cached with their cycles, at worst
+Entry = tuple[Block, int]
+
+# Instructions per block, at most
+MAX_INSTRUCTIONS = 64
+
+# The MMU watches writes to work RAM pages holding compiled code, and blocks are
+# invalidated by chunks of 64 bytes: chunks overwritten that many times are considered
+# as data, they are not compiled anymore
+CHUNK_SHIFT = 6
+CHUNK_SIZE = 1 << CHUNK_SHIFT
+MAX_INVALIDATIONS = 8
+
+# Opcodes of instructions writing to a constant address: LD (nn),A and LD (nn),SP
+WRITES_NN = {0xEA, 0x08}
+
+# High registers of the address written by other instructions: LD (BC),A and LD (DE),A,
+# the ones writing through HL are found by their code
+WRITES_RR = {0x02: "b", 0x12: "d"}
+
+# Cycles of the longest instruction
+LONGEST = 24
+
+
+def accesses_io(opcode: int, operand: int) -> bool:
+    """Return True when the instruction may access an I/O register (IE included)."""
+    if opcode in {0xE2, 0xF2}:
+        # LD (C),A and LD A,(C)
+        return True
+    if opcode in {0xE0, 0xF0}:
+        # LDH (n),A and LDH A,(n)
+        return operand < 0x80 or operand == 0xFF
+    if opcode in {0xEA, 0xFA}:
+        # LD (nn),A and LD A,(nn)
+        return operand >= 0xFF00 and not 0xFF80 <= operand < 0xFFFF
+    return False
+
+
+def worst_cycles(instruction: Instruction) -> int:
+    """Cycles of a branch *instruction*, at worst: EI and HALT may execute one more instruction."""
+    cycles = max((int(value) for value in re.findall(r"return (\d+)", instruction.code)), default=instruction.cycles)
+    return cycles + LONGEST if "return 4 + cpu." in instruction.code else cycles
+
+
+class BlockCache:
+    """Compiled blocks of the cartridge ROM by bank and address, and of the work RAM.
+    The cache of the fixed bank and the one of the switchable bank are kept at hand,
+    the memory bank controller tells when banks change, and the MMU when a work RAM
+    page holding compiled code is written.
+    """
+
+    def __init__(self, cpu: CPU, mmu: MMU) -> None:
+        self.cpu = cpu
+        self.mmu = mmu
+        self.banks: dict[int, dict[int, Entry]] = {}
+        self.fixed = self.banks.setdefault(mmu.mbc.low_bank, {})
+        self.switchable = self.banks.setdefault(mmu.mbc.rom_bank, {})
+
+        # Work RAM blocks, the chunks they span, and how many times chunks were overwritten
+        self.wram: dict[int, Entry] = {}
+        self.chunks: dict[int, list[int]] = {}
+        self.invalidations = bytearray(len(mmu.wram) >> CHUNK_SHIFT)
+
+        mmu.blocks = self
+
+    def __len__(self) -> int:
+        return len(self.wram) + sum(len(blocks) for blocks in self.banks.values())
+
+    def switch(self, bank: int, *, fixed: int = 0) -> None:
+        """ROM banks changed: the switchable *bank*, and the *fixed* one (only MBC1 may change it)."""
+        self.fixed = self.banks.setdefault(fixed, {})
+        self.switchable = self.banks.setdefault(bank, {})
+
+    def invalidate(self, offset: int) -> None:
+        """The work RAM was written at *offset*, forget blocks spanning its chunk."""
+        chunk = offset >> CHUNK_SHIFT
+        if (addresses := self.chunks.pop(chunk, None)) is None:
+            return
+        for address in addresses:
+            self.wram.pop(address, None)
+        if self.invalidations[chunk] < MAX_INVALIDATIONS:
+            self.invalidations[chunk] += 1
+        # Chunks of the page without any code left
+        first = (offset >> 8) << (8 - CHUNK_SHIFT)
+        if not any(chunk in self.chunks for chunk in range(first, first + (1 << (8 - CHUNK_SHIFT)))):
+            self.mmu.unwatch(offset >> 8)
+
+    def forget_wram(self) -> None:
+        """The whole work RAM was replaced (a state was loaded), forget all its blocks."""
+        for page in {chunk >> (8 - CHUNK_SHIFT) for chunk in self.chunks}:
+            self.mmu.unwatch(page)
+        self.wram.clear()
+        self.chunks.clear()
+
+    def step(self) -> int:
+        """Execute one block, or one instruction, and return elapsed cycles."""
+        cpu = self.cpu
+        if cpu.halted or cpu.interrupt_enable & cpu.interrupt_flag & 0x1F:
+            return cpu.step()
+        pc = cpu.pc
+        if pc < 0x4000:
+            blocks = self.fixed
+        elif pc < 0x8000:
+            blocks = self.switchable
+        elif 0xC000 <= pc < 0xE000:
+            blocks = self.wram
+        else:
+            return cpu.step()
+        block, cycles = blocks.get(pc) or self.translate(pc, blocks)
+        if cpu.cycles + cycles > self.mmu.scheduler.deadline:
+            # The block may run past the next event, instructions are interpreted up to it
+            return cpu.step()
+        return block(cpu)
+
+    def translate(self, address: int, blocks: dict[int, Entry]) -> Entry:
+        """Compile the block starting at *address*, and cache it into *blocks*.
+        When there is no block to compile (illegal opcode, or code overwritten too often),
+        the instruction is interpreted.
+        """
+        wram = blocks is self.wram
+        source, end, cycles = self.source(address, wram=wram)
+        if not source:
+            block: Block = type(self.cpu).step
+        else:
+            bank = self.mmu.mbc.low_bank if address < 0x4000 else self.mmu.mbc.rom_bank
+            namespace: dict[str, Block] = {}
+            exec(compile(source, f"<block {bank:02X}:{address:04X}>", "exec"), namespace)  # noqa: S102
+            block = namespace["block"]
+        if wram:
+            for chunk in range((address - 0xC000) >> CHUNK_SHIFT, ((end - 1 - 0xC000) >> CHUNK_SHIFT) + 1):
+                self.chunks.setdefault(chunk, []).append(address)
+            for page in range((address - 0xC000) >> 8, ((end - 1 - 0xC000) >> 8) + 1):
+                self.mmu.watch(page, self.invalidate)
+        blocks[address] = entry = block, cycles
+        return entry
+
+    def end(self, address: int, *, wram: bool) -> int:
+        """Return the address where a block starting at *address* must end at the latest,
+        or 0 when it is in a work RAM chunk considered as data.
+        """
+        if not wram:
+            return 0x4000 if address < 0x4000 else 0x8000
+        end = 0xE000
+        for chunk, count in enumerate(self.invalidations):
+            if count < MAX_INVALIDATIONS:
+                continue
+            start = 0xC000 + (chunk << CHUNK_SHIFT)
+            if start <= address < start + CHUNK_SIZE:
+                return 0
+            if address < start < end:
+                end = start
+        return end
+
+    def source(self, address: int, *, wram: bool = False) -> tuple[str, int, int]:  # noqa: C901
+        """Generate the source code of the block starting at *address*, and return it
+        with the address following the block, and its cycles at worst.
+        """
+        read = self.mmu.read
+        if not (end := self.end(address, wram=wram)):
+            return "", address + 1, 0
+
+        lines: list[str] = []
+        cycles = 0
+        for _ in range(MAX_INSTRUCTIONS):
+            opcode = read(address)
+            instruction = INSTRUCTIONS[opcode]
+            if not instruction or address + instruction.length > end:
+                break
+            operand = sum(read(address + idx) << (8 * idx - 8) for idx in range(1, instruction.length))
+            if opcode == 0xCB:
+                instruction = CB_INSTRUCTIONS[operand]
+            io = accesses_io(opcode, operand)
+            if io and lines:
+                # It will start the next block
+                break
+
+            lines.append(f"# {address:04X}: {instruction.mnemonic}")
+            if instruction.operand:
+                value = operand - 256 if instruction.operand == "e" and operand > 127 else operand
+                lines.append(f"{instruction.operand} = {value}")
+            address += instruction.length
+
+            if instruction.branch:
+                # The instruction may need the PC, it must be up-to-date
+                lines.append(f"cpu.pc = {address}")
+                code = instruction.code
+                if "return" not in code:
+                    code += f"\nreturn {instruction.cycles}"
+                lines.extend(code.replace("return ", f"return {cycles} + ").splitlines())
+                return self._function(lines), address, cycles + worst_cycles(instruction)
+
+            # The MBC may switch banks, the block must be left: below 8000h, the high byte is below 80h
+            register = WRITES_RR.get(opcode) or ("h" if "cpu.write(hl," in instruction.code else "")
+            if register:
+                lines.append(f"mbc = cpu.{register} < 0x80")
+            lines.extend(instruction.code.splitlines())
+            cycles += instruction.cycles
+            if register:
+                lines.extend((f"if mbc:\n    cpu.pc = {address}\n    return {cycles}").splitlines())
+            if io or (opcode in WRITES_NN and operand < 0x8000):
+                # Pending interrupts must be checked right after an I/O access, and
+                # the MBC may switch banks: next instructions may not be the ones read here
+                break
+
+        if not lines:
+            return "", address + 1, 0
+        lines.extend((f"cpu.pc = {address}", f"return {cycles}"))
+        return self._function(lines), address, cycles
+
+    @staticmethod
+    def _function(lines: list[str]) -> str:
+        body = "\n".join(f"    {line}" for line in lines)
+        return f"def block(cpu):\n{body}\n"
@@ -2,23 +2,132 @@
 Source: https://github.com/BoboTiG/PyGameBoy
 """
 
+from __future__ import annotations
+
+import hashlib
+import mmap
+import os
+import struct
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, suppress
 from functools import cached_property
+from itertools import islice
 from pathlib import Path
-from types import SimpleNamespace
+from typing import IO, TYPE_CHECKING, NamedTuple
 from zipfile import ZipFile
 
 from . import constants, offset
 from .exceptions import InvalidRomError, InvalidZipError
 
+if TYPE_CHECKING:
+    import sys
+    from collections.abc import Generator, Iterator
+
+    if sys.version_info >= (3, 11):
+        from typing import Self
+    else:
+        from typing_extensions import Self
+
 # The type of data that Cartridge.__init__() can handle as a "ROM"
 InputData = Path | bytes | str
 
+# ROM file extensions, used to find them inside ZIP files
+SUFFIXES = (".gb", ".gbc")
+
+# Size of chunks when streaming the ROM content
+CHUNK_SIZE = 64 * 1024
+
+# The header block layout, from offset.ENTRY_POINT to offset.GLOBAL_CHECKSUM
+HEADER_FORMAT = struct.Struct(">4s48s11s4sB2sBBBBBBBBH")
+
+
+def compute_header_checksum(data: bytes | memoryview) -> int:
+    """Compute the header checksum (see `Cartridge.header_checksum`).
+    The x=x-MEM[i]-1 loop over the 25 bytes is the same as x=-SUM(MEM[i])-25.
+    """
+    size = offset.HEADER_CHECKSUM - offset.TITLE.start
+    return (-sum(data[offset.TITLE.start : offset.HEADER_CHECKSUM]) - size) & 0xFF
+
+
+class CartridgeHeader(NamedTuple):
+    """All ROM information, see `Cartridge.parse()`."""
+
+    file: Path
+    cgb: bool
+    destination: str
+    licensee: str
+    old_licensee: str
+    publisher: str
+    ram_size: str
+    rom_size: str
+    sgb: bool
+    title: str
+    type: str
+    valid: bool
+    valid_complete: bool | None  # None when not computed
+    version: float
+
+    @classmethod
+    def unpack(cls, data: bytes | memoryview, *, file: Path, valid_complete: bool | None) -> CartridgeHeader:
+        """Decode the header block of the ROM *data* in one pass.
+        See `Cartridge` properties for the meaning of each field.
+        """
+        (
+            _,  # Entry point
+            _,  # Logo
+            title,
+            code,
+            cgb,
+            licensee,
+            sgb,
+            kind,
+            rom_size,
+            ram_size,
+            destination,
+            old_licensee,
+            version,
+            header_checksum,
+            _,  # Global checksum
+        ) = HEADER_FORMAT.unpack_from(data, offset.HEADER.start)
+        code = code.decode("latin-1").rstrip("\0")
+        licensee = licensee.decode("latin-1").rstrip("\0")
+        old_licensee = "" if old_licensee == 0x33 else f"{old_licensee:02X}"
+        return cls(
+            file=file,
+            cgb=cgb in {0x80, 0xC0},
+            destination="Japan" if destination == 0x00 else "World",
+            licensee=licensee,
+            old_licensee=old_licensee,
+            publisher=constants.LICENSEES[old_licensee or licensee],
+            ram_size=constants.RAM_SIZES[ram_size],
+            rom_size=constants.ROM_SIZES[rom_size],
+            sgb=sgb == 0x03,
+            title=title.decode("latin-1").rstrip("\0") + code,
+            type=constants.TYPES[kind],
+            valid=compute_header_checksum(data) == header_checksum,
+            valid_complete=valid_complete,
+            version=1.0 + (version / 10),
+        )
+
 
 class Cartridge:
     """Cartridge content."""
 
-    def __init__(self, rom: InputData) -> None:
-        """*rom* can be either bytes, a string or a path-like object."""
+    def __init__(self, rom: InputData, *, member: str = "", memory_map: bool = False, lazy: bool = False) -> None:
+        """*rom* can be either bytes, a string or a path-like object.
+        For ZIP files, the ROM *member* is used, or the first ROM found.
+
+        When *memory_map* is True, a ROM file on disk is not copied in memory: it is
+        memory-mapped and exposed as a read-only memoryview. Use `close()`, or the
+        cartridge as a context manager, to release the mapping. ZIP files, bytes, and
+        empty files are not concerned.
+
+        When *lazy* is True, only the header block is read at construction time; the
+        whole ROM is read on the first access to `data` (e.g. by `global_checksum`).
+        """
+        self._mmap: mmap.mmap | None = None
         if isinstance(rom, Path):
             self.rom = rom
         elif isinstance(rom, str):
@@ -26,19 +135,74 @@ class Cartridge:
         else:
             self.rom = Path()
 
+        # The ZIP member holding the ROM, if any
+        self.member = member
+
         if isinstance(rom, bytes):
             self.data = rom
-        elif self.rom.suffix.lower() == ".zip":
+        elif self.rom.suffix.lower() == ".zip" and not member:
             # Handle ZIP files: the first ROM file found is used
             with ZipFile(self.rom) as zfile:
                 for file in zfile.namelist():
-                    if file.lower().endswith((".gb", ".gbc")):
-                        self.data = zfile.read(file)
+                    if file.lower().endswith(SUFFIXES):
+                        self.member = file
                         break
                 else:
                     raise InvalidZipError
-        else:
-            self.data = self.rom.read_bytes()
+        elif memory_map and self.rom.stat().st_size:
+            with self.rom.open("rb") as fh:
+                self._mmap = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+            self.data = memoryview(self._mmap)
+
+        if not lazy and "data" not in vars(self):
+            self.data = self._read()
+
+        # Header properties only need the beginning of the ROM (offsets are absolute)
+        self.header = self.data if "data" in vars(self) else self._read(offset.HEADER.stop)
+
+    @classmethod
+    def iter_zip(cls, file: Path | str, *, lazy: bool = True, workers: int | None = None) -> Generator[Cartridge]:
+        """Yield a cartridge for every ROM of the ZIP *file*, in the archive order.
+        Cartridges are *lazy* by default: only their header is read, and the whole ROM is
+        streamed from the archive when needed (see `chunks()`).
+        Otherwise, ROMs are decompressed by a pool of *workers* threads (decompression
+        releases the GIL). At most two ROMs per worker are loaded ahead of the consumer,
+        the rest is cancelled when it stops early.
+        """
+        file = Path(file)
+        with ZipFile(file) as zfile:
+            members = [name for name in zfile.namelist() if name.lower().endswith(SUFFIXES)]
+            if not members:
+                raise InvalidZipError
+            if lazy:
+                for member in members:
+                    yield cls(file, member=member, lazy=True)
+                return
+
+            def load(member: str) -> Cartridge:
+                cartridge = cls(zfile.read(member))
+                cartridge.rom = file
+                cartridge.member = member
+                return cartridge
+
+            workers = workers or os.cpu_count() or 1
+            names = iter(members)
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                futures = deque(pool.submit(load, member) for member in islice(names, 2 * workers))
+                try:
+                    while futures:
+                        cartridge = futures.popleft().result()
+                        futures.extend(pool.submit(load, member) for member in islice(names, 1))
+                        yield cartridge
+                finally:
+                    for future in futures:
+                        future.cancel()
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *_: object) -> None:
+        self.close()
 
     def __repr__(self) -> str:
         return (
@@ -53,25 +217,84 @@ class Cartridge:
             ">"
         )
 
-    def parse(self) -> SimpleNamespace:
-        """Retrieve all ROM information."""
+    @cached_property
+    def data(self) -> bytes | memoryview:
+        """The whole ROM content, only read on first access when the cartridge is lazy."""
+        return self._read()
+
+    @contextmanager
+    def _open(self) -> Iterator[IO[bytes]]:
+        """Open the ROM file, or the ROM member of the ZIP file."""
+        if self.member:
+            with ZipFile(self.rom) as zfile, zfile.open(self.member) as fh:
+                yield fh
+        else:
+            with self.rom.open("rb") as fh:
+                yield fh
+
+    def _read(self, size: int = -1) -> bytes:
+        """Read *size* bytes of the ROM file, or the whole file by default."""
+        with self._open() as fh:
+            return fh.read(size)
+
+    def chunks(self) -> Iterator[bytes | memoryview]:
+        """Yield the whole ROM content, chunk by chunk.
+        When the ROM was not read yet (lazy cartridge), it is streamed from the disk
+        (and decompressed on the fly for ZIP files) without being kept in memory.
+        """
+        if "data" in vars(self):
+            view = memoryview(self.data)
+            for start in range(0, len(view), CHUNK_SIZE):
+                yield view[start : start + CHUNK_SIZE]
+            return
+
+        with self._open() as fh:
+            while chunk := fh.read(CHUNK_SIZE):
+                yield chunk
+
+    def checksums(self, *algorithms: str) -> dict[str, str]:
+        """Compute hexadecimal digests of the whole ROM, in a single pass shared with the
+        global checksum computation (its result is cached, see `global_checksum`).
+        *algorithms* can be "crc32", or any name supported by `hashlib.new()`.
+        """
+        total = crc = 0
+        compute_crc = "crc32" in algorithms
+        hashes = {algorithm: hashlib.new(algorithm) for algorithm in algorithms if algorithm != "crc32"}
+
+        for chunk in self.chunks():
+            total += sum(chunk)
+            if compute_crc:
+                crc = zlib.crc32(chunk, crc)
+            for hash_ in hashes.values():
+                hash_.update(chunk)
+
+        low, high = self.header[offset.GLOBAL_CHECKSUM]
+        self.__dict__["global_checksum"] = (total - low - high) % 2**16 == (low << 8) | high
+
+        digests = {algorithm: hash_.hexdigest() for algorithm, hash_ in hashes.items()}
+        if compute_crc:
+            digests["crc32"] = f"{crc:08x}"
+        return digests
+
+    def close(self) -> None:
+        """Release the memory-mapped ROM file, if any.
+        While views on the ROM are still used (by an emulator), the mapping is released along with them.
+        """
+        if self._mmap is None:
+            return
+        if isinstance(self.data, memoryview):
+            self.data.release()
+        with suppress(BufferError):
+            self._mmap.close()
+        self._mmap = None
+
+    def parse(self, *, complete: bool = True) -> CartridgeHeader:
+        """Retrieve all ROM information.
+        Without *complete*, the global checksum is not verified: only the header block is read.
+        """
         try:
-            return SimpleNamespace(
-                file=self.rom,
-                cgb=self.cgb_flag,
-                destination=self.destination,
-                licensee=self.licensee,
-                old_licensee=self.old_licensee,
-                publisher=self.publisher,
-                ram_size=self.ram_size,
-                rom_size=self.rom_size,
-                sgb=self.sgb_flag,
-                title=self.title,
-                type=self.type,
-                valid=self.header_checksum,
-                valid_complete=self.global_checksum,
-                version=self.version,
-            )
+            valid_complete = self.global_checksum if complete else None
+            return CartridgeHeader.unpack(self.header, file=self.rom, valid_complete=valid_complete)
         except Exception as e:
             msg = "ROM parsing error"
             raise InvalidRomError(msg) from e
@@ -89,7 +312,7 @@ class Cartridge:
         verifies only the first 18h bytes of the bitmap, but others (for example a
         pocket gameboy) verify all 30h bytes.
         """
-        return self.data[offset.LOGO]
+        return bytes(self.header[offset.LOGO])
 
     @cached_property
     def title(self) -> str:
@@ -100,7 +323,7 @@ class Cartridge:
         had the fantastic idea to reduce it to 11 characters only. The new meaning of
         the ex-title bytes is described below.
         """
-        full_title = self.data[offset.TITLE].decode("latin-1").rstrip("\0")
+        full_title = str(self.header[offset.TITLE], "latin-1").rstrip("\0")
         if code := self.code:
             full_title += code
         return full_title
@@ -112,7 +335,7 @@ class Cartridge:
         cartridges this area contains an 4 character uppercase manufacturer code.
         Purpose and Deeper Meaning unknown.
         """
-        return self.data[offset.CODE].decode("latin-1").rstrip("\0")
+        return str(self.header[offset.CODE], "latin-1").rstrip("\0")
 
     @cached_property
     def cgb_flag(self) -> bool:
@@ -127,7 +350,7 @@ class Cartridge:
         eventually this has been supposed to be used to colorize monochrome games that
         include fixed palette data at a special location in ROM.
         """
-        return self.data[offset.CBG_FLAG] in {0x80, 0xC0}
+        return self.header[offset.CBG_FLAG] in {0x80, 0xC0}
 
     @cached_property
     def licensee(self) -> str:
@@ -137,7 +360,7 @@ class Cartridge:
         that have been released after the SGB has been invented). Older games are
         using the header entry at 014B instead.
         """
-        return self.data[offset.LICENSE].decode("latin-1").rstrip("\0")
+        return str(self.header[offset.LICENSE], "latin-1").rstrip("\0")
 
     @cached_property
     def sgb_flag(self) -> bool:
@@ -148,7 +371,7 @@ class Cartridge:
         The SGB disables its SGB functions if this byte is set to another value than
         03h.
         """
-        return self.data[offset.SBG_FLAG] == 0x03
+        return self.header[offset.SBG_FLAG] == 0x03
 
     @cached_property
     def type(self) -> str:
@@ -171,7 +394,7 @@ class Cartridge:
           11h  MBC3                     FFh  HuC1+RAM+BATTERY
           12h  MBC3+RAM
         """
-        return constants.TYPES[self.data[offset.TYPE]]
+        return constants.TYPES[self.header[offset.TYPE]]
 
     @cached_property
     def rom_size(self) -> str:
@@ -189,7 +412,7 @@ class Cartridge:
           53h - 1.2MByte (80 banks)
           54h - 1.5MByte (96 banks)
         """
-        return constants.ROM_SIZES[self.data[offset.ROM_SIZE]]
+        return constants.ROM_SIZES[self.header[offset.ROM_SIZE]]
 
     @cached_property
     def ram_size(self) -> str:
@@ -202,7 +425,7 @@ class Cartridge:
         When using a MBC2 chip 00h must be specified in this entry, even though the
         MBC2 includes a built-in RAM of 512 x 4 bits.
         """
-        return constants.RAM_SIZES[self.data[offset.RAM_SIZE]]
+        return constants.RAM_SIZES[self.header[offset.RAM_SIZE]]
 
     @cached_property
     def destination(self) -> str:
@@ -212,7 +435,7 @@ class Cartridge:
           00h - Japanese
           01h - Non-Japanese
         """
-        return "Japan" if self.data[offset.DEST_CODE] == 0x00 else "World"
+        return "Japan" if self.header[offset.DEST_CODE] == 0x00 else "World"
 
     @cached_property
     def old_licensee(self) -> str:
@@ -223,7 +446,7 @@ class Cartridge:
         (Super GameBoy functions won't work if <> $33.)
         """
         # sourcery skip: assign-if-exp
-        if (value := self.data[offset.OLD_LICENSE]) == 0x33:
+        if (value := self.header[offset.OLD_LICENSE]) == 0x33:
             # Then .licensee will be used by .publisher
             return ""
         return f"{value:02X}"
@@ -233,7 +456,7 @@ class Cartridge:
         """Mask ROM Version number
         Specifies the version number of the game. That is usually 00h.
         """
-        return 1.0 + (self.data[offset.VERSION] / 10)
+        return 1.0 + (self.header[offset.VERSION] / 10)
 
     @cached_property
     def header_checksum(self) -> bool:
@@ -244,11 +467,7 @@ class Cartridge:
         The lower 8 bits of the result must be the same than the value in this entry.
         The GAME WON'T WORK if this checksum is incorrect.
         """
-        checksum = 0
-        for value in self.data[offset.TITLE.start : offset.HEADER_CHECKSUM]:
-            checksum = checksum - value - 1
-        checksum &= 0xFF
-        return checksum == self.data[offset.HEADER_CHECKSUM]
+        return compute_header_checksum(self.header) == self.header[offset.HEADER_CHECKSUM]
 
     @cached_property
     def global_checksum(self) -> bool:
@@ -257,11 +476,8 @@ class Cartridge:
         Produced by adding all bytes of the cartridge (except for the two checksum
         bytes) modulo 2**16 in big endian format. The Gameboy doesn't verify this checksum.
         """
-        low, high = self.data[offset.GLOBAL_CHECKSUM]
-        awaited = (low << 8) | high
-        checksum = sum(self.data) - low - high
-        checksum %= 2**16
-        return checksum == awaited
+        self.checksums()
+        return self.__dict__["global_checksum"]
 
     @cached_property
     def publisher(self) -> str:
@@ -271,13 +487,14 @@ class Cartridge:
     def is_valid(self, *, complete: bool = False) -> bool:
         """Verify the header validity."""
         # Check for enough data
-        ret = len(self.data) >= 0x14E
+        ret = len(self.header) >= 0x14E
 
         # Simple header checksum, the only one really important for the GameBoy
         ret &= self.header_checksum
 
-        # A more complete check, not used by the GameBoy
-        if complete:
+        # A more complete check, not used by the GameBoy (and not worth reading
+        # the whole ROM when the header is already wrong)
+        if complete and ret:
             ret &= self.global_checksum
 
         return ret
@@ -0,0 +1,184 @@
+"""This is part of PyGameBoy, a Game Boy emulator written in Python 3.
+Source: https://github.com/BoboTiG/PyGameBoy
+
+A columnar catalog of cartridges: the header blocks of N ROMs are packed into a
+single (N, 0x150) array, and every header field is decoded for all ROMs at once.
+Masks can be combined to query the catalog, e.g. all MBC3+TIMER cartridges with a
+bad header checksum:
+
+    >>> catalog = Catalog.from_files(find_roms(folder))
+    >>> bad = catalog[np.char.startswith(catalog.type, "MBC3+TIMER") & ~catalog.header_checksum]
+    >>> bad.files
+"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any
+
+import numpy as np
+
+from . import constants, offset
+from .cartridge import Cartridge
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+    from pathlib import Path
+
+__all__ = ("Catalog",)
+
+# Size of a header block, offsets are kept absolute
+BLOCK_SIZE = offset.HEADER.stop
+
+
+def _lookup(table: dict[int, str]) -> np.ndarray:
+    """Turn a byte -> name mapping into a 256-entry array, unknown values are empty."""
+    return np.array([table.get(value, "") for value in range(256)])
+
+
+TYPES = _lookup(constants.TYPES)
+ROM_SIZES = _lookup(constants.ROM_SIZES)
+RAM_SIZES = _lookup(constants.RAM_SIZES)
+OLD_LICENSEES = np.array(["" if value == 0x33 else f"{value:02X}" for value in range(256)])
+LOGO = np.frombuffer(constants.LOGO, dtype=np.uint8)
+
+
+class Catalog:
+    """Header blocks of many cartridges, decoded column by column."""
+
+    def __init__(self, blocks: np.ndarray, files: Iterable[str]) -> None:
+        """*blocks* is a (N, 0x150) uint8 array, *files* the N names of matching ROMs."""
+        self.blocks = blocks
+        self.files = np.array(list(files), dtype=str)
+
+    def __len__(self) -> int:
+        return len(self.blocks)
+
+    def __getitem__(self, mask: Any) -> Catalog:  # noqa: ANN401
+        """Select ROMs using a boolean mask, or indexes."""
+        return type(self)(self.blocks[mask], self.files[mask])
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}<{len(self)} ROMs>"
+
+    @classmethod
+    def from_cartridges(cls, cartridges: Iterable[Cartridge]) -> Catalog:
+        """Pack the header blocks of *cartridges*."""
+        blocks = []
+        files = []
+        for cartridge in cartridges:
+            block = bytes(cartridge.header[:BLOCK_SIZE])
+            # Truncated ROMs are padded, they will not have a valid header checksum anyway
+            blocks.append(block.ljust(BLOCK_SIZE, b"\0"))
+            files.append(f"{cartridge.rom}:{cartridge.member}" if cartridge.member else str(cartridge.rom))
+        array = np.frombuffer(b"".join(blocks), dtype=np.uint8).reshape(-1, BLOCK_SIZE)
+        return cls(array, files)
+
+    @classmethod
+    def from_files(cls, files: Iterable[Path]) -> Catalog:
+        """Pack the header blocks of ROM *files*, every ROM of ZIP files included.
+        Only headers are read, but ZIP members have to be decompressed.
+        """
+        return cls.from_cartridges(
+            cartridge
+            for file in files
+            for cartridge in (
+                Cartridge.iter_zip(file) if file.suffix.lower() == ".zip" else (Cartridge(file, lazy=True),)
+            )
+        )
+
+    @classmethod
+    def load(cls, file: Path) -> Catalog:
+        """Load a catalog previously saved with `save()`."""
+        with np.load(file, allow_pickle=False) as content:
+            return cls(content["blocks"], content["files"])
+
+    def save(self, file: Path) -> None:
+        """Save the catalog to *file* (NumPy .npz format)."""
+        np.savez_compressed(file, blocks=self.blocks, files=self.files)
+
+    def _text(self, where: slice) -> np.ndarray:
+        """Decode a text field, trailing NULL bytes are removed."""
+        raw = np.ascontiguousarray(self.blocks[:, where]).view(f"S{where.stop - where.start}").ravel()
+        return np.char.decode(raw, "latin-1")
+
+    #
+    # Columns, see Cartridge properties for details
+    #
+
+    @property
+    def logo(self) -> np.ndarray:
+        """True when the Nintendo logo is correct."""
+        return (self.blocks[:, offset.LOGO] == LOGO).all(axis=1)
+
+    @property
+    def title(self) -> np.ndarray:
+        """Titles, with the manufacturer code."""
+        return np.char.add(self._text(offset.TITLE), self.code)
+
+    @property
+    def code(self) -> np.ndarray:
+        """Manufacturer codes."""
+        return self._text(offset.CODE)
+
+    @property
+    def cgb(self) -> np.ndarray:
+        """True when the game supports CGB functions."""
+        flag = self.blocks[:, offset.CBG_FLAG]
+        return (flag == 0x80) | (flag == 0xC0)
+
+    @property
+    def licensee(self) -> np.ndarray:
+        """New licensee codes."""
+        return self._text(offset.LICENSE)
+
+    @property
+    def sgb(self) -> np.ndarray:
+        """True when the game supports SGB functions."""
+        return self.blocks[:, offset.SBG_FLAG] == 0x03
+
+    @property
+    def type(self) -> np.ndarray:
+        """Cartridge types, empty when unknown."""
+        return TYPES[self.blocks[:, offset.TYPE]]
+
+    @property
+    def rom_size(self) -> np.ndarray:
+        """ROM sizes, empty when unknown."""
+        return ROM_SIZES[self.blocks[:, offset.ROM_SIZE]]
+
+    @property
+    def ram_size(self) -> np.ndarray:
+        """RAM sizes, empty when unknown."""
+        return RAM_SIZES[self.blocks[:, offset.RAM_SIZE]]
+
+    @property
+    def destination(self) -> np.ndarray:
+        """Destination codes."""
+        return np.where(self.blocks[:, offset.DEST_CODE] == 0x00, "Japan", "World")
+
+    @property
+    def old_licensee(self) -> np.ndarray:
+        """Old licensee codes, empty when the new licensee code is used."""
+        return OLD_LICENSEES[self.blocks[:, offset.OLD_LICENSE]]
+
+    @property
+    def publisher(self) -> np.ndarray:
+        """Publishers, empty when unknown."""
+        old = self.old_licensee
+        codes = np.where(old == "", self.licensee, old)
+        # Few distinct codes, so only those are looked up
+        unique, inverse = np.unique(codes, return_inverse=True)
+        names = np.array([constants.LICENSEES.get(code, "") for code in unique] or [""])
+        return names[inverse.ravel()]
+
+    @property
+    def version(self) -> np.ndarray:
+        """Mask ROM version numbers."""
+        return 1.0 + self.blocks[:, offset.VERSION] / 10
+
+    @property
+    def header_checksum(self) -> np.ndarray:
+        """True when the header checksum is correct (see `compute_header_checksum()`)."""
+        header = self.blocks[:, offset.TITLE.start : offset.HEADER_CHECKSUM]
+        checksum = (-header.sum(axis=1, dtype=np.int64) - header.shape[1]) & 0xFF
+        return checksum == self.blocks[:, offset.HEADER_CHECKSUM]
@@ -347,3 +347,6 @@ TYPES = {
     0xFE: "HuC3",
     0xFF: "HuC1+RAM+BATTERY",
 }
+
+# The Nintendo logo, verified by the boot procedure (see Cartridge.logo)
+LOGO = bytes.fromhex("CEED6666CC0D000B03730083000C000D0008111F8889000EDCCC6EE6DDDDD999BBBB67636E0EECCCDDDC999FBBB9333E")
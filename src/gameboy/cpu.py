@@ -0,0 +1,522 @@
+"""This is part of PyGameBoy, a Game Boy emulator written in Python 3.
+Source: https://github.com/BoboTiG/PyGameBoy
+
+The Sharp SM83 CPU.
+
+Every instruction is described by a small Python source template, and all templates
+are compiled once into specialized functions, stored into two 256-entry dispatch
+tables: `OPCODES` for base opcodes, and `CB_OPCODES` for CB-prefixed ones. Each
+function executes one instruction, and returns its duration in clock cycles (T-cycles,
+4 per M-cycle), conditional branches included.
+
+Registers are plain integers stored in `__slots__`: this is the fastest attribute
+access CPython offers. Flags are kept packed into F, as on the real hardware.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Callable
+from typing import NamedTuple
+
+from .exceptions import InvalidOpcodeError
+
+__all__ = ("CB_INSTRUCTIONS", "CB_OPCODES", "CPU", "INSTRUCTIONS", "OPCODES", "Instruction")
+
+# The type of functions of dispatch tables
+Opcode = Callable[["CPU"], int]
+
+# Flags
+Z, N, H, C = 0x80, 0x40, 0x20, 0x10
+
+# Interrupt sources, by priority (bits of IE and IF)
+VBLANK, STAT, TIMER, SERIAL, JOYPAD = 0x01, 0x02, 0x04, 0x08, 0x10
+
+# Clock speed in cycles per second (T-cycles)
+FREQUENCY = 4_194_304
+
+
+class Instruction(NamedTuple):
+    """An instruction template.
+    *operand* is the kind of immediate operand: "" (none), "n" (8-bit), "e" (8-bit
+    signed) or "nn" (16-bit). It is available to *code* under that name.
+    *code* either returns the cycles count (conditional branches), or *cycles* is used.
+    *branch* is True when the instruction may change the control flow, or the CPU state
+    (HALT, STOP, and EI): it ends basic blocks.
+    """
+
+    mnemonic: str
+    length: int
+    cycles: int
+    code: str
+    operand: str = ""
+    branch: bool = False
+
+
+#
+# Templates helpers
+#
+
+R8 = ("b", "c", "d", "e", "h", "l", "(hl)", "a")
+R16 = ("bc", "de", "hl", "sp")
+R16_STACK = ("bc", "de", "hl", "af")
+CONDITIONS = {
+    "nz": "not cpu.f & 0x80",
+    "z": "cpu.f & 0x80",
+    "nc": "not cpu.f & 0x10",
+    "c": "cpu.f & 0x10",
+}
+HL = "hl = (cpu.h << 8) | cpu.l\n"
+
+
+def _get8(reg: str) -> str:
+    return "cpu.read(hl)" if reg == "(hl)" else f"cpu.{reg}"
+
+
+def _set8(reg: str, value: str) -> str:
+    return f"cpu.write(hl, {value})" if reg == "(hl)" else f"cpu.{reg} = {value}"
+
+
+def _get16(pair: str) -> str:
+    return "cpu.sp" if pair == "sp" else f"((cpu.{pair[0]} << 8) | cpu.{pair[1]})"
+
+
+def _set16(pair: str, value: str) -> str:
+    """*value* must be a name, or a constant."""
+    if pair == "sp":
+        return f"cpu.sp = {value}"
+    if pair == "af":
+        return f"cpu.a = {value} >> 8\ncpu.f = {value} & 0xF0"
+    return f"cpu.{pair[0]} = {value} >> 8\ncpu.{pair[1]} = {value} & 0xFF"
+
+
+def _prelude(*regs: str) -> str:
+    return HL if "(hl)" in regs else ""
+
+
+PUSH_PC = """sp = cpu.sp
+pc = cpu.pc
+sp = (sp - 1) & 0xFFFF
+cpu.write(sp, pc >> 8)
+sp = (sp - 1) & 0xFFFF
+cpu.write(sp, pc & 0xFF)
+cpu.sp = sp
+"""
+
+POP_PC = """sp = cpu.sp
+cpu.pc = cpu.read(sp) | (cpu.read((sp + 1) & 0xFFFF) << 8)
+cpu.sp = (sp + 2) & 0xFFFF
+"""
+
+# 8-bit arithmetic and logic on A, the source value is in `v`
+ALU = {
+    "add": """r = cpu.a + v
+cpu.f = (0 if r & 0xFF else 0x80) | (((cpu.a & 0xF) + (v & 0xF) > 0xF) << 5) | ((r > 0xFF) << 4)
+cpu.a = r & 0xFF
+""",
+    "adc": """carry = (cpu.f >> 4) & 1
+r = cpu.a + v + carry
+cpu.f = (0 if r & 0xFF else 0x80) | (((cpu.a & 0xF) + (v & 0xF) + carry > 0xF) << 5) | ((r > 0xFF) << 4)
+cpu.a = r & 0xFF
+""",
+    "sub": """r = cpu.a - v
+cpu.f = (0 if r & 0xFF else 0x80) | 0x40 | (((cpu.a & 0xF) < (v & 0xF)) << 5) | ((r < 0) << 4)
+cpu.a = r & 0xFF
+""",
+    "sbc": """carry = (cpu.f >> 4) & 1
+r = cpu.a - v - carry
+cpu.f = (0 if r & 0xFF else 0x80) | 0x40 | (((cpu.a & 0xF) - (v & 0xF) - carry < 0) << 5) | ((r < 0) << 4)
+cpu.a = r & 0xFF
+""",
+    "and": """r = cpu.a & v
+cpu.a = r
+cpu.f = 0x20 if r else 0xA0
+""",
+    "xor": """r = cpu.a ^ v
+cpu.a = r
+cpu.f = 0 if r else 0x80
+""",
+    "or": """r = cpu.a | v
+cpu.a = r
+cpu.f = 0 if r else 0x80
+""",
+    "cp": """r = cpu.a - v
+cpu.f = (0 if r & 0xFF else 0x80) | 0x40 | (((cpu.a & 0xF) < (v & 0xF)) << 5) | ((r < 0) << 4)
+""",
+}
+
+# Rotations and shifts of the CB-prefixed instructions, the value is in `v`,
+# the result must be put into `r`
+SHIFTS = {
+    "rlc": "c = v >> 7\nr = ((v << 1) | c) & 0xFF\n",
+    "rrc": "c = v & 1\nr = (v >> 1) | (c << 7)\n",
+    "rl": "c = v >> 7\nr = ((v << 1) | ((cpu.f >> 4) & 1)) & 0xFF\n",
+    "rr": "c = v & 1\nr = (v >> 1) | ((cpu.f & 0x10) << 3)\n",
+    "sla": "c = v >> 7\nr = (v << 1) & 0xFF\n",
+    "sra": "c = v & 1\nr = (v >> 1) | (v & 0x80)\n",
+    "swap": "c = 0\nr = ((v << 4) | (v >> 4)) & 0xFF\n",
+    "srl": "c = v & 1\nr = v >> 1\n",
+}
+
+
+def _instructions() -> list[Instruction | None]:  # noqa: C901, PLR0912, PLR0915
+    """Describe all base instructions, None for illegal opcodes."""
+    ops: list[Instruction | None] = [None] * 256
+
+    ops[0x00] = Instruction("NOP", 1, 4, "")
+    ops[0x10] = Instruction("STOP", 2, 4, "return 4 + cpu.stop()", operand="n", branch=True)
+    ops[0x76] = Instruction("HALT", 1, 4, "return 4 + cpu.halt()", branch=True)
+    ops[0xF3] = Instruction("DI", 1, 4, "cpu.ime = False\ncpu.ime_pending = False")
+    # Interrupts are enabled after the next instruction, so it is executed right away
+    ops[0xFB] = Instruction("EI", 1, 4, "return 4 + cpu.enable_interrupts()", branch=True)
+    ops[0xCB] = Instruction("PREFIX CB", 2, 0, "return CB_OPCODES[n](cpu)", operand="n")
+
+    # 8-bit loads
+    for dst_idx, dst in enumerate(R8):
+        for src_idx, src in enumerate(R8):
+            opcode = 0x40 | (dst_idx << 3) | src_idx
+            if opcode == 0x76:
+                continue
+            cycles = 8 if "(hl)" in {src, dst} else 4
+            code = _prelude(dst, src) + _set8(dst, _get8(src))
+            ops[opcode] = Instruction(f"LD {dst.upper()},{src.upper()}", 1, cycles, code)
+        code = _prelude(dst) + _set8(dst, "n")
+        ops[0x06 | (dst_idx << 3)] = Instruction(f"LD {dst.upper()},n", 2, 12 if dst == "(hl)" else 8, code, "n")
+
+    ops[0x02] = Instruction("LD (BC),A", 1, 8, f"cpu.write({_get16('bc')}, cpu.a)")
+    ops[0x12] = Instruction("LD (DE),A", 1, 8, f"cpu.write({_get16('de')}, cpu.a)")
+    ops[0x0A] = Instruction("LD A,(BC)", 1, 8, f"cpu.a = cpu.read({_get16('bc')})")
+    ops[0x1A] = Instruction("LD A,(DE)", 1, 8, f"cpu.a = cpu.read({_get16('de')})")
+    for opcode, mnemonic, step in ((0x22, "LD (HL+),A", "+"), (0x32, "LD (HL-),A", "-")):
+        code = HL + f"cpu.write(hl, cpu.a)\nhl = (hl {step} 1) & 0xFFFF\n" + _set16("hl", "hl")
+        ops[opcode] = Instruction(mnemonic, 1, 8, code)
+    for opcode, mnemonic, step in ((0x2A, "LD A,(HL+)", "+"), (0x3A, "LD A,(HL-)", "-")):
+        code = HL + f"cpu.a = cpu.read(hl)\nhl = (hl {step} 1) & 0xFFFF\n" + _set16("hl", "hl")
+        ops[opcode] = Instruction(mnemonic, 1, 8, code)
+    ops[0xE0] = Instruction("LDH (n),A", 2, 12, "cpu.write(0xFF00 | n, cpu.a)", "n")
+    ops[0xF0] = Instruction("LDH A,(n)", 2, 12, "cpu.a = cpu.read(0xFF00 | n)", "n")
+    ops[0xE2] = Instruction("LD (C),A", 1, 8, "cpu.write(0xFF00 | cpu.c, cpu.a)")
+    ops[0xF2] = Instruction("LD A,(C)", 1, 8, "cpu.a = cpu.read(0xFF00 | cpu.c)")
+    ops[0xEA] = Instruction("LD (nn),A", 3, 16, "cpu.write(nn, cpu.a)", "nn")
+    ops[0xFA] = Instruction("LD A,(nn)", 3, 16, "cpu.a = cpu.read(nn)", "nn")
+
+    # 16-bit loads
+    for idx, pair in enumerate(R16):
+        ops[0x01 | (idx << 4)] = Instruction(f"LD {pair.upper()},nn", 3, 12, _set16(pair, "nn"), "nn")
+    ops[0x08] = Instruction(
+        "LD (nn),SP", 3, 20, "cpu.write(nn, cpu.sp & 0xFF)\ncpu.write((nn + 1) & 0xFFFF, cpu.sp >> 8)", "nn"
+    )
+    ops[0xF9] = Instruction("LD SP,HL", 1, 8, f"cpu.sp = {_get16('hl')}")
+    sp_plus_e = """sp = cpu.sp
+r = (sp + e) & 0xFFFF
+cpu.f = (((sp & 0xF) + (e & 0xF) > 0xF) << 5) | (((sp & 0xFF) + (e & 0xFF) > 0xFF) << 4)
+"""
+    ops[0xE8] = Instruction("ADD SP,e", 2, 16, sp_plus_e + "cpu.sp = r", "e")
+    ops[0xF8] = Instruction("LD HL,SP+e", 2, 12, sp_plus_e + _set16("hl", "r"), "e")
+    for idx, pair in enumerate(R16_STACK):
+        value = "((cpu.a << 8) | cpu.f)" if pair == "af" else _get16(pair)
+        code = f"""v = {value}
+sp = (cpu.sp - 1) & 0xFFFF
+cpu.write(sp, v >> 8)
+sp = (sp - 1) & 0xFFFF
+cpu.write(sp, v & 0xFF)
+cpu.sp = sp"""
+        ops[0xC5 | (idx << 4)] = Instruction(f"PUSH {pair.upper()}", 1, 16, code)
+        code = f"""sp = cpu.sp
+v = cpu.read(sp) | (cpu.read((sp + 1) & 0xFFFF) << 8)
+cpu.sp = (sp + 2) & 0xFFFF
+{_set16(pair, "v")}"""
+        ops[0xC1 | (idx << 4)] = Instruction(f"POP {pair.upper()}", 1, 12, code)
+
+    # 8-bit arithmetic and logic
+    for idx, (name, alu) in enumerate(ALU.items()):
+        for src_idx, src in enumerate(R8):
+            code = _prelude(src) + f"v = {_get8(src)}\n" + alu
+            cycles = 8 if src == "(hl)" else 4
+            ops[0x80 | (idx << 3) | src_idx] = Instruction(f"{name.upper()} A,{src.upper()}", 1, cycles, code)
+        ops[0xC6 | (idx << 3)] = Instruction(f"{name.upper()} A,n", 2, 8, "v = n\n" + alu, "n")
+    for idx, reg in enumerate(R8):
+        cycles = 12 if reg == "(hl)" else 4
+        code = f"""{_prelude(reg)}r = ({_get8(reg)} + 1) & 0xFF
+{_set8(reg, "r")}
+cpu.f = (cpu.f & 0x10) | (0 if r else 0x80) | (((r & 0xF) == 0) << 5)"""
+        ops[0x04 | (idx << 3)] = Instruction(f"INC {reg.upper()}", 1, cycles, code)
+        code = f"""{_prelude(reg)}r = ({_get8(reg)} - 1) & 0xFF
+{_set8(reg, "r")}
+cpu.f = (cpu.f & 0x10) | (0 if r else 0x80) | 0x40 | (((r & 0xF) == 0xF) << 5)"""
+        ops[0x05 | (idx << 3)] = Instruction(f"DEC {reg.upper()}", 1, cycles, code)
+    ops[0x27] = Instruction(
+        "DAA",
+        1,
+        4,
+        """a = cpu.a
+f = cpu.f
+carry = f & 0x10
+if f & 0x40:
+    if carry:
+        a -= 0x60
+    if f & 0x20:
+        a -= 0x06
+else:
+    if carry or a > 0x99:
+        a += 0x60
+        carry = 0x10
+    if f & 0x20 or (a & 0x0F) > 0x09:
+        a += 0x06
+a &= 0xFF
+cpu.a = a
+cpu.f = (0 if a else 0x80) | (f & 0x40) | carry""",
+    )
+    ops[0x2F] = Instruction("CPL", 1, 4, "cpu.a ^= 0xFF\ncpu.f |= 0x60")
+    ops[0x37] = Instruction("SCF", 1, 4, "cpu.f = (cpu.f & 0x80) | 0x10")
+    ops[0x3F] = Instruction("CCF", 1, 4, "cpu.f = (cpu.f & 0x80) | ((cpu.f & 0x10) ^ 0x10)")
+
+    # 16-bit arithmetic
+    for idx, pair in enumerate(R16):
+        code = f"v = ({_get16(pair)} + 1) & 0xFFFF\n{_set16(pair, 'v')}"
+        ops[0x03 | (idx << 4)] = Instruction(f"INC {pair.upper()}", 1, 8, code)
+        code = f"v = ({_get16(pair)} - 1) & 0xFFFF\n{_set16(pair, 'v')}"
+        ops[0x0B | (idx << 4)] = Instruction(f"DEC {pair.upper()}", 1, 8, code)
+        code = f"""{HL}v = {_get16(pair)}
+r = hl + v
+cpu.f = (cpu.f & 0x80) | (((hl & 0xFFF) + (v & 0xFFF) > 0xFFF) << 5) | ((r > 0xFFFF) << 4)
+r &= 0xFFFF
+{_set16("hl", "r")}"""
+        ops[0x09 | (idx << 4)] = Instruction(f"ADD HL,{pair.upper()}", 1, 8, code)
+
+    # Rotations on A
+    ops[0x07] = Instruction("RLCA", 1, 4, "v = cpu.a\nc = v >> 7\ncpu.a = ((v << 1) | c) & 0xFF\ncpu.f = c << 4")
+    ops[0x0F] = Instruction("RRCA", 1, 4, "v = cpu.a\nc = v & 1\ncpu.a = (v >> 1) | (c << 7)\ncpu.f = c << 4")
+    ops[0x17] = Instruction(
+        "RLA", 1, 4, "v = cpu.a\ncpu.a = ((v << 1) | ((cpu.f >> 4) & 1)) & 0xFF\ncpu.f = (v >> 7) << 4"
+    )
+    ops[0x1F] = Instruction("RRA", 1, 4, "v = cpu.a\ncpu.a = (v >> 1) | ((cpu.f & 0x10) << 3)\ncpu.f = (v & 1) << 4")
+
+    # Jumps, calls, and returns
+    ops[0x18] = Instruction("JR e", 2, 12, "cpu.pc = (cpu.pc + e) & 0xFFFF", "e", branch=True)
+    ops[0xC3] = Instruction("JP nn", 3, 16, "cpu.pc = nn", "nn", branch=True)
+    ops[0xE9] = Instruction("JP HL", 1, 4, f"cpu.pc = {_get16('hl')}", branch=True)
+    ops[0xCD] = Instruction("CALL nn", 3, 24, PUSH_PC + "cpu.pc = nn", "nn", branch=True)
+    ops[0xC9] = Instruction("RET", 1, 16, POP_PC, branch=True)
+    ops[0xD9] = Instruction("RETI", 1, 16, POP_PC + "cpu.ime = True", branch=True)
+    for idx, (name, condition) in enumerate(CONDITIONS.items()):
+        code = f"if {condition}:\n    cpu.pc = (cpu.pc + e) & 0xFFFF\n    return 12\nreturn 8"
+        ops[0x20 | (idx << 3)] = Instruction(f"JR {name.upper()},e", 2, 8, code, "e", branch=True)
+        code = f"if {condition}:\n    cpu.pc = nn\n    return 16\nreturn 12"
+        ops[0xC2 | (idx << 3)] = Instruction(f"JP {name.upper()},nn", 3, 12, code, "nn", branch=True)
+        call = PUSH_PC.replace("\n", "\n    ").rstrip()
+        code = f"if {condition}:\n    {call}\n    cpu.pc = nn\n    return 24\nreturn 12"
+        ops[0xC4 | (idx << 3)] = Instruction(f"CALL {name.upper()},nn", 3, 12, code, "nn", branch=True)
+        ret = POP_PC.replace("\n", "\n    ").rstrip()
+        code = f"if {condition}:\n    {ret}\n    return 20\nreturn 8"
+        ops[0xC0 | (idx << 3)] = Instruction(f"RET {name.upper()}", 1, 8, code, branch=True)
+    for idx in range(8):
+        ops[0xC7 | (idx << 3)] = Instruction(f"RST {idx * 8:02X}h", 1, 16, PUSH_PC + f"cpu.pc = {idx * 8}", branch=True)
+
+    return ops
+
+
+def _cb_instructions() -> list[Instruction]:
+    """Describe all CB-prefixed instructions, the prefix cycles are included."""
+    ops: list[Instruction] = []
+    for opcode in range(256):
+        group, bit, idx = opcode >> 6, (opcode >> 3) & 7, opcode & 7
+        reg = R8[idx]
+        hl = reg == "(hl)"
+        if group == 0:
+            name = list(SHIFTS)[bit]
+            code = f"""{_prelude(reg)}v = {_get8(reg)}
+{SHIFTS[name]}{_set8(reg, "r")}
+cpu.f = (0 if r else 0x80) | (c << 4)"""
+            ops.append(Instruction(f"{name.upper()} {reg.upper()}", 2, 16 if hl else 8, code))
+        elif group == 1:
+            code = f"{_prelude(reg)}cpu.f = (cpu.f & 0x10) | 0x20 | (0 if {_get8(reg)} & {1 << bit} else 0x80)"
+            ops.append(Instruction(f"BIT {bit},{reg.upper()}", 2, 12 if hl else 8, code))
+        elif group == 2:
+            code = _prelude(reg) + _set8(reg, f"{_get8(reg)} & {0xFF ^ (1 << bit)}")
+            ops.append(Instruction(f"RES {bit},{reg.upper()}", 2, 16 if hl else 8, code))
+        else:
+            code = _prelude(reg) + _set8(reg, f"{_get8(reg)} | {1 << bit}")
+            ops.append(Instruction(f"SET {bit},{reg.upper()}", 2, 16 if hl else 8, code))
+    return ops
+
+
+INSTRUCTIONS = _instructions()
+CB_INSTRUCTIONS = _cb_instructions()
+
+# How to fetch immediate operands, the opcode was already fetched
+FETCH = {
+    "": "",
+    "n": "pc = cpu.pc\nn = cpu.read(pc)\ncpu.pc = (pc + 1) & 0xFFFF\n",
+    "e": "pc = cpu.pc\ne = cpu.read(pc)\ne = e - 256 if e > 127 else e\ncpu.pc = (pc + 1) & 0xFFFF\n",
+    "nn": "pc = cpu.pc\nnn = cpu.read(pc) | (cpu.read((pc + 1) & 0xFFFF) << 8)\ncpu.pc = (pc + 2) & 0xFFFF\n",
+}
+
+
+def _function(name: str, instruction: Instruction, operand: bool = True) -> str:  # noqa: FBT001, FBT002
+    """Generate the source code of the function executing *instruction*."""
+    code = (FETCH[instruction.operand] if operand else "") + instruction.code
+    if "return" not in instruction.code:
+        code += f"\nreturn {instruction.cycles}"
+    body = "\n".join(f"    {line}" for line in code.splitlines() if line)
+    return f"def {name}(cpu):\n    # {instruction.mnemonic}\n{body}\n"
+
+
+def _illegal(opcode: int) -> Opcode:
+    def illegal(cpu: CPU) -> int:
+        raise InvalidOpcodeError(opcode, (cpu.pc - 1) & 0xFFFF)
+
+    return illegal
+
+
+def _compile() -> tuple[list[Opcode], list[Opcode]]:
+    """Compile all templates into the dispatch tables."""
+    sources = [_function(f"op_{op:02X}", ins) for op, ins in enumerate(INSTRUCTIONS) if ins]
+    sources.extend(_function(f"cb_{op:02X}", ins) for op, ins in enumerate(CB_INSTRUCTIONS))
+    cb_table: list[Opcode] = []
+    namespace: dict[str, object] = {"CB_OPCODES": cb_table}
+    exec(compile("\n".join(sources), f"<{__name__}>", "exec"), namespace)  # noqa: S102
+    cb_table.extend(namespace[f"cb_{op:02X}"] for op in range(256))  # type: ignore[misc]
+    table: list[Opcode] = [
+        namespace[f"op_{op:02X}"] if ins else _illegal(op)  # type: ignore[misc]
+        for op, ins in enumerate(INSTRUCTIONS)
+    ]
+    return table, cb_table
+
+
+OPCODES, CB_OPCODES = _compile()
+
+
+class CPU:
+    """The CPU state, and its main loop."""
+
+    __slots__ = (
+        "a",
+        "b",
+        "c",
+        "cycles",
+        "d",
+        "e",
+        "f",
+        "h",
+        "halted",
+        "idle",
+        "ime",
+        "ime_pending",
+        "interrupt_enable",
+        "interrupt_flag",
+        "l",
+        "pc",
+        "read",
+        "sp",
+        "stopped",
+        "write",
+    )
+
+    def __init__(self, memory: bytearray | None = None) -> None:
+        """Without an MMU, the CPU sees a flat 64 KiB *memory*.
+        The MMU replaces `read()` and `write()` memory accessors when it is plugged,
+        and the emulator replaces `idle()` to skip cycles while halted.
+        """
+        memory = bytearray(0x10000) if memory is None else memory
+        self.read: Callable[[int], int] = memory.__getitem__
+        self.write: Callable[[int, int], None] = memory.__setitem__
+        self.idle: Callable[[], int] = self.nap
+
+        # Registers, as left by the DMG boot ROM
+        self.a, self.f = 0x01, 0xB0
+        self.b, self.c = 0x00, 0x13
+        self.d, self.e = 0x00, 0xD8
+        self.h, self.l = 0x01, 0x4D
+        self.sp = 0xFFFE
+        self.pc = 0x0100
+
+        # Interrupts: the master enable flag, IE and IF registers
+        self.ime = False
+        self.ime_pending = False
+        self.interrupt_enable = 0x00
+        self.interrupt_flag = 0x01
+
+        self.halted = False
+        self.stopped = False
+
+        # Elapsed clock cycles since the power on
+        self.cycles = 0
+
+    def __repr__(self) -> str:
+        return (
+            f"{type(self).__name__}<"
+            f"AF={self.a:02X}{self.f:02X} BC={self.b:02X}{self.c:02X} DE={self.d:02X}{self.e:02X}"
+            f" HL={self.h:02X}{self.l:02X} SP={self.sp:04X} PC={self.pc:04X}"
+            f" IME={int(self.ime)} IE={self.interrupt_enable:02X} IF={self.interrupt_flag:02X}"
+            f" cycles={self.cycles}"
+            ">"
+        )
+
+    def step(self) -> int:
+        """Execute one instruction, or service an interrupt, and return elapsed cycles."""
+        if self.interrupt_enable & self.interrupt_flag & 0x1F:
+            # Any pending interrupt wakes up the CPU, even when they are disabled
+            self.halted = self.stopped = False
+            if self.ime:
+                return self.service_interrupt()
+        if self.halted:
+            return self.idle()
+
+        pc = self.pc
+        self.pc = (pc + 1) & 0xFFFF
+        return OPCODES[self.read(pc)](self)
+
+    @staticmethod
+    def nap() -> int:
+        """Cycles elapsed while halted, before checking interrupts again: one M-cycle."""
+        return 4
+
+    def run(self, until: int) -> None:
+        """Execute instructions until the cycles counter reaches *until*."""
+        step = self.step
+        while self.cycles < until:
+            self.cycles += step()
+
+    def service_interrupt(self) -> int:
+        """Jump to the handler of the highest priority pending interrupt."""
+        pending = self.interrupt_enable & self.interrupt_flag & 0x1F
+        source = pending & -pending
+        self.interrupt_flag &= ~source
+        self.ime = False
+
+        sp = self.sp
+        sp = (sp - 1) & 0xFFFF
+        self.write(sp, self.pc >> 8)
+        sp = (sp - 1) & 0xFFFF
+        self.write(sp, self.pc & 0xFF)
+        self.sp = sp
+        # Vectors are 0x40 (VBlank), 0x48 (STAT), 0x50 (Timer), 0x58 (Serial) and 0x60 (Joypad)
+        self.pc = 0x38 + (source.bit_length() << 3)
+        return 20
+
+    def enable_interrupts(self) -> int:
+        """EI: interrupts are enabled once the next instruction is executed.
+        A DI executed meanwhile cancels it.
+        """
+        self.ime_pending = True
+        pc = self.pc
+        self.pc = (pc + 1) & 0xFFFF
+        cycles = OPCODES[self.read(pc)](self)
+        if self.ime_pending:
+            self.ime = True
+            self.ime_pending = False
+        return cycles
+
+    def halt(self) -> int:
+        """HALT: the CPU sleeps until an interrupt is pending."""
+        if not self.ime and self.interrupt_enable & self.interrupt_flag & 0x1F:
+            # The HALT bug: the CPU does not sleep, and the next byte is read twice
+            return OPCODES[self.read(self.pc)](self)
+        self.halted = True
+        return 0
+
+    def stop(self) -> int:
+        """STOP: very low power mode, until a button is pressed."""
+        self.stopped = True
+        self.halted = True
+        return 0
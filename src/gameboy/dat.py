@@ -0,0 +1,120 @@
+"""This is part of PyGameBoy, a Game Boy emulator written in Python 3.
+Source: https://github.com/BoboTiG/PyGameBoy
+
+ROM identification by hashes: duplicates detection, and matching against DAT files
+(No-Intro style XML files, listing known games and the hashes of their ROMs).
+Every ROM is read once: CRC32, MD5 and SHA-1 are computed in the same pass as the
+global checksum (see `Cartridge.checksums()`), then lookups are O(1).
+"""
+
+from __future__ import annotations
+
+from collections import defaultdict
+from typing import TYPE_CHECKING, NamedTuple
+from xml.etree import ElementTree as ET
+
+from .cartridge import Cartridge
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Iterator
+    from pathlib import Path
+
+__all__ = ("Dat", "HashIndex", "RomHashes", "hash_cartridge", "hash_file")
+
+# Hashes used to identify ROMs
+ALGORITHMS = ("crc32", "md5", "sha1")
+
+
+class RomHashes(NamedTuple):
+    """Hashes of a ROM, as lowercase hexadecimal strings."""
+
+    file: str
+    crc32: str
+    md5: str
+    sha1: str
+
+
+def hash_cartridge(cartridge: Cartridge) -> RomHashes:
+    """Compute all hashes of the *cartridge* ROM in a single pass."""
+    file = f"{cartridge.rom}:{cartridge.member}" if cartridge.member else str(cartridge.rom)
+    return RomHashes(file=file, **cartridge.checksums(*ALGORITHMS))
+
+
+def hash_file(file: Path) -> Iterator[RomHashes]:
+    """Compute hashes of the ROM *file*, or of all ROMs when it is a ZIP file."""
+    if file.suffix.lower() == ".zip":
+        for cartridge in Cartridge.iter_zip(file):
+            yield hash_cartridge(cartridge)
+    else:
+        # The ROM is streamed, not kept in memory
+        yield hash_cartridge(Cartridge(file, lazy=True))
+
+
+class HashIndex:
+    """In-memory index of ROMs keyed on their SHA-1."""
+
+    def __init__(self, hashes: Iterable[RomHashes] = ()) -> None:
+        self.roms: dict[str, list[RomHashes]] = defaultdict(list)
+        for rom in hashes:
+            self.add(rom)
+
+    def __len__(self) -> int:
+        return sum(len(roms) for roms in self.roms.values())
+
+    def __iter__(self) -> Iterator[RomHashes]:
+        for roms in self.roms.values():
+            yield from roms
+
+    @classmethod
+    def from_files(cls, files: Iterable[Path]) -> HashIndex:
+        """Index all ROMs of *files*."""
+        return cls(rom for file in files for rom in hash_file(file))
+
+    def add(self, rom: RomHashes) -> None:
+        """Index one more ROM."""
+        self.roms[rom.sha1].append(rom)
+
+    def duplicates(self) -> list[list[str]]:
+        """Return groups of files sharing the same ROM."""
+        return [[rom.file for rom in roms] for roms in self.roms.values() if len(roms) > 1]
+
+
+class Dat:
+    """Games listed in a DAT file, loaded once into dicts keyed on every hash."""
+
+    def __init__(self, file: Path) -> None:
+        self.name = ""
+        self.games: dict[str, dict[str, str]] = {algorithm: {} for algorithm in ALGORITHMS}
+
+        # DAT files are local files, chosen by the user
+        for _, element in ET.iterparse(file):  # noqa: S314
+            if element.tag == "name" and not self.name:
+                self.name = element.text or ""
+            elif element.tag == "game":
+                game = element.get("name", "")
+                for rom in element.iter("rom"):
+                    for algorithm in ALGORITHMS:
+                        if value := rom.get("crc" if algorithm == "crc32" else algorithm):
+                            self.games[algorithm][value.lower()] = game
+                # Keep memory low on big DAT files
+                element.clear()
+
+    def match(self, rom: RomHashes) -> str | None:
+        """Return the name of the game the *rom* belongs to, if it is known.
+        Stronger hashes are tried first, as some DAT entries lack them.
+        """
+        for algorithm in reversed(ALGORITHMS):
+            if game := self.games[algorithm].get(getattr(rom, algorithm)):
+                return game
+        return None
+
+    def match_all(self, index: HashIndex) -> tuple[dict[str, str], list[str]]:
+        """Match all ROMs of the *index*, return matching games by file, and unknown files."""
+        known = {}
+        unknown = []
+        for rom in index:
+            if game := self.match(rom):
+                known[rom.file] = game
+            else:
+                unknown.append(rom.file)
+        return known, unknown
@@ -0,0 +1,51 @@
+"""This is part of PyGameBoy, a Game Boy emulator written in Python 3.
+Source: https://github.com/BoboTiG/PyGameBoy
+
+OAM DMA: writing a page number to the DMA register copies 160 bytes from that page
+to the OAM, one byte per M-cycle.
+
+The copy is a single slice assignment from the source page, done right away: the OAM
+is not readable by the CPU until the transfer ends, so nobody can tell. The end of
+the transfer is an event of the scheduler.
+"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from . import offset
+
+if TYPE_CHECKING:
+    from .mmu import MMU
+
+__all__ = ("DMA",)
+
+# Bytes copied, and clock cycles the OAM stays busy
+OAM_SIZE = offset.OAM.stop - offset.OAM.start
+DMA_CYCLES = OAM_SIZE * 4
+
+
+class DMA:
+    """The OAM DMA controller."""
+
+    __slots__ = ("active", "mmu")
+
+    def __init__(self, mmu: MMU) -> None:
+        self.mmu = mmu
+        self.active = False
+
+    def start(self, page: int) -> None:
+        """Copy the source *page* to the OAM, pages from E0h are mirrors of the work RAM."""
+        mmu = self.mmu
+        source = mmu.read_pages[page - 0x20 if page >= 0xE0 else page]
+        if isinstance(source, memoryview):
+            data = source[:OAM_SIZE]
+        else:
+            data = memoryview(bytes(source[index] for index in range(OAM_SIZE)))
+        mmu.ppu.load_oam(data)
+        self.active = True
+        mmu.scheduler.schedule(mmu.cpu.cycles + DMA_CYCLES, self.end)
+
+    def end(self, _: int) -> None:
+        """The transfer ended, the OAM is accessible again."""
+        self.active = False
@@ -0,0 +1,141 @@
+"""This is part of PyGameBoy, a Game Boy emulator written in Python 3.
+Source: https://github.com/BoboTiG/PyGameBoy
+
+The whole system: the CPU, its memory map, and peripherals, driven by the cartridge.
+"""
+
+from __future__ import annotations
+
+from time import perf_counter
+from typing import TYPE_CHECKING, NamedTuple
+
+from .apu import APU
+from .battery import Battery
+from .blocks import BlockCache
+from .cpu import CPU, FREQUENCY
+from .mmu import MMU
+from .ppu import CYCLES_PER_FRAME, PPU
+from .scheduler import Scheduler
+from .timer import Timer
+
+if TYPE_CHECKING:
+    import sys
+    from pathlib import Path
+
+    if sys.version_info >= (3, 11):
+        from typing import Self
+    else:
+        from typing_extensions import Self
+
+    from .cartridge import Cartridge
+
+__all__ = ("CYCLES_PER_FRAME", "Emulator", "Report", "headless")
+
+# Frames per second
+FPS = FREQUENCY / CYCLES_PER_FRAME
+
+
+class Report(NamedTuple):
+    """Statistics of a headless run."""
+
+    frames: int  # Frames emulated
+    cycles: int  # Clock cycles emulated
+    seconds: float  # Wall-clock time
+
+    @property
+    def fps(self) -> float:
+        """Frames emulated per second of wall-clock time."""
+        return self.frames / self.seconds if self.seconds else 0.0
+
+    @property
+    def speed(self) -> float:
+        """The speed, relative to the real hardware."""
+        return self.fps / FPS
+
+
+class Emulator:
+    """A Game Boy (DMG) running the *cartridge*, without any display.
+    With *blocks*, the ROM code is translated into compiled basic blocks instead of
+    being interpreted instruction by instruction.
+    With a *sample_rate*, sound samples are synthesized (see `APU.samples()`).
+    With a *save_file*, the RAM of battery-backed cartridges is persisted there (see `close()`).
+    """
+
+    def __init__(
+        self,
+        cartridge: Cartridge,
+        *,
+        blocks: bool = False,
+        sample_rate: int = 0,
+        save_file: Path | str | None = None,
+    ) -> None:
+        self.cartridge = cartridge
+        self.cpu = CPU()
+        self.scheduler = Scheduler()
+        self.timer = Timer(self.cpu, self.scheduler)
+        self.ppu = PPU(self.cpu, self.scheduler)
+        self.apu = APU(self.cpu, self.scheduler, self.timer, sample_rate=sample_rate)
+        self.mmu = MMU(cartridge, self.cpu, self.timer, self.scheduler, self.ppu, self.apu)
+        self.blocks = BlockCache(self.cpu, self.mmu) if blocks else None
+        # Battery-backed cartridges without RAM, nor clock, have nothing to persist
+        persist = "BATTERY" in cartridge.type and (len(self.mmu.mbc.ram) or "TIMER" in cartridge.type)
+        self.battery = Battery(cartridge, self.mmu, save_file) if save_file and persist else None
+        self.cpu.idle = self.idle
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *_: object) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Write the battery-backed RAM back to the save file, if any."""
+        if self.battery is not None:
+            self.battery.close()
+
+    @property
+    def serial(self) -> bytes:
+        """Bytes sent through the serial port so far."""
+        return bytes(self.mmu.serial)
+
+    def run(self, cycles: int) -> None:
+        """Run the emulation for *cycles* clock cycles.
+        The CPU runs freely until the next deadline of the scheduler, the end of the run being one.
+        """
+        cpu = self.cpu
+        scheduler = self.scheduler
+        step = cpu.step if self.blocks is None else self.blocks.step
+        until = cpu.cycles + cycles
+        scheduler.schedule(until, self.pause)
+        while cpu.cycles < until:
+            while cpu.cycles < scheduler.deadline:
+                elapsed = step()
+                cpu.cycles += elapsed
+            scheduler.run(cpu.cycles)
+
+    def idle(self) -> int:
+        """The CPU is halted (or stopped): only an event may request an interrupt and wake it up,
+        the clock jumps right to the next one, by whole M-cycles.
+        """
+        return max(4, (self.scheduler.deadline - self.cpu.cycles + 3) & ~3)
+
+    def pause(self, _: int) -> None:
+        """The end of a run."""
+
+    def run_frames(self, frames: int) -> None:
+        """Run the emulation for *frames* frames."""
+        self.run(frames * CYCLES_PER_FRAME)
+
+
+def headless(
+    cartridge: Cartridge, *, frames: int = 0, cycles: int = 0, sampling: int = 1, blocks: bool = False
+) -> Report:
+    """Run the *cartridge* for *frames* frames, and *cycles* clock cycles, as fast as possible.
+    Only one frame out of *sampling* is rendered by the PPU, none with 0.
+    """
+    emulator = Emulator(cartridge, blocks=blocks)
+    emulator.ppu.sampling = sampling
+    cycles += frames * CYCLES_PER_FRAME
+    start = perf_counter()
+    emulator.run(cycles)
+    return Report(cycles // CYCLES_PER_FRAME, cycles, perf_counter() - start)
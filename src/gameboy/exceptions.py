@@ -29,3 +29,42 @@ class InvalidZipError(EmulationError):
 
     def __str__(self) -> str:
         return repr(self)
+
+
+class InvalidOpcodeError(EmulationError):
+    """The CPU has executed an illegal opcode, the real hardware would lock up."""
+
+    def __init__(self, opcode: int, address: int) -> None:
+        self.opcode = opcode
+        self.address = address
+        super().__init__(opcode, address)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}: illegal opcode {self.opcode:02X}h at {self.address:04X}h."
+
+    def __str__(self) -> str:
+        return repr(self)
+
+
+class UnsupportedCartridgeError(EmulationError):
+    """The memory bank controller of the cartridge is not emulated."""
+
+    def __init__(self, kind: str) -> None:
+        self.kind = kind
+        super().__init__(kind)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}: {self.kind} cartridges are not supported."
+
+    def __str__(self) -> str:
+        return repr(self)
+
+
+class InvalidStateError(EmulationError):
+    """The save state was not taken from the same machine (another cartridge, or another layout)."""
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}: the save state does not match the machine."
+
+    def __str__(self) -> str:
+        return repr(self)
@@ -0,0 +1,195 @@
+"""This is part of PyGameBoy, a Game Boy emulator written in Python 3.
+Source: https://github.com/BoboTiG/PyGameBoy
+
+The index is incremental: files are keyed on (path, size, mtime_ns), and ZIP files
+also on the CRC of their ROM members, as stored in the ZIP directory. Unchanged files
+are never reopened, so updating the index of a whole library costs a `stat()` per file.
+"""
+
+from __future__ import annotations
+
+import os
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import closing
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, NamedTuple
+from zipfile import BadZipFile, ZipFile
+
+from . import offset
+from .cartridge import SUFFIXES as ROM_SUFFIXES
+from .cartridge import Cartridge
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+
+__all__ = ("ScanResult", "evict", "find_roms", "inspect", "scan", "validity")
+
+# Default index file
+INDEX = "pygameboy.db"
+
+# Files that may contain a ROM
+SUFFIXES = (*ROM_SUFFIXES, ".zip")
+
+# Bump it when COLUMNS change: the index will be rebuilt from scratch
+VERSION = 3
+
+# Columns of the index, one row per ROM: (path, member) is the key
+COLUMNS = (
+    "path",
+    "member",
+    "size",
+    "mtime_ns",
+    "crc",
+    "title",
+    "cgb",
+    "sgb",
+    "type",
+    "rom_size",
+    "ram_size",
+    "destination",
+    "licensee",
+    "old_licensee",
+    "publisher",
+    "version",
+    "valid",
+    "valid_complete",
+    "header_checksum",
+    "global_checksum",
+    "error",
+)
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS roms (
+    {", ".join(COLUMNS)},
+    PRIMARY KEY (path, member)
+)
+"""
+
+
+class ScanResult(NamedTuple):
+    """Statistics of an index update."""
+
+    found: int  # ROM files found in the folder
+    parsed: int  # Files new or modified, that were (re)parsed
+    evicted: int  # Index entries of files that disappeared
+
+
+def find_roms(directory: Path) -> Iterator[Path]:
+    """Walk the *directory* tree and yield every file that may contain a ROM."""
+    for root, _, files in os.walk(directory):
+        for file in sorted(files):
+            if file.lower().endswith(SUFFIXES):
+                yield Path(root) / file
+
+
+def zip_crcs(file: Path) -> dict[str, int]:
+    """Return the CRC of every ROM member of the ZIP *file*, taken from the ZIP directory."""
+    with ZipFile(file) as zfile:
+        return {info.filename: info.CRC for info in zfile.infolist() if info.filename.lower().endswith(ROM_SUFFIXES)}
+
+
+def inspect(file: Path) -> list[dict[str, Any]]:
+    """Parse the ROM *file*, and return rows of the index (one per ROM of a ZIP file).
+    It is run in worker processes, so errors are part of the result instead of being raised.
+    """
+    base: dict[str, Any] = dict.fromkeys(COLUMNS)
+    base |= {"path": str(file), "member": "", "error": ""}
+    try:
+        # The file may have disappeared since it was found
+        stat = file.stat()
+        base |= {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+        if file.suffix.lower() != ".zip":
+            return [_row(base, Cartridge(file, lazy=True))]
+        crcs = zip_crcs(file)
+        return [_row(base, cartridge) | {"crc": crcs[cartridge.member]} for cartridge in Cartridge.iter_zip(file)]
+    except Exception as exc:  # noqa: BLE001
+        return [base | {"error": str(exc) or type(exc).__name__}]
+
+
+def _row(base: dict[str, Any], cartridge: Cartridge) -> dict[str, Any]:
+    """Fill an index row with the *cartridge* details."""
+    details = cartridge.parse()
+    row = base | {key: value for key, value in details._asdict().items() if key in base}
+    return row | {
+        "member": cartridge.member,
+        "header_checksum": cartridge.header[offset.HEADER_CHECKSUM],
+        "global_checksum": int.from_bytes(cartridge.header[offset.GLOBAL_CHECKSUM], "big"),
+    }
+
+
+def connect(index: Path) -> sqlite3.Connection:
+    """Open the SQLite *index*, and (re)create the table if needed."""
+    db = sqlite3.connect(index)
+    if db.execute("PRAGMA user_version").fetchone()[0] != VERSION:
+        db.execute("DROP TABLE IF EXISTS roms")
+        db.execute(f"PRAGMA user_version = {VERSION}")
+    db.execute(SCHEMA)
+    return db
+
+
+def evict(index: Path) -> int:
+    """Remove entries of files that disappeared from the *index*, return their count."""
+    with closing(connect(index)) as db, db:
+        paths = [path for (path,) in db.execute("SELECT DISTINCT path FROM roms") if not Path(path).is_file()]
+        db.executemany("DELETE FROM roms WHERE path = ?", ((path,) for path in paths))
+    return len(paths)
+
+
+def scan(directory: Path, index: Path, *, workers: int | None = None) -> ScanResult:
+    """Parse ROMs found in *directory* using a pool of *workers* processes (defaults
+    to the number of CPUs), and store their details into the SQLite *index*.
+    Only new and modified files are parsed, and entries of files that disappeared
+    from *directory* are evicted. Paths are stored resolved, however *directory* is given.
+    """
+    directory = directory.resolve()
+    with closing(connect(index)) as db, db:
+        known: dict[str, tuple[int, int, dict[str, int]]] = {}
+        for path, member, size, mtime_ns, crc in db.execute("SELECT path, member, size, mtime_ns, crc FROM roms"):
+            known.setdefault(path, (size, mtime_ns, {}))[2][member] = crc
+
+        jobs: list[Path] = []
+        found = set()
+        touch = "UPDATE roms SET size = ?, mtime_ns = ? WHERE path = ?"
+        for file in find_roms(directory):
+            found.add(path := str(file))
+            size, mtime_ns, crcs = known.get(path, (None, None, {}))
+            try:
+                stat = file.stat()
+                if (size, mtime_ns) == (stat.st_size, stat.st_mtime_ns):
+                    continue
+                if crcs and None not in crcs.values() and crcs == zip_crcs(file):
+                    # Only the ZIP file metadata changed, not its ROMs
+                    db.execute(touch, (stat.st_size, stat.st_mtime_ns, path))
+                    continue
+            except (OSError, BadZipFile):
+                # Removed, or corrupted, since: its inspection will report the error
+                pass
+            jobs.append(file)
+
+        gone = [(path,) for path in known if path not in found and Path(path).is_relative_to(directory)]
+        db.executemany("DELETE FROM roms WHERE path = ?", gone)
+
+        if jobs:
+            workers = workers or os.cpu_count() or 1
+            # Big enough chunks to amortize the inter-process communication
+            chunksize = max(1, len(jobs) // (4 * workers))
+            insert = f"INSERT INTO roms VALUES ({', '.join('?' * len(COLUMNS))})"  # noqa: S608
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                for file, rows in zip(jobs, pool.map(inspect, jobs, chunksize=chunksize), strict=True):
+                    db.execute("DELETE FROM roms WHERE path = ?", (str(file),))
+                    db.executemany(insert, (tuple(row.values()) for row in rows))
+
+    return ScanResult(found=len(found), parsed=len(jobs), evicted=len(gone))
+
+
+def validity(index: Path, directory: Path) -> Iterator[tuple[str, str, bool]]:
+    """Yield (path, member, valid) of all ROMs of *directory* stored in the *index*.
+    A ROM is valid when both its header and global checksums are correct.
+    """
+    directory = directory.resolve()
+    with closing(connect(index)) as db:
+        query = "SELECT path, member, valid AND valid_complete FROM roms ORDER BY path, member"
+        for path, member, valid in db.execute(query):
+            if Path(path).is_relative_to(directory):
+                yield path, member, bool(valid)
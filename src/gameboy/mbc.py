@@ -0,0 +1,313 @@
+"""This is part of PyGameBoy, a Game Boy emulator written in Python 3.
+Source: https://github.com/BoboTiG/PyGameBoy
+
+Memory bank controllers: writes to the ROM area are commands selecting which ROM bank
+is visible at 4000h-7FFFh, and which cartridge RAM bank at A000h-BFFFh.
+
+Banks are lists of pages, precomputed once: views on the cartridge data for the ROM,
+and on the cartridge RAM buffer. Switching a bank replaces page references in the
+page tables of the MMU, no byte is ever copied.
+"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from .cpu import FREQUENCY
+from .exceptions import UnsupportedCartridgeError
+from .memory import PAGE_SIZE, Handlers, pages
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+
+    from .cartridge import Cartridge
+    from .cpu import CPU
+    from .mmu import MMU
+
+__all__ = ("MBC", "MBC1", "MBC2", "MBC3", "MBC5", "RTC", "controller")
+
+ROM_BANK_SIZE = 0x4000
+RAM_BANK_SIZE = 0x2000
+ROM_BANK_PAGES = ROM_BANK_SIZE // PAGE_SIZE
+RAM_BANK_PAGES = RAM_BANK_SIZE // PAGE_SIZE
+
+
+def ram_size(cartridge: Cartridge) -> int:
+    """Size of the cartridge RAM, in bytes."""
+    return int(cartridge.ram_size.removesuffix("KB")) * 1024
+
+
+class MBC:
+    """No controller at all: ROM only cartridges of 32 KiB, with up to 8 KiB of RAM."""
+
+    def __init__(self, cartridge: Cartridge, mmu: MMU) -> None:
+        self.mmu = mmu
+
+        # The cartridge data is not copied, unless it has to be padded to whole banks
+        data: bytes | memoryview = cartridge.data
+        if len(data) < 2 * ROM_BANK_SIZE or len(data) % ROM_BANK_SIZE:
+            size = max(2 * ROM_BANK_SIZE, -(-len(data) // ROM_BANK_SIZE) * ROM_BANK_SIZE)
+            data = bytes(data).ljust(size, b"\xff")
+        self.rom = data
+        rom_pages = pages(data)
+        self.rom_banks = [
+            rom_pages[start : start + ROM_BANK_PAGES] for start in range(0, len(rom_pages), ROM_BANK_PAGES)
+        ]
+        self.rom_bank = 1
+        self.low_bank = 0
+
+        self.ram: bytearray | memoryview = bytearray()
+        self.ram_banks: list[Sequence[memoryview | Handlers]] = []
+        self.attach_ram(bytearray(ram_size(cartridge)))
+        self.ram_bank = 0
+
+        # Without a controller, there is nothing to enable
+        self.ram_enabled = type(self) is MBC
+
+    def attach_ram(self, ram: bytearray | memoryview) -> None:
+        """Use *ram* as the cartridge RAM (a memory-mapped save file), RAMs smaller than a bank are mirrored.
+        Banks are mapped again by the next call to `map_ram()`.
+        """
+        self.ram = ram
+        ram_pages = pages(ram)
+        if ram_pages:
+            ram_pages *= max(1, RAM_BANK_PAGES // len(ram_pages))
+        self.ram_banks = [
+            ram_pages[start : start + RAM_BANK_PAGES] for start in range(0, len(ram_pages), RAM_BANK_PAGES)
+        ]
+
+    def map(self) -> None:
+        """Plug the controller into the MMU."""
+        self.mmu.write_pages[: 2 * ROM_BANK_PAGES] = [
+            Handlers(page * PAGE_SIZE, self.mmu.read, self.write) for page in range(2 * ROM_BANK_PAGES)
+        ]
+        self.map_rom()
+        self.map_ram()
+
+    def map_rom(self) -> None:
+        """Map the current ROM banks."""
+        count = len(self.rom_banks)
+        self.low_bank %= count
+        self.rom_bank %= count
+        read_pages = self.mmu.read_pages
+        read_pages[:ROM_BANK_PAGES] = self.rom_banks[self.low_bank]
+        read_pages[ROM_BANK_PAGES : 2 * ROM_BANK_PAGES] = self.rom_banks[self.rom_bank]
+        if self.mmu.blocks is not None:
+            self.mmu.blocks.switch(self.rom_bank, fixed=self.low_bank)
+
+    def map_ram(self) -> None:
+        """Map the current cartridge RAM bank, if enabled."""
+        mmu = self.mmu
+        if self.ram_enabled and self.ram_banks:
+            bank = self.ram_banks[self.ram_bank % len(self.ram_banks)]
+            mmu.read_pages[0xA0:0xC0] = mmu.write_pages[0xA0:0xC0] = bank
+        else:
+            mmu.read_pages[0xA0:0xC0] = [mmu.open_bus] * RAM_BANK_PAGES
+            mmu.write_pages[0xA0:0xC0] = [mmu.sink] * RAM_BANK_PAGES
+
+    def write(self, address: int, value: int) -> None:
+        """Writes to the ROM area are commands, there is no register here."""
+
+
+class MBC1(MBC):
+    """Up to 2 MiB of ROM, and 32 KiB of RAM. The 2-bit register selects either the upper bits
+    of the ROM bank, or the RAM bank (and the ROM bank mapped at 0000h-3FFFh) in advanced mode.
+    """
+
+    def __init__(self, cartridge: Cartridge, mmu: MMU) -> None:
+        super().__init__(cartridge, mmu)
+        self.bank1 = 1
+        self.bank2 = 0
+        self.mode = 0
+
+    def write(self, address: int, value: int) -> None:
+        if address < 0x2000:
+            self.ram_enabled = value & 0x0F == 0x0A
+            self.map_ram()
+            return
+        if address < 0x4000:
+            self.bank1 = value & 0x1F or 1
+        elif address < 0x6000:
+            self.bank2 = value & 0x03
+        else:
+            self.mode = value & 0x01
+        self.rom_bank = (self.bank2 << 5) | self.bank1
+        self.low_bank = self.bank2 << 5 if self.mode else 0
+        self.ram_bank = self.bank2 if self.mode else 0
+        self.map_rom()
+        self.map_ram()
+
+
+class MBC2(MBC):
+    """Up to 256 KiB of ROM, and a built-in RAM of 512 half-bytes. Bit 8 of the address
+    tells the ROM bank register from the RAM enable one.
+    """
+
+    def __init__(self, cartridge: Cartridge, mmu: MMU) -> None:
+        super().__init__(cartridge, mmu)
+        self.attach_ram(bytearray(0x200))
+
+    def attach_ram(self, ram: bytearray | memoryview) -> None:
+        self.ram = ram
+        self.ram_banks = [[Handlers(page * PAGE_SIZE, self.read_ram, self.write_ram) for page in range(0xA0, 0xC0)]]
+
+    def write(self, address: int, value: int) -> None:
+        if address >= 0x4000:
+            return
+        if address & 0x100:
+            self.rom_bank = value & 0x0F or 1
+            self.map_rom()
+        else:
+            self.ram_enabled = value & 0x0F == 0x0A
+            self.map_ram()
+
+    def read_ram(self, address: int) -> int:
+        """Only the lower half of bytes is stored, the RAM is mirrored over the whole area."""
+        return 0xF0 | self.ram[address & 0x1FF]
+
+    def write_ram(self, address: int, value: int) -> None:
+        """Only the lower half of bytes is stored, the RAM is mirrored over the whole area."""
+        self.ram[address & 0x1FF] = value & 0x0F
+
+
+class RTC:
+    """The real time clock of MBC3 cartridges, running on the emulated time.
+    Registers are seconds, minutes, hours, the lower 8 bits of the days counter,
+    and the upper one along with the halt and day carry flags. They are read latched.
+    """
+
+    __slots__ = ("carry", "cpu", "cycles", "halted", "latched", "origin")
+
+    def __init__(self, cpu: CPU) -> None:
+        self.cpu = cpu
+        self.cycles = 0  # Elapsed time, in clock cycles, when the clock was last set
+        self.origin = cpu.cycles  # The emulated time at that moment
+        self.halted = False
+        self.carry = False
+        self.latched = bytes(5)
+
+    @property
+    def seconds(self) -> int:
+        """Seconds elapsed since day 0."""
+        cycles = self.cycles if self.halted else self.cycles + self.cpu.cycles - self.origin
+        return cycles // FREQUENCY
+
+    def registers(self) -> bytes:
+        """The current values of registers."""
+        minutes, seconds = divmod(self.seconds, 60)
+        hours, minutes = divmod(minutes, 60)
+        days, hours = divmod(hours, 24)
+        if days > 0x1FF:
+            # The day counter overflowed, the flag is sticky
+            self.carry = True
+            days &= 0x1FF
+            self.set(seconds, minutes, hours, days)
+        return bytes((seconds, minutes, hours, days & 0xFF, days >> 8 | self.halted << 6 | self.carry << 7))
+
+    def set(self, seconds: int, minutes: int, hours: int, days: int) -> None:
+        """Set the clock."""
+        self.cycles = (((days * 24 + hours) * 60 + minutes) * 60 + seconds) * FREQUENCY
+        self.origin = self.cpu.cycles
+
+    def latch(self) -> None:
+        """Make current values of registers readable."""
+        self.latched = self.registers()
+
+    def write(self, register: int, value: int) -> None:
+        """Write the *register*, from 0 (seconds) to 4 (upper day bit and flags)."""
+        seconds, minutes, hours, days_low, days_high = self.registers()
+        days = (days_high & 0x01) << 8 | days_low
+        match register:
+            case 0:
+                seconds = value & 0x3F
+            case 1:
+                minutes = value & 0x3F
+            case 2:
+                hours = value & 0x1F
+            case 3:
+                days = (days & 0x100) | value
+            case _:
+                days = (value & 0x01) << 8 | (days & 0xFF)
+                self.carry = bool(value & 0x80)
+                self.halted = bool(value & 0x40)
+        self.set(seconds, minutes, hours, days)
+
+
+class MBC3(MBC):
+    """Up to 2 MiB of ROM, 32 KiB of RAM, and a real time clock whose registers are
+    selected like RAM banks.
+    """
+
+    def __init__(self, cartridge: Cartridge, mmu: MMU) -> None:
+        super().__init__(cartridge, mmu)
+        self.rtc = RTC(mmu.cpu)
+        self.rtc_pages = [Handlers(page * PAGE_SIZE, self.read_rtc, self.write_rtc) for page in range(0xA0, 0xC0)]
+        self.latch = 0xFF
+
+    def map_ram(self) -> None:
+        if self.ram_enabled and self.ram_bank >= 0x08:
+            mmu = self.mmu
+            mmu.read_pages[0xA0:0xC0] = mmu.write_pages[0xA0:0xC0] = self.rtc_pages
+        else:
+            super().map_ram()
+
+    def write(self, address: int, value: int) -> None:
+        if address < 0x2000:
+            self.ram_enabled = value & 0x0F == 0x0A
+            self.map_ram()
+        elif address < 0x4000:
+            self.rom_bank = value & 0x7F or 1
+            self.map_rom()
+        elif address < 0x6000:
+            if value < 0x04 or 0x08 <= value <= 0x0C:
+                self.ram_bank = value
+                self.map_ram()
+        else:
+            # Writing 0, then 1, latches the clock
+            if self.latch == 0x00 and value == 0x01:
+                self.rtc.latch()
+            self.latch = value
+
+    def read_rtc(self, _: int) -> int:
+        """Read the selected RTC register."""
+        return self.rtc.latched[self.ram_bank - 0x08]
+
+    def write_rtc(self, _: int, value: int) -> None:
+        """Write the selected RTC register."""
+        self.rtc.write(self.ram_bank - 0x08, value)
+
+
+class MBC5(MBC):
+    """Up to 8 MiB of ROM with a 9-bit ROM bank register (bank 0 included), and 128 KiB of RAM."""
+
+    def write(self, address: int, value: int) -> None:
+        if address < 0x2000:
+            self.ram_enabled = value & 0x0F == 0x0A
+            self.map_ram()
+        elif address < 0x3000:
+            self.rom_bank = (self.rom_bank & 0x100) | value
+            self.map_rom()
+        elif address < 0x4000:
+            self.rom_bank = (value & 0x01) << 8 | (self.rom_bank & 0xFF)
+            self.map_rom()
+        elif address < 0x6000:
+            self.ram_bank = value & 0x0F
+            self.map_ram()
+
+
+# Controllers, by the first part of the cartridge type
+CONTROLLERS: dict[str, type[MBC]] = {
+    "ROM ONLY": MBC,
+    "ROM": MBC,
+    "MBC1": MBC1,
+    "MBC2": MBC2,
+    "MBC3": MBC3,
+    "MBC5": MBC5,
+}
+
+
+def controller(cartridge: Cartridge, mmu: MMU) -> MBC:
+    """The memory bank controller of the *cartridge*."""
+    if not (cls := CONTROLLERS.get(cartridge.type.split("+")[0])):
+        raise UnsupportedCartridgeError(cartridge.type)
+    return cls(cartridge, mmu)
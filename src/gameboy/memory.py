@@ -0,0 +1,43 @@
+"""This is part of PyGameBoy, a Game Boy emulator written in Python 3.
+Source: https://github.com/BoboTiG/PyGameBoy
+
+Pages of 256 bytes, the building blocks of the memory map: views on buffers for
+plain memory, and handlers for memory holding registers.
+"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+__all__ = ("OPEN_BUS", "PAGE_SIZE", "Handlers", "pages")
+
+PAGE_SIZE = 0x100
+
+# Unmapped memory reads as 0xFF, and writes are ignored
+OPEN_BUS = bytes([0xFF] * PAGE_SIZE)
+
+
+def pages(buffer: bytes | bytearray | memoryview) -> list[memoryview]:
+    """Split a *buffer* into pages, without copying it."""
+    view = memoryview(buffer)
+    return [view[start : start + PAGE_SIZE] for start in range(0, len(view), PAGE_SIZE)]
+
+
+class Handlers:
+    """A page whose accesses are routed to callbacks, with the full address."""
+
+    __slots__ = ("base", "reader", "writer")
+
+    def __init__(self, base: int, reader: Callable[[int], int], writer: Callable[[int, int], None]) -> None:
+        self.base = base
+        self.reader = reader
+        self.writer = writer
+
+    def __getitem__(self, index: int) -> int:
+        return self.reader(self.base | index)
+
+    def __setitem__(self, index: int, value: int) -> None:
+        self.writer(self.base | index, value)
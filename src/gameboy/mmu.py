@@ -0,0 +1,261 @@
+"""This is part of PyGameBoy, a Game Boy emulator written in Python 3.
+Source: https://github.com/BoboTiG/PyGameBoy
+
+The memory map, as seen by the CPU.
+
+The 64 KiB address space is split into 256 pages of 256 bytes, and every access goes
+through a page table: one for reads, one for writes. Pages of plain memory are views
+on preallocated buffers, so an access is two subscripts and no branch at all. Only
+pages holding registers (MBC, I/O) are `Handlers` pages, routing accesses to callbacks.
+Remapping memory (ROM banks, cartridge RAM enabling) is done by the memory bank
+controller of the cartridge, replacing pages.
+"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from . import offset
+from .cpu import SERIAL
+from .dma import DMA
+from .mbc import controller
+from .memory import OPEN_BUS, PAGE_SIZE, Handlers, pages
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+    from .apu import APU
+    from .blocks import BlockCache
+    from .cartridge import Cartridge
+    from .cpu import CPU
+    from .ppu import PPU
+    from .scheduler import Scheduler
+    from .timer import Timer
+
+__all__ = ("MMU", "HighPage")
+
+# Clock cycles to transfer a byte through the serial port, at 8192 Hz
+SERIAL_CYCLES = 8 * 512
+
+# Bits of I/O registers always read as 1, unused registers read as 0xFF
+# (P1 also reads as no button pressed)
+IO_UNUSED_BITS = bytes.fromhex(
+    "cf007eff000000f8ffffffffffffffe0"  # FF00: P1, serial, timer, IF
+    "803f00ffbfff3f00ffbf7fff9fffbfff"  # FF10: sound
+    "ff0000bf000070ffffffffffffffffff"  # FF20: sound
+    "00000000000000000000000000000000"  # FF30: wave pattern
+    "00800000000000000000000000ffffff"  # FF40: LCD
+    "ffffffffffffffffffffffffffffffff"  # FF50
+    "ffffffffffffffffffffffffffffffff"  # FF60
+    "ffffffffffffffffffffffffffffffff"  # FF70
+)
+
+
+class HighPage:
+    """The last page: I/O registers, HRAM, and IE. HRAM is accessed directly, it is as hot as the work RAM."""
+
+    __slots__ = ("hram", "mmu")
+
+    def __init__(self, mmu: MMU) -> None:
+        self.mmu = mmu
+        self.hram = mmu.hram
+
+    def __getitem__(self, index: int) -> int:
+        if 0x80 <= index < 0xFF:
+            return self.hram[index - 0x80]
+        return self.mmu.read_high(0xFF00 | index)
+
+    def __setitem__(self, index: int, value: int) -> None:
+        if 0x80 <= index < 0xFF:
+            self.hram[index - 0x80] = value
+        else:
+            self.mmu.write_high(0xFF00 | index, value)
+
+
+Page = memoryview | Handlers | HighPage
+
+
+class MMU:
+    """Route memory accesses of the CPU to the cartridge, RAMs, and I/O registers."""
+
+    def __init__(  # noqa: PLR0913
+        self,
+        cartridge: Cartridge,
+        cpu: CPU,
+        timer: Timer,
+        scheduler: Scheduler,
+        ppu: PPU,
+        apu: APU,
+    ) -> None:
+        self.cpu = cpu
+        self.timer = timer
+        self.scheduler = scheduler
+        self.ppu = ppu
+        self.apu = apu
+
+        self.wram = bytearray(offset.WRAM.stop - offset.WRAM.start)
+        self.hram = bytearray(offset.HRAM.stop - offset.HRAM.start)
+        self.io = bytearray(0x80)
+
+        # Bytes sent through the serial port
+        self.serial = bytearray()
+
+        self.dma = DMA(self)
+
+        # Compiled blocks, if any, are told about ROM bank switches
+        self.blocks: BlockCache | None = None
+
+        # Pages of every region
+        self.wram_pages = pages(self.wram)
+        self.open_bus = memoryview(OPEN_BUS)
+        self.sink = memoryview(bytearray(PAGE_SIZE))
+        vram = [Handlers(page * PAGE_SIZE, self.read, ppu.write_vram) for page in range(0x80, 0xA0)]
+        oam = Handlers(0xFE00, self.read_oam, self.write_oam)
+        high = HighPage(self)
+
+        # The page tables, the echo RAM mirrors the work RAM, the cartridge areas are
+        # mapped by its controller
+        self.read_pages: list[Page] = [
+            *[self.open_bus] * 0x80,
+            *pages(ppu.vram),
+            *[self.open_bus] * 0x20,
+            *self.wram_pages,
+            *self.wram_pages[:0x1E],
+            oam,
+            high,
+        ]
+        self.write_pages: list[Page] = [
+            *[self.sink] * 0x80,
+            *vram,
+            *[self.sink] * 0x20,
+            *self.wram_pages,
+            *self.wram_pages[:0x1E],
+            oam,
+            high,
+        ]
+        self.mbc = controller(cartridge, self)
+        self.mbc.map()
+
+        cpu.read = self.read
+        cpu.write = self.write
+
+    def read(self, address: int) -> int:
+        """Read a byte."""
+        return self.read_pages[address >> 8][address & 0xFF]
+
+    def write(self, address: int, value: int) -> None:
+        """Write a byte."""
+        self.write_pages[address >> 8][address & 0xFF] = value
+
+    def watch(self, page: int, callback: Callable[[int], None]) -> None:
+        """Call *callback* with the work RAM offset, on every write to the work RAM *page*."""
+        buffer = self.wram_pages[page]
+        base = page << 8
+
+        def write(address: int, value: int) -> None:
+            buffer[address & 0xFF] = value
+            callback(base | (address & 0xFF))
+
+        handlers = Handlers(0xC000 | base, self.read, write)
+        self.write_pages[0xC0 + page] = handlers
+        if page < 0x1E:
+            self.write_pages[0xE0 + page] = handlers
+
+    def unwatch(self, page: int) -> None:
+        """Stop watching writes to the work RAM *page*."""
+        self.write_pages[0xC0 + page] = self.wram_pages[page]
+        if page < 0x1E:
+            self.write_pages[0xE0 + page] = self.wram_pages[page]
+
+    def read_oam(self, address: int) -> int:
+        """Read the OAM, the rest of the page is not usable. So is the OAM during DMA."""
+        return self.ppu.oam[address - 0xFE00] if address < 0xFEA0 and not self.dma.active else 0xFF
+
+    def write_oam(self, address: int, value: int) -> None:
+        """Write the OAM, the rest of the page is not usable. So is the OAM during DMA."""
+        if address < 0xFEA0 and not self.dma.active:
+            self.ppu.write_oam(address, value)
+
+    def read_high(self, address: int) -> int:
+        """Read I/O registers, or IE."""
+        if address < 0xFF80:
+            return self.read_io(address)
+        return self.cpu.interrupt_enable
+
+    def write_high(self, address: int, value: int) -> None:
+        """Write I/O registers, or IE."""
+        if address < 0xFF80:
+            self.write_io(address, value)
+        else:
+            self.cpu.interrupt_enable = value
+
+    def read_io(self, address: int) -> int:
+        """Read an I/O register."""
+        if offset.NR10 <= address < offset.WAVE.stop:
+            return self.apu.read(address)
+        match address:
+            case offset.DIV | offset.TIMA | offset.TMA | offset.TAC:
+                return self.timer.read(address)
+            case offset.IF:
+                return self.cpu.interrupt_flag | 0xE0
+            case (
+                offset.LCDC
+                | offset.STAT
+                | offset.SCY
+                | offset.SCX
+                | offset.LY
+                | offset.LYC
+                | offset.BGP
+                | offset.OBP0
+                | offset.OBP1
+                | offset.WY
+                | offset.WX
+            ):
+                return self.ppu.read(address)
+        return self.io[address & 0x7F] | IO_UNUSED_BITS[address & 0x7F]
+
+    def write_io(self, address: int, value: int) -> None:
+        """Write an I/O register."""
+        if offset.NR10 <= address < offset.WAVE.stop:
+            self.apu.write(address, value)
+            return
+        match address:
+            case offset.SC:
+                if value & 0x81 == 0x81:
+                    # Only transfers using the internal clock end, nobody is connected
+                    self.scheduler.schedule(self.cpu.cycles + SERIAL_CYCLES, self.transferred)
+            case offset.DIV:
+                self.apu.reset_div()
+                self.timer.write(address, value)
+                return
+            case offset.TIMA | offset.TMA | offset.TAC:
+                self.timer.write(address, value)
+                return
+            case offset.IF:
+                self.cpu.interrupt_flag = value & 0x1F
+            case offset.DMA:
+                self.dma.start(value)
+            case offset.LY:
+                return
+            case (
+                offset.LCDC
+                | offset.STAT
+                | offset.SCY
+                | offset.SCX
+                | offset.LYC
+                | offset.BGP
+                | offset.OBP0
+                | offset.OBP1
+                | offset.WY
+                | offset.WX
+            ):
+                self.ppu.write(address, value)
+                return
+        self.io[address & 0x7F] = value
+
+    def transferred(self, _: int) -> None:
+        """A byte was sent through the serial port, and 0xFF received."""
+        self.serial.append(self.io[offset.SB & 0x7F])
+        self.io[offset.SB & 0x7F] = 0xFF
+        self.io[offset.SC & 0x7F] &= 0x7F
+        self.cpu.interrupt_flag |= SERIAL
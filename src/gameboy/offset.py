@@ -15,6 +15,9 @@ RST = slice(0x000, 0x100)
 # the used MBC chip, the ROM and RAM sizes, etc. Most of the bytes in this area
 # are required to be specified correctly.
 
+# All the header properties are read from there
+HEADER = slice(0x100, 0x150)
+
 # 0100-0103 - Entry Point
 # After displaying the Nintendo Logo, the built-in boot procedure jumps to this
 # address (100h), which should then jump to the actual main program in the
@@ -72,7 +75,16 @@ OAM = slice(0xFE00, 0xFE9F + 1)  # Sprite attribute table
 HRAM = slice(0xFF80, 0xFFFE + 1)  # High RAM
 
 # I/O ports
-P1, SB, SC, DIV, TIMA, TMA, TAC = range(0xFF00, 0xFF07)
+P1, SB, SC = range(0xFF00, 0xFF03)  # Joypad, and serial transfer
+DIV, TIMA, TMA, TAC = range(0xFF04, 0xFF08)  # Timer
+IF = 0xFF0F  # Interrupt flag
+NR10, NR11, NR12, NR13, NR14 = range(0xFF10, 0xFF15)  # Sound channel 1: square, with sweep
+NR21, NR22, NR23, NR24 = range(0xFF16, 0xFF1A)  # Sound channel 2: square
+NR30, NR31, NR32, NR33, NR34 = range(0xFF1A, 0xFF1F)  # Sound channel 3: wave
+NR41, NR42, NR43, NR44 = range(0xFF20, 0xFF24)  # Sound channel 4: noise
+NR50, NR51, NR52 = range(0xFF24, 0xFF27)  # Master volume, panning, and sound on/off
+WAVE = slice(0xFF30, 0xFF3F + 1)  # Wave pattern RAM
+LCDC, STAT, SCY, SCX, LY, LYC, DMA, BGP, OBP0, OBP1, WY, WX = range(0xFF40, 0xFF4C)
 
 # Interrupt enable register
 IE = 0xFFFF
@@ -0,0 +1,374 @@
+"""This is part of PyGameBoy, a Game Boy emulator written in Python 3.
+Source: https://github.com/BoboTiG/PyGameBoy
+
+The PPU: LY and the mode of the LCD are derived from the clock, only interrupts are
+events of the scheduler (VBlank, and STAT sources when enabled).
+
+Lines are not rendered one by one, at the pace of the LCD: lines drawn so far are
+rendered in a single NumPy pass, either at VBlank, or right before a change (to a
+register, the VRAM, or the OAM) that would have affected them. Most of the time,
+the whole frame is rendered at once. When only some frames are sampled, pixels of
+other ones are not rendered at all.
+"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from . import offset
+from .cpu import STAT, VBLANK
+
+if TYPE_CHECKING:
+    from .cpu import CPU
+    from .scheduler import Scheduler
+
+__all__ = ("CYCLES_PER_FRAME", "HEIGHT", "PPU", "WIDTH")
+
+WIDTH, HEIGHT = 160, 144
+
+# A line is 456 clock cycles: OAM scan (mode 2), drawing (mode 3), and HBlank (mode 0).
+# A frame is 144 visible lines, and 10 lines of VBlank (mode 1).
+LINE_CYCLES = 456
+LINES = 154
+CYCLES_PER_FRAME = LINES * LINE_CYCLES
+OAM_SCAN_END = 80
+DRAWING_END = OAM_SCAN_END + 172
+
+# LCDC bits
+LCD_ENABLE = 0x80
+WINDOW_MAP = 0x40
+WINDOW_ENABLE = 0x20
+TILE_DATA = 0x10
+BG_MAP = 0x08
+OBJ_SIZE = 0x04
+OBJ_ENABLE = 0x02
+BG_ENABLE = 0x01
+
+# STAT interrupt sources, by mode, and the LY=LYC one
+STAT_SOURCES = (0x08, 0x10, 0x20, 0x00)
+STAT_LYC = 0x40
+
+# Plain registers, by address
+REGISTERS = {
+    offset.LCDC: "lcdc",
+    offset.SCY: "scy",
+    offset.SCX: "scx",
+    offset.LYC: "lyc",
+    offset.BGP: "bgp",
+    offset.OBP0: "obp0",
+    offset.OBP1: "obp1",
+    offset.WY: "wy",
+    offset.WX: "wx",
+}
+
+# Sprites per line, at most
+OBJ_PER_LINE = 10
+
+# Tiles of the tile data area (8000h-97FFh), 16 bytes each
+TILES = 384
+
+# Bit of each pixel in a tile row byte, from left to right
+BITS: np.ndarray = np.arange(7, -1, -1, dtype=np.uint8)
+COLUMNS = np.arange(WIDTH)
+VISIBLE_LINES = np.arange(HEIGHT)
+
+
+class PPU:
+    """LCD registers, the VRAM, the OAM, and the framebuffer of shades (0 is white, 3 is black)."""
+
+    def __init__(self, cpu: CPU, scheduler: Scheduler) -> None:
+        self.cpu = cpu
+        self.scheduler = scheduler
+
+        self.vram = bytearray(offset.VRAM.stop - offset.VRAM.start)
+        self.oam = bytearray(offset.OAM.stop - offset.OAM.start)
+        self.tiles = np.frombuffer(self.vram, dtype=np.uint8)
+        self.sprites = np.frombuffer(self.oam, dtype=np.uint8).reshape(40, 4)
+        # Colors of pixels of every tile, decoded again only when its 16 bytes are written
+        self.decoded: np.ndarray = np.zeros((TILES, 8, 8), dtype=np.uint8)
+        self.dirty: set[int] = set()
+        # Sprites selected on every visible line, and their drawing order, indexed again only when the OAM changes
+        self.selection: tuple[np.ndarray, np.ndarray] | None = None
+        self.frame: np.ndarray = np.zeros((HEIGHT, WIDTH), dtype=np.uint8)
+        self.frames = 0
+        # Only one frame out of that many is rendered (none with 0), pixels of other ones are skipped
+        self.sampling = 1
+
+        # Registers, as left by the DMG boot ROM
+        self.lcdc = 0x91
+        self.stat = 0x00  # Interrupt sources only, the rest is derived from the clock
+        self.scy = self.scx = 0
+        self.lyc = 0
+        self.bgp = 0xFC
+        self.obp0 = self.obp1 = 0xFF
+        self.wy = self.wx = 0
+
+        # The LCD was turned on at that clock cycle
+        self.origin = cpu.cycles
+        # Visible lines rendered since then, and the internal line counter of the window
+        self.rendered = 0
+        self.window_line = 0
+        # The level of the STAT interrupt line, interrupts are requested on rising edges
+        self.stat_line = False
+
+        self.scheduler.schedule(self.origin + HEIGHT * LINE_CYCLES, self.vblank)
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.lcdc & LCD_ENABLE)
+
+    def position(self, cycle: int) -> tuple[int, int]:
+        """The line, and the cycle in that line, at *cycle*."""
+        line, dot = divmod((cycle - self.origin) % CYCLES_PER_FRAME, LINE_CYCLES)
+        return line, dot
+
+    def mode(self, line: int, dot: int) -> int:
+        """The mode of the LCD at that position."""
+        if line >= HEIGHT:
+            return 1
+        if dot < OAM_SCAN_END:
+            return 2
+        return 3 if dot < DRAWING_END else 0
+
+    def read(self, address: int) -> int:
+        """Read a register."""
+        match address:
+            case offset.STAT:
+                if not self.enabled:
+                    return 0x80 | self.stat
+                line, dot = self.position(self.cpu.cycles)
+                return 0x80 | self.stat | (line == self.lyc) << 2 | self.mode(line, dot)
+            case offset.LY:
+                return self.position(self.cpu.cycles)[0] if self.enabled else 0
+        value: int = getattr(self, REGISTERS[address])
+        return value
+
+    def write(self, address: int, value: int) -> None:
+        """Write a register, lines drawn so far are rendered with former values."""
+        self.flush()
+        match address:
+            case offset.LCDC:
+                self.switch(value)
+            case offset.STAT:
+                self.stat = value & 0x78
+                self.update_stat(self.cpu.cycles)
+            case offset.LYC:
+                self.lyc = value
+                self.update_stat(self.cpu.cycles)
+            case _:
+                setattr(self, REGISTERS[address], value)
+
+    def switch(self, lcdc: int) -> None:
+        """Write LCDC, turning the LCD off stops the PPU, turning it on starts a new frame."""
+        enabled = self.enabled
+        if (self.lcdc ^ lcdc) & OBJ_SIZE:
+            self.selection = None
+        self.lcdc = lcdc
+        if enabled == self.enabled:
+            return
+        if not self.enabled:
+            self.scheduler.cancel(self.vblank)
+            self.scheduler.cancel(self.stat_event)
+            self.frame.fill(0)
+            return
+        self.origin = self.cpu.cycles
+        self.rendered = 0
+        self.window_line = 0
+        self.scheduler.schedule(self.origin + HEIGHT * LINE_CYCLES, self.vblank)
+        self.update_stat(self.origin)
+
+    def write_vram(self, address: int, value: int) -> None:
+        """Write the VRAM, lines drawn so far are rendered with former tiles."""
+        address &= 0x1FFF
+        if self.vram[address] == value:
+            return
+        self.flush()
+        self.vram[address] = value
+        if address < TILES * 16:
+            self.dirty.add(address >> 4)
+
+    def decode(self) -> None:
+        """Decode tiles written since the last time."""
+        indexes = np.fromiter(self.dirty, dtype=np.intp, count=len(self.dirty))
+        self.dirty.clear()
+        data = self.tiles[: TILES * 16].reshape(TILES, 8, 2)[indexes]
+        low = (data[:, :, 0, None] >> BITS) & 1
+        high = (data[:, :, 1, None] >> BITS) & 1
+        self.decoded[indexes] = low | high << 1
+
+    def write_oam(self, address: int, value: int) -> None:
+        """Write the OAM, lines drawn so far are rendered with former sprites."""
+        address &= 0xFF
+        if self.oam[address] == value:
+            return
+        self.flush()
+        self.oam[address] = value
+        self.selection = None
+
+    def load_oam(self, data: memoryview) -> None:
+        """Replace the whole OAM (by DMA), lines drawn so far are rendered with former sprites."""
+        if self.oam == data:
+            return
+        self.flush()
+        self.oam[:] = data
+        self.selection = None
+
+    def vblank(self, cycle: int) -> None:
+        """The last visible line was drawn."""
+        self.flush()
+        self.frames += 1
+        self.cpu.interrupt_flag |= VBLANK
+        self.scheduler.schedule(cycle + CYCLES_PER_FRAME, self.vblank)
+
+    def stat_level(self, cycle: int) -> bool:
+        """The level of the STAT interrupt line at *cycle*."""
+        line, dot = self.position(cycle)
+        mode = self.mode(line, dot)
+        return bool(self.stat & STAT_SOURCES[mode]) or bool(self.stat & STAT_LYC and line == self.lyc)
+
+    def update_stat(self, cycle: int) -> None:
+        """Check the STAT interrupt line at *cycle*, and schedule the next check if any source is enabled."""
+        if not self.enabled:
+            return
+        level = self.stat_level(cycle)
+        if level and not self.stat_line:
+            self.cpu.interrupt_flag |= STAT
+        self.stat_line = level
+        if not self.stat:
+            self.scheduler.cancel(self.stat_event)
+            return
+        # The next change of mode, or of line
+        line, dot = self.position(cycle)
+        if line < HEIGHT and dot < OAM_SCAN_END:
+            step = OAM_SCAN_END - dot
+        elif line < HEIGHT and dot < DRAWING_END:
+            step = DRAWING_END - dot
+        else:
+            step = LINE_CYCLES - dot
+        self.scheduler.schedule(cycle + step, self.stat_event)
+
+    def stat_event(self, cycle: int) -> None:
+        """The mode, or the line, changed."""
+        self.update_stat(cycle)
+
+    def drawn(self) -> int:
+        """Visible lines drawn since the LCD was turned on."""
+        frame, dots = divmod(self.cpu.cycles - self.origin, CYCLES_PER_FRAME)
+        line, dot = divmod(dots, LINE_CYCLES)
+        return frame * HEIGHT + min(HEIGHT, line + (dot >= DRAWING_END))
+
+    def flush(self) -> None:
+        """Render lines drawn since the last time."""
+        if not self.enabled or (drawn := self.drawn()) <= self.rendered:
+            return
+        index = (drawn - 1) // HEIGHT
+        base = index * HEIGHT
+        first = max(self.rendered, base) - base
+        if first == 0:
+            self.window_line = 0
+        if self.sampling and index % self.sampling == 0:
+            self.render(first, drawn - base)
+        self.rendered = drawn
+
+    def render(self, first: int, last: int) -> None:
+        """Render lines from *first* to *last* (excluded) into the framebuffer."""
+        if self.dirty:
+            self.decode()
+        lines = np.arange(first, last)
+        lcdc = self.lcdc
+
+        # Background, and window: colors before palette mapping, as sprites priority depends on them
+        colors: np.ndarray = np.zeros((len(lines), WIDTH), dtype=np.uint8)
+        if lcdc & BG_ENABLE:
+            rows = (lines + self.scy) & 0xFF
+            columns = (COLUMNS + self.scx) & 0xFF
+            colors[:] = self.tile_pixels(lcdc & BG_MAP, rows[:, None], columns[None, :])
+            if lcdc & WINDOW_ENABLE and self.wx <= 166:
+                self.render_window(lines, colors)
+
+        if lcdc & BG_ENABLE:
+            shades = np.array([(self.bgp >> (2 * color)) & 3 for color in range(4)], dtype=np.uint8)[colors]
+        else:
+            # White, whatever the palette says: colors stay 0 for sprites priority
+            shades = np.zeros_like(colors)
+        if lcdc & OBJ_ENABLE:
+            self.render_sprites(lines, colors, shades)
+        self.frame[first:last] = shades
+
+    def tile_pixels(self, tile_map: int, rows: np.ndarray, columns: np.ndarray) -> np.ndarray:
+        """Colors of pixels of the background (or the window) *tile_map*, at *rows* and *columns*."""
+        base = 0x1C00 if tile_map else 0x1800
+        tiles = self.tiles[base : base + 0x400].reshape(32, 32)[rows >> 3, columns >> 3]
+        indexes = tiles.astype(np.intp) if self.lcdc & TILE_DATA else tiles.view(np.int8).astype(np.intp) + 0x100
+        pixels: np.ndarray = self.decoded[indexes, rows & 7, columns & 7]
+        return pixels
+
+    def render_window(self, lines: np.ndarray, colors: np.ndarray) -> None:
+        """Draw the window over the background, it has its own line counter."""
+        visible = lines >= self.wy
+        if not visible.any():
+            return
+        rows = self.window_line + np.cumsum(visible) - 1
+        self.window_line += int(visible.sum())
+        left = max(0, self.wx - 7)
+        columns: np.ndarray = COLUMNS[left:] - (self.wx - 7)
+        window = self.tile_pixels(self.lcdc & WINDOW_MAP, rows[visible][:, None] & 0xFF, columns[None, :])
+        colors[visible, left:] = window
+
+    def index(self) -> tuple[np.ndarray, np.ndarray]:
+        """Select sprites of every visible line, the first ten ones in OAM,
+        and sort them from the lowest priority to the highest one (the leftmost, then the first in OAM).
+        """
+        height = 16 if self.lcdc & OBJ_SIZE else 8
+        tops = self.sprites[:, 0].astype(np.intp) - 16
+        rows = VISIBLE_LINES[:, None] - tops[None, :]
+        hits = (rows >= 0) & (rows < height)
+        hits &= np.cumsum(hits, axis=1) <= OBJ_PER_LINE
+        order = np.lexsort((np.arange(40), self.sprites[:, 1]))[::-1]
+        self.selection = hits, order
+        return self.selection
+
+    def render_sprites(self, lines: np.ndarray, colors: np.ndarray, shades: np.ndarray) -> None:
+        """Draw sprites over the background: ten per line at most, the leftmost one wins.
+        The winning sprite is drawn behind background colors 1-3 when it says so.
+        """
+        selection, order = self.selection or self.index()
+        hits = selection[lines]
+        if not hits.any():
+            return
+        height = 16 if self.lcdc & OBJ_SIZE else 8
+
+        palettes = np.array(
+            [[(palette >> (2 * color)) & 3 for color in range(4)] for palette in (self.obp0, self.obp1)],
+            dtype=np.uint8,
+        )
+        # The layer of sprites, drawn from the lowest priority to the highest one
+        layer = np.zeros_like(shades)
+        opaque = np.zeros(shades.shape, dtype=np.bool_)
+        behind = np.zeros(shades.shape, dtype=np.bool_)
+        for sprite in order[hits[:, order].any(axis=0)]:
+            y, x, tile, attributes = (int(value) for value in self.sprites[sprite])
+            targets = np.flatnonzero(hits[:, sprite])
+            row = lines[targets] - (y - 16)
+            if attributes & 0x40:
+                row = height - 1 - row
+            if height == 16:
+                tile &= 0xFE
+            pixels = self.decoded[tile + (row >> 3), row & 7]
+            if attributes & 0x20:
+                pixels = pixels[:, ::-1]
+
+            # Clipped at screen edges, and color 0 is transparent
+            xs: np.ndarray = x - 8 + np.arange(8)
+            inside = (xs >= 0) & (xs < WIDTH)
+            xs, pixels = xs[inside], pixels[:, inside]
+            area: tuple[np.ndarray, ...] = np.ix_(targets, xs)
+            drawn = pixels != 0
+            layer[area] = np.where(drawn, palettes[attributes >> 4 & 1][pixels], layer[area])
+            behind[area] = np.where(drawn, bool(attributes & 0x80), behind[area])
+            opaque[area] |= drawn
+
+        visible = opaque & (~behind | (colors == 0))
+        shades[visible] = layer[visible]
@@ -0,0 +1,298 @@
+"""This is part of PyGameBoy, a Game Boy emulator written in Python 3.
+Source: https://github.com/BoboTiG/PyGameBoy
+
+Save states: the whole machine state as one binary blob of a fixed layout, for a
+given emulator. Registers (and other integers) are packed with a single `struct`,
+followed by memory regions, copied as they are. Pending events of the scheduler are
+saved as the clock cycle they are due.
+
+Saving fills a preallocated buffer, nothing is pickled. On top of that, the rewind
+ring keeps the last states as XOR deltas against a keyframe, compressed with zlib:
+consecutive states differ by a few bytes, deltas are mostly zeros.
+"""
+
+from __future__ import annotations
+
+import struct
+import zlib
+from collections import deque
+from itertools import count
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from . import offset
+from .exceptions import InvalidStateError
+from .ppu import TILES
+
+if TYPE_CHECKING:
+    from .emulator import Emulator
+
+__all__ = ("Rewind", "SaveState")
+
+MAGIC = b"PGB1"
+
+# Integers of the state, by owner: attributes missing on that machine (the MBC has no RTC,
+# or no mode register) are not part of its layout
+FIELDS = (
+    *(("cpu", name, "B") for name in ("a", "f", "b", "c", "d", "e", "h", "l")),
+    ("cpu", "sp", "H"),
+    ("cpu", "pc", "H"),
+    ("cpu", "ime", "?"),
+    ("cpu", "ime_pending", "?"),
+    ("cpu", "interrupt_enable", "B"),
+    ("cpu", "interrupt_flag", "B"),
+    ("cpu", "halted", "?"),
+    ("cpu", "stopped", "?"),
+    ("cpu", "cycles", "q"),
+    ("timer", "origin", "q"),
+    ("timer", "synced", "q"),
+    ("timer", "tima", "B"),
+    ("timer", "tma", "B"),
+    ("timer", "tac", "B"),
+    ("dma", "active", "?"),
+    *(("ppu", name, "B") for name in ("lcdc", "stat", "scy", "scx", "lyc", "bgp", "obp0", "obp1", "wy", "wx")),
+    ("ppu", "origin", "q"),
+    ("ppu", "rendered", "q"),
+    ("ppu", "window_line", "H"),
+    ("ppu", "stat_line", "?"),
+    ("ppu", "frames", "q"),
+    ("apu", "step", "B"),
+    ("apu", "shadow", "H"),
+    ("apu", "sweep_timer", "h"),
+    ("apu", "sweep_enabled", "?"),
+    ("apu", "negated", "?"),
+    *(
+        (f"channel{number}", name, code)
+        for number in range(4)
+        for name, code in (
+            ("length", "H"),
+            ("length_enabled", "?"),
+            ("enabled", "?"),
+            ("dac", "?"),
+            ("volume", "B"),
+            ("timer", "h"),
+        )
+    ),
+    ("mbc", "rom_bank", "H"),
+    ("mbc", "low_bank", "H"),
+    ("mbc", "ram_bank", "B"),
+    ("mbc", "ram_enabled", "?"),
+    ("mbc", "bank1", "B"),
+    ("mbc", "bank2", "B"),
+    ("mbc", "mode", "B"),
+    ("mbc", "latch", "B"),
+    ("rtc", "cycles", "q"),
+    ("rtc", "origin", "q"),
+    ("rtc", "halted", "?"),
+    ("rtc", "carry", "?"),
+    ("rtc", "latched", "5s"),
+)
+
+# Events of the scheduler, saved as the clock cycle they are due (-1 when not pending)
+EVENTS = (
+    ("ppu", "vblank"),
+    ("ppu", "stat_event"),
+    ("timer", "overflow"),
+    ("apu", "sequence"),
+    ("mmu", "transferred"),
+    ("dma", "end"),
+)
+
+# Memory regions, copied as they are
+REGIONS = (
+    ("mmu", "wram"),
+    ("mmu", "hram"),
+    ("mmu", "io"),
+    ("ppu", "vram"),
+    ("ppu", "oam"),
+    ("ppu", "frame"),
+    ("apu", "registers"),
+    ("apu", "wave"),
+    ("mbc", "ram"),
+)
+
+
+class SaveState:
+    """Save, and load, the state of the *emulator*, using a preallocated buffer.
+    A state can only be loaded into an emulator of the same cartridge.
+    """
+
+    def __init__(self, emulator: Emulator) -> None:
+        self.emulator = emulator
+        mmu = emulator.mmu
+        owners: dict[str, object] = {
+            "cpu": emulator.cpu,
+            "timer": emulator.timer,
+            "mmu": mmu,
+            "dma": mmu.dma,
+            "ppu": emulator.ppu,
+            "apu": emulator.apu,
+            **{f"channel{number}": channel for number, channel in enumerate(emulator.apu.channels)},
+            "mbc": mmu.mbc,
+            "rtc": getattr(mmu.mbc, "rtc", None),
+        }
+        fields = [(owner, name, code) for owner, name, code in FIELDS if hasattr(owners[owner], name)]
+        self.fields = [(owners[owner], name) for owner, name, _ in fields]
+        self.events = [getattr(owners[owner], name) for owner, name in EVENTS]
+        # Regions are looked up on every use: a buffer may be replaced (RAM of a closed save file)
+        self.regions = [(owners[owner], name) for owner, name in REGIONS]
+
+        # The magic, and the cartridge title, checksums, and size, come first
+        cartridge = emulator.cartridge
+        header = cartridge.header
+        self.identity = (
+            MAGIC
+            + bytes(header[offset.TITLE])
+            + bytes(header[offset.HEADER_CHECKSUM : offset.GLOBAL_CHECKSUM.stop])
+            + len(cartridge.data).to_bytes(4, "little")
+        )
+        codes = "".join(code for _, _, code in fields)
+        self.scalars = struct.Struct(f"<{len(self.identity)}s{codes}{'q' * len(self.events)}")
+
+        self.size = self.scalars.size + sum(memoryview(getattr(owner, name)).nbytes for owner, name in self.regions)
+        self.buffer = bytearray(self.size)
+        self.view = memoryview(self.buffer)
+
+    def capture(self) -> memoryview:
+        """Save the current state into the buffer, and return a view on it (valid until the next capture)."""
+        pending = self.emulator.scheduler.pending
+        self.scalars.pack_into(
+            self.buffer,
+            0,
+            self.identity,
+            *[getattr(owner, name) for owner, name in self.fields],
+            *[pending.get(event, -1) for event in self.events],
+        )
+        position = self.scalars.size
+        view = self.view
+        for owner, name in self.regions:
+            with memoryview(getattr(owner, name)) as buffer, buffer.cast("B") as region:
+                view[position : position + len(region)] = region
+                position += len(region)
+        return view
+
+    def restore(self) -> None:
+        """Load the state held by the buffer."""
+        values = self.scalars.unpack_from(self.buffer)
+        if values[0] != self.identity:
+            raise InvalidStateError
+
+        # Events not part of the machine (flushes of the save file) keep their delay
+        emulator = self.emulator
+        scheduler = emulator.scheduler
+        before = emulator.cpu.cycles
+        others = [(event, cycle - before) for event, cycle in scheduler.pending.items() if event not in self.events]
+        for (owner, name), value in zip(self.fields, values[1 : 1 + len(self.fields)], strict=True):
+            setattr(owner, name, value)
+        position = self.scalars.size
+        view = self.view
+        for owner, name in self.regions:
+            with memoryview(getattr(owner, name)) as buffer, buffer.cast("B") as region:
+                region[:] = view[position : position + len(region)]
+                position += len(region)
+
+        now = emulator.cpu.cycles
+        scheduler.clear()
+        for event, cycle in zip(self.events, values[-len(self.events) :], strict=True):
+            if cycle >= 0:
+                scheduler.schedule(cycle, event)
+        for event, delay in others:
+            scheduler.schedule(now + delay, event)
+
+        # Caches derived from memory
+        emulator.ppu.dirty = set(range(TILES))
+        emulator.ppu.selection = None
+        emulator.apu.resync(now)
+        emulator.apu.record(now)
+        emulator.mmu.mbc.map_rom()
+        emulator.mmu.mbc.map_ram()
+        if emulator.blocks is not None:
+            emulator.blocks.forget_wram()
+
+    def save(self) -> bytes:
+        """The current state."""
+        return bytes(self.capture())
+
+    def load(self, state: bytes | bytearray | memoryview) -> None:
+        """Load the *state*."""
+        if len(state) != self.size:
+            raise InvalidStateError
+        self.view[:] = state
+        self.restore()
+
+
+class Rewind:
+    """A ring of the last *capacity* states, taken with `push()`.
+    Every *interval* states, the state is a keyframe; other ones are stored as XOR deltas
+    against the last keyframe. Both are compressed with zlib, at the given *level*.
+    """
+
+    def __init__(self, state: SaveState, *, capacity: int = 600, interval: int = 60, level: int = 1) -> None:
+        if capacity < 1:
+            msg = f"Invalid {capacity = }, the ring holds one state at least"
+            raise ValueError(msg)
+        self.state = state
+        self.capacity = capacity
+        self.interval = interval
+        self.level = level
+
+        # Compressed deltas, along with their keyframe number, and compressed keyframes
+        self.entries: deque[tuple[int, bytes]] = deque()
+        self.keyframes: dict[int, bytes] = {}
+        self.numbers = count()
+
+        # The last keyframe, its number, uncompressed, and states since then
+        self.number = -1
+        self.keyframe: np.ndarray = np.zeros(state.size, dtype=np.uint8)
+        self.delta: np.ndarray = np.zeros(state.size, dtype=np.uint8)
+        self.since = interval
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    @property
+    def nbytes(self) -> int:
+        """Memory used by compressed states."""
+        return sum(len(delta) for _, delta in self.entries) + sum(len(keyframe) for keyframe in self.keyframes.values())
+
+    def push(self) -> None:
+        """Save the current state, the oldest one is dropped when the ring is full."""
+        view = self.state.capture()
+        current = np.frombuffer(view, dtype=np.uint8)
+        if self.since >= self.interval:
+            self.number = next(self.numbers)
+            self.keyframe[:] = current
+            self.keyframes[self.number] = zlib.compress(view, self.level)
+            self.since = 0
+        np.bitwise_xor(current, self.keyframe, out=self.delta)
+        self.entries.append((self.number, zlib.compress(self.delta.data, self.level)))
+        self.since += 1
+
+        if len(self.entries) > self.capacity:
+            number, _ = self.entries.popleft()
+            if self.entries[0][0] != number:
+                del self.keyframes[number]
+
+    def rewind(self, steps: int = 1) -> bool:
+        """Load the state saved *steps* pushes ago, it is dropped from the ring along with newer ones.
+        Return False, and load nothing, when there are not that many states.
+        """
+        if not 0 < steps <= len(self.entries):
+            return False
+        for _ in range(steps):
+            number, delta = self.entries.pop()
+            keyframe = self.keyframes[number]
+            if not self.entries or self.entries[-1][0] != number:
+                del self.keyframes[number]
+        state = np.frombuffer(self.state.view, dtype=np.uint8)
+        np.bitwise_xor(
+            np.frombuffer(zlib.decompress(keyframe), dtype=np.uint8),
+            np.frombuffer(zlib.decompress(delta), dtype=np.uint8),
+            out=state,
+        )
+        self.state.restore()
+
+        # The next state starts a new keyframe
+        self.since = self.interval
+        return True
@@ -0,0 +1,66 @@
+"""This is part of PyGameBoy, a Game Boy emulator written in Python 3.
+Source: https://github.com/BoboTiG/PyGameBoy
+
+The scheduler: peripherals are not ticked after every instruction, they schedule
+events at the clock cycle something will happen (a timer overflow, the end of a
+serial transfer, and so on). The CPU runs freely until the earliest deadline.
+"""
+
+from __future__ import annotations
+
+import heapq
+from collections.abc import Callable
+from itertools import count
+
+__all__ = ("NEVER", "Scheduler")
+
+# The deadline when nothing is scheduled
+NEVER = 1 << 62
+
+# An event, called with the clock cycle it was due
+Event = Callable[[int], None]
+
+
+class Scheduler:
+    """Events by absolute clock cycle, in a min-heap.
+    An event is scheduled at most once: scheduling it again moves it. Moved and
+    cancelled events are left in the heap, and skipped when popped.
+    """
+
+    __slots__ = ("deadline", "events", "order", "pending")
+
+    def __init__(self) -> None:
+        self.deadline = NEVER
+        self.events: list[tuple[int, int, Event]] = []
+        self.pending: dict[Event, int] = {}
+        self.order = count()  # Events due at the same cycle keep their scheduling order
+
+    def __contains__(self, event: Event) -> bool:
+        return event in self.pending
+
+    def schedule(self, cycle: int, event: Event) -> None:
+        """Call *event* once the clock reaches *cycle*."""
+        self.pending[event] = cycle
+        heapq.heappush(self.events, (cycle, next(self.order), event))
+        self.deadline = self.events[0][0]
+
+    def cancel(self, event: Event) -> None:
+        """Forget about *event*, if scheduled."""
+        self.pending.pop(event, None)
+
+    def clear(self) -> None:
+        """Forget about all events."""
+        self.events.clear()
+        self.pending.clear()
+        self.deadline = NEVER
+
+    def run(self, now: int) -> None:
+        """Call all events due at *now*, and update the deadline."""
+        events = self.events
+        pending = self.pending
+        while events and events[0][0] <= now:
+            cycle, _, event = heapq.heappop(events)
+            if pending.get(event) == cycle:
+                del pending[event]
+                event(cycle)
+        self.deadline = events[0][0] if events else NEVER
@@ -0,0 +1,113 @@
+"""This is part of PyGameBoy, a Game Boy emulator written in Python 3.
+Source: https://github.com/BoboTiG/PyGameBoy
+
+The timer: DIV is the upper byte of a 16-bit counter incremented every clock cycle,
+and TIMA is incremented on falling edges of one bit of that counter, selected by TAC.
+
+The timer is never ticked: the counter is derived from the clock, TIMA is brought up
+to date when accessed, and its next overflow is an event of the scheduler.
+"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from . import offset
+from .cpu import TIMER
+
+if TYPE_CHECKING:
+    from .cpu import CPU
+    from .scheduler import Scheduler
+
+__all__ = ("Timer",)
+
+# Bit of the internal counter driving TIMA, by TAC clock select:
+# 4096 Hz, 262144 Hz, 65536 Hz, and 16384 Hz
+SHIFTS = (10, 4, 6, 8)
+
+
+class Timer:
+    """DIV, TIMA, TMA and TAC registers."""
+
+    __slots__ = ("cpu", "origin", "scheduler", "synced", "tac", "tima", "tma")
+
+    def __init__(self, cpu: CPU, scheduler: Scheduler) -> None:
+        self.cpu = cpu
+        self.scheduler = scheduler
+        self.origin = cpu.cycles - 0xABCC  # The counter as left by the DMG boot ROM
+        self.synced = cpu.cycles  # TIMA is up to date at that clock cycle
+        self.tima = 0
+        self.tma = 0
+        self.tac = 0
+
+    @property
+    def counter(self) -> int:
+        return (self.cpu.cycles - self.origin) & 0xFFFF
+
+    @property
+    def div(self) -> int:
+        return self.counter >> 8
+
+    def read(self, address: int) -> int:
+        """Read a register."""
+        self.sync()
+        match address:
+            case offset.DIV:
+                return self.div
+            case offset.TIMA:
+                return self.tima
+            case offset.TMA:
+                return self.tma
+        return self.tac | 0xF8
+
+    def write(self, address: int, value: int) -> None:
+        """Write a register."""
+        self.sync()
+        match address:
+            case offset.DIV:
+                self.reset()
+            case offset.TIMA:
+                self.tima = value
+            case offset.TMA:
+                self.tma = value
+            case _:
+                self.tac = value & 0x07
+        self.schedule()
+
+    def reset(self) -> None:
+        """Writing to DIV resets the whole counter, this may trigger a TIMA increment."""
+        if self.tac & 4 and self.counter & (1 << (SHIFTS[self.tac & 3] - 1)):
+            self.increment(1)
+        self.origin = self.cpu.cycles
+
+    def sync(self) -> None:
+        """Bring TIMA up to date with the clock."""
+        now = self.cpu.cycles
+        if self.tac & 4:
+            shift = SHIFTS[self.tac & 3]
+            if increments := ((now - self.origin) >> shift) - ((self.synced - self.origin) >> shift):
+                self.increment(increments)
+        self.synced = now
+
+    def schedule(self) -> None:
+        """Schedule the next TIMA overflow."""
+        if not self.tac & 4:
+            self.scheduler.cancel(self.overflow)
+            return
+        shift = SHIFTS[self.tac & 3]
+        ticks = (self.synced - self.origin) >> shift
+        self.scheduler.schedule(((ticks + 0x100 - self.tima) << shift) + self.origin, self.overflow)
+
+    def overflow(self, _: int) -> None:
+        """TIMA overflowed."""
+        self.sync()
+        self.schedule()
+
+    def increment(self, count: int) -> None:
+        """Increment TIMA *count* times, on overflow it is reloaded with TMA and an interrupt is requested."""
+        tima = self.tima + count
+        if tima > 0xFF:
+            period = 0x100 - self.tma
+            tima = self.tma + (tima - 0x100) % period
+            self.cpu.interrupt_flag |= TIMER
+        self.tima = tima
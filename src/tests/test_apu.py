@@ -0,0 +1,253 @@
+"""This is part of PyGameBoy, a Game Boy emulator written in Python 3.
+Source: https://github.com/BoboTiG/PyGameBoy
+"""
+
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from gameboy import offset
+from gameboy.apu import APU, MASKS, SEQUENCER_CYCLES
+from gameboy.blargg import run_rom
+from gameboy.cpu import CPU
+from gameboy.emulator import CYCLES_PER_FRAME
+from gameboy.scheduler import Scheduler
+from gameboy.timer import Timer
+
+
+@pytest.fixture
+def apu() -> APU:
+    """An APU synthesizing 32768 samples per second: 128 clock cycles per sample."""
+    cpu = CPU()
+    scheduler = Scheduler()
+    return APU(cpu, scheduler, Timer(cpu, scheduler), sample_rate=32768)
+
+
+def run(apu: APU, cycles: int) -> None:
+    """Run the clock, and the frame sequencer."""
+    until = apu.cpu.cycles + cycles
+    while apu.scheduler.deadline <= until:
+        apu.cpu.cycles = apu.scheduler.deadline
+        apu.scheduler.run(apu.cpu.cycles)
+    apu.cpu.cycles = until
+
+
+def test_registers(apu: APU) -> None:
+    """Test registers, and their bits always read as 1."""
+    assert apu.read(offset.NR52) == 0xF1
+    assert apu.read(offset.NR50) == 0x77
+    apu.write(offset.NR52, 0x00)
+    assert apu.read(offset.NR52) == 0x70
+    assert [apu.read(address) for address in range(offset.NR10, offset.NR52)] == list(MASKS[:-1])
+    assert apu.read(0xFF27) == 0xFF
+
+    # Writes are ignored while the sound is off, but length counters
+    apu.write(offset.NR50, 0x77)
+    apu.write(offset.NR41, 0x3F)
+    assert apu.read(offset.NR50) == 0x00
+    assert apu.channels[3].length == 1
+
+    apu.write(offset.NR52, 0x80)
+    for address in range(offset.NR10, offset.NR52):
+        apu.write(address, 0xFF)
+    apu.write(0xFF27, 0xFF)
+    assert apu.read(offset.NR10) == 0xFF
+    assert apu.read(offset.NR52) == 0xFF  # All triggered
+
+
+def test_wave_ram(apu: APU) -> None:
+    """Test the wave RAM is readable, and writable while the sound is off."""
+    apu.write(offset.NR52, 0x00)
+    apu.write(offset.WAVE.start, 0x42)
+    assert apu.read(offset.WAVE.start) == 0x42
+
+
+def test_length(apu: APU) -> None:
+    """Test length counters disable their channel when they reach zero, at 256 Hz."""
+    apu.write(offset.NR22, 0xF0)
+    apu.write(offset.NR21, 0x3E)
+    apu.write(offset.NR24, 0xC0)
+    assert apu.read(offset.NR52) & 0x02
+    run(apu, 2 * SEQUENCER_CYCLES)
+    assert apu.read(offset.NR52) & 0x02
+    run(apu, 2 * SEQUENCER_CYCLES)
+    assert not apu.read(offset.NR52) & 0x02
+
+    # Triggering reloads a zero length counter
+    apu.write(offset.NR24, 0x80)
+    assert apu.channels[1].length == 64
+
+    # Disabling the DAC disables the channel
+    apu.write(offset.NR22, 0x00)
+    assert not apu.read(offset.NR52) & 0x02
+
+
+def test_length_first_half(apu: APU) -> None:
+    """Test enabling the length counter in the first half of a length period clocks it."""
+    run(apu, SEQUENCER_CYCLES)
+    assert apu.step & 1
+    apu.write(offset.NR30, 0x80)
+    apu.write(offset.NR31, 0xFF)
+    apu.write(offset.NR34, 0x40)
+    assert apu.channels[2].length == 0
+    assert not apu.read(offset.NR52) & 0x04
+
+    # Triggering then reloads the length counter, minus one
+    apu.write(offset.NR34, 0xC0)
+    assert apu.channels[2].length == 255
+    assert apu.read(offset.NR52) & 0x04
+    apu.write(offset.NR30, 0x00)
+    assert not apu.read(offset.NR52) & 0x04
+
+
+def test_sweep(apu: APU) -> None:
+    """Test the frequency sweep of channel 1, until it overflows."""
+    apu.write(offset.NR10, 0x11)  # Every sweep clock, add the frequency shifted by 1
+    apu.write(offset.NR13, 0x00)
+    apu.write(offset.NR14, 0x82)
+    run(apu, 3 * SEQUENCER_CYCLES)
+    assert apu.read(offset.NR52) & 0x01
+    assert apu.frequency(0) == 0x300
+    run(apu, 4 * SEQUENCER_CYCLES)
+    assert apu.frequency(0) == 0x480
+    assert apu.read(offset.NR52) & 0x01
+    run(apu, 4 * SEQUENCER_CYCLES)
+    assert apu.frequency(0) == 0x6C0
+    assert not apu.read(offset.NR52) & 0x01  # The next one overflows
+
+
+def test_sweep_negate(apu: APU) -> None:
+    """Test leaving the decreasing mode after a frequency was computed disables channel 1."""
+    apu.write(offset.NR10, 0x09)
+    apu.write(offset.NR14, 0x87)
+    assert apu.negated
+    apu.write(offset.NR10, 0x01)
+    assert not apu.read(offset.NR52) & 0x01
+
+    # Without a period, the sweep is not clocked
+    apu.write(offset.NR10, 0x00)
+    apu.write(offset.NR14, 0x87)
+    run(apu, 8 * SEQUENCER_CYCLES)
+    assert apu.frequency(0) == 0x700
+
+
+def test_envelope(apu: APU) -> None:
+    """Test volume envelopes, at 64 Hz."""
+    apu.write(offset.NR12, 0xF1)
+    apu.write(offset.NR42, 0x09)
+    apu.write(offset.NR14, 0x80)
+    apu.write(offset.NR44, 0x80)
+    run(apu, 8 * SEQUENCER_CYCLES)
+    assert (apu.channels[0].volume, apu.channels[3].volume) == (14, 1)
+    run(apu, 8 * 16 * SEQUENCER_CYCLES)
+    assert (apu.channels[0].volume, apu.channels[3].volume) == (0, 15)
+
+
+def test_div_reset(apu: APU) -> None:
+    """Test the frame sequencer steps when writing DIV makes its bit 4 fall."""
+    timer = apu.timer
+    timer.write(offset.DIV, 0)
+    apu.reset_div()
+    assert apu.step == 0
+    run(apu, 0x1000)
+    apu.reset_div()
+    timer.write(offset.DIV, 0)
+    assert apu.step == 1
+    run(apu, SEQUENCER_CYCLES - 4)
+    assert apu.step == 1
+    run(apu, 4)
+    assert apu.step == 2
+
+    # Nothing steps while the sound is off
+    apu.write(offset.NR52, 0x00)
+    apu.reset_div()
+    run(apu, SEQUENCER_CYCLES)
+    assert apu.step == 2
+
+
+def test_square(apu: APU) -> None:
+    """Test square waves, with their duty cycle, volume, and panning."""
+    apu.write(offset.NR21, 0x80)  # 50 %
+    apu.write(offset.NR22, 0xF0)
+    apu.write(offset.NR24, 0x87)  # 512 Hz: 64 samples per period
+    apu.write(offset.NR51, 0x02)
+    apu.cpu.cycles += 0x2000 * 4
+    samples = apu.samples()
+    assert samples.shape == (256, 2)
+    assert not samples[:, 0].any()
+    assert list(samples[:64:8, 1]) == [8191, 0, 0, 0, 0, 8191, 8191, 8191]
+    assert (samples[:192, 1] == samples[64:, 1]).all()
+
+    # Half as loud, from the next period on: a change of state does not reset the phase
+    apu.write(offset.NR50, 0x33)
+    apu.cpu.cycles += 0x2000
+    samples = apu.samples()
+    assert list(samples[:64:8, 1]) == [4095, 0, 0, 0, 0, 4095, 4095, 4095]
+    assert not apu.samples().size
+
+
+def test_wave(apu: APU) -> None:
+    """Test the wave channel, and its volume shift."""
+    for index in range(16):
+        apu.write(offset.WAVE.start + index, index << 4 | index)
+    apu.write(offset.NR30, 0x80)
+    apu.write(offset.NR32, 0x20)  # 100 %
+    apu.write(offset.NR33, 0x00)
+    apu.write(offset.NR34, 0x84)  # 64 Hz: 512 samples per period, 16 per step
+    apu.write(offset.NR51, 0x40)
+    apu.cpu.cycles += 0x8000
+    levels: np.ndarray = apu.samples()[::8, 0] // (0x7FFF // 15 // 4)
+    assert list(levels) == [index // 4 for index in range(32)]
+
+    apu.write(offset.NR32, 0x60)  # 25 %
+    apu.cpu.cycles += 0x8000
+    levels = apu.samples()[::8, 0] // (0x7FFF // 15 // 4)
+    assert list(levels) == [(8 + index // 4) >> 2 for index in range(32)]
+
+    apu.write(offset.NR32, 0x00)  # Muted
+    apu.cpu.cycles += 0x8000
+    assert not apu.samples().any()
+
+
+def test_noise(apu: APU) -> None:
+    """Test the noise channel, in both width modes."""
+    apu.write(offset.NR42, 0xF0)
+    apu.write(offset.NR43, 0x08 | 0x41)  # 7-bit, 16 << 4 clock cycles per shift: 2 samples
+    apu.write(offset.NR44, 0x80)
+    apu.cpu.cycles += 127 * 256 * 2
+    levels: np.ndarray = apu.samples()[::2, 0] // 8191
+    assert levels[:127].any()
+    assert (levels[:127] == levels[127:]).all()
+
+    apu.write(offset.NR43, 0xE0)  # No clock at all
+    apu.cpu.cycles += 0x1000
+    levels = apu.samples()[:, 0]
+    assert (levels == levels[0]).all()
+
+
+def test_no_samples() -> None:
+    """Test only registers are emulated without a sample rate."""
+    cpu = CPU()
+    scheduler = Scheduler()
+    apu = APU(cpu, scheduler, Timer(cpu, scheduler))
+    apu.write(offset.WAVE.start, 0x42)
+    cpu.cycles += 0x8000
+    assert apu.samples().shape == (0, 2)
+    assert apu.states[0] == [(0, 0, 0, np.inf, True)]
+
+
+@pytest.mark.parametrize(
+    "name",
+    [
+        "01-registers.gb",
+        "04-sweep.gb",
+        "05-sweep details.gb",
+        "06-overflow on trigger.gb",
+        "07-len sweep period sync.gb",
+    ],
+)
+def test_blargg(roms: Path, name: str) -> None:
+    """Test sound registers, length counters, and the sweep (results are written at A000h)."""
+    result = run_rom(roms / "sound" / name, cycles=100 * CYCLES_PER_FRAME, blocks=False)
+    assert result.passed, result.output
@@ -0,0 +1,141 @@
+"""This is part of PyGameBoy, a Game Boy emulator written in Python 3.
+Source: https://github.com/BoboTiG/PyGameBoy
+"""
+
+import time
+from pathlib import Path
+
+from gameboy import offset
+from gameboy.battery import RTC_FORMAT
+from gameboy.cartridge import Cartridge, compute_header_checksum
+from gameboy.emulator import Emulator
+from gameboy.savestate import SaveState
+
+
+def mbc3() -> Cartridge:
+    """An empty MBC3+TIMER+RAM+BATTERY cartridge, with 8 KiB of RAM."""
+    data = bytearray(0x8000)
+    data[offset.TYPE] = 0x10
+    data[offset.RAM_SIZE] = 0x02
+    data[offset.HEADER_CHECKSUM] = compute_header_checksum(bytes(data))
+    return Cartridge(bytes(data))
+
+
+def test_persist(roms: Path, tmp_path: Path) -> None:
+    """Test the cartridge RAM is written to the save file, and read back."""
+    save = tmp_path / "lcd_sync.sav"
+    rom = roms / "oam_bug" / "1-lcd_sync.gb"
+    with Emulator(Cartridge(rom), save_file=save) as emulator:
+        emulator.run_frames(40)
+        assert bytes(emulator.mmu.mbc.ram[1:4]) == b"\xde\xb0\x61"
+    assert save.read_bytes()[:4] == b"\x03\xde\xb0\x61"
+    assert save.stat().st_size == 0x2000
+
+    emulator = Emulator(Cartridge(rom), save_file=save)
+    assert bytes(emulator.mmu.mbc.ram[:4]) == b"\x03\xde\xb0\x61"
+
+    # Without any save file, or battery
+    with Emulator(Cartridge(roms / "sound" / "01-registers.gb"), save_file=save) as emulator:
+        assert emulator.battery is None
+
+    # Or with a battery, but nothing to persist
+    data = bytearray(0x8000)
+    data[offset.TYPE] = 0x03  # MBC1+RAM+BATTERY
+    with Emulator(Cartridge(bytes(data)), save_file=tmp_path / "empty.sav") as emulator:
+        assert emulator.battery is None
+    assert not (tmp_path / "empty.sav").exists()
+
+
+def test_close(tmp_path: Path) -> None:
+    """Test the save file is released on close, the emulator runs on a copy of the RAM."""
+    save = tmp_path / "game.sav"
+    emulator = Emulator(mbc3(), save_file=save)
+    battery = emulator.battery
+    assert battery is not None
+    mmu = emulator.mmu
+    mmu.write(0x0000, 0x0A)
+    mmu.write(0xA000, 0x01)
+    emulator.close()
+    assert battery.map.closed
+    assert battery.tick not in emulator.scheduler.pending
+    emulator.close()
+
+    mmu.write(0xA000, 0x02)
+    assert mmu.read(0xA000) == 0x02
+    assert save.read_bytes()[0] == 0x01
+
+    # Save states use the RAM copy, not the closed save file
+    emulator = Emulator(mbc3(), save_file=save)
+    battery = emulator.battery
+    assert battery is not None
+    state = SaveState(emulator)
+    mmu = emulator.mmu
+    mmu.write(0x0000, 0x0A)
+    mmu.write(0xA000, 0x11)
+    emulator.close()
+    assert battery.map.closed
+    mmu.write(0xA000, 0x22)
+    saved = state.save()
+    mmu.write(0xA000, 0x33)
+    state.load(saved)
+    assert mmu.read(0xA000) == 0x22
+    assert save.read_bytes()[0] == 0x11
+
+
+def test_dirty_pages(tmp_path: Path) -> None:
+    """Test only pages modified since the last flush are written back, every few seconds."""
+    emulator = Emulator(mbc3(), save_file=tmp_path / "game.sav")
+    battery = emulator.battery
+    assert battery is not None
+    mmu = emulator.mmu
+    mmu.write(0x0000, 0x0A)
+    mmu.write(0xA000, 0x01)
+    mmu.write(0xA0FF, 0x02)
+    mmu.write(0xA100, 0x03)
+    assert battery.flush() == 2
+    assert battery.flush() == 0
+    assert (tmp_path / "game.sav").read_bytes()[0x00:0x101:0x80] == b"\x01\x00\x03"
+
+    mmu.write(0xBFFF, 0x04)
+    cycle = emulator.scheduler.pending[battery.tick]
+    battery.tick(cycle)
+    assert battery.flush() == 0
+    assert emulator.scheduler.pending[battery.tick] == cycle + battery.interval
+
+    # Loading a state keeps the next flush
+    state = SaveState(emulator)
+    state.load(state.save())
+    assert emulator.scheduler.pending[battery.tick] == cycle + battery.interval
+
+
+def test_rtc(tmp_path: Path) -> None:
+    """Test the clock is stored after the RAM, and keeps running while the emulator does not."""
+    save = tmp_path / "game.sav"
+    emulator = Emulator(mbc3(), save_file=save)
+    mmu = emulator.mmu
+    mmu.write(0x0000, 0x0A)
+    mmu.write(0x4000, 0x08)
+    mmu.write(0xA000, 30)  # Seconds
+    assert emulator.battery is not None
+    emulator.battery.flush()
+    emulator.close()
+    data = save.read_bytes()
+    assert len(data) == 0x2000 + RTC_FORMAT.size
+    registers = RTC_FORMAT.unpack(data[0x2000:])
+    assert registers[:5] == (30, 0, 0, 0, 0)
+
+    # An hour later
+    save.write_bytes(data[:0x2000] + RTC_FORMAT.pack(*registers[:10], int(time.time()) - 3600))
+    emulator = Emulator(mbc3(), save_file=save)
+    assert emulator.mmu.mbc.rtc.registers()[:3] == bytes((30, 0, 1))  # type: ignore[attr-defined]
+
+    # A halted clock does not run
+    mmu = emulator.mmu
+    mmu.write(0x0000, 0x0A)
+    mmu.write(0x4000, 0x0C)
+    mmu.write(0xA000, 0x40)
+    emulator.close()
+    data = save.read_bytes()
+    save.write_bytes(data[:-8] + (int(time.time()) - 3600).to_bytes(8, "little"))
+    emulator = Emulator(mbc3(), save_file=save)
+    assert emulator.mmu.mbc.rtc.registers() == bytes((30, 0, 1, 0, 0x40))  # type: ignore[attr-defined]
@@ -0,0 +1,59 @@
+"""This is part of PyGameBoy, a Game Boy emulator written in Python 3.
+Source: https://github.com/BoboTiG/PyGameBoy
+"""
+
+import json
+from collections.abc import Iterator
+from pathlib import Path
+
+import pytest
+
+import benchmarks.__main__
+from benchmarks import Result, bench, compare
+from benchmarks.cartridge import synthetic_rom
+from gameboy.cartridge import Cartridge
+
+
+def test_bench() -> None:
+    """Test timings are per call."""
+    result = bench("noop", lambda: None, repeat=2)
+    assert result.name == "noop"
+    assert result.calls > 1
+    assert 0 < result.best <= result.median
+
+
+def test_synthetic_rom() -> None:
+    """Test synthetic ROMs are valid."""
+    cartridge = Cartridge(synthetic_rom(1024 * 1024))
+    assert cartridge.is_valid(complete=True)
+    assert len(cartridge.data) == 1024 * 1024
+
+
+def test_main(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test results are written as JSON, and compared to a previous run."""
+
+    def suite(folder: Path, *, quick: bool = False) -> Iterator[Result]:
+        assert folder.is_dir()
+        assert quick
+        yield Result(name="dummy", calls=1, best=2.0, median=2.0)
+
+    monkeypatch.setattr(benchmarks.__main__, "SUITES", {"dummy": suite})
+    before = tmp_path / "before.json"
+    before.write_text(json.dumps({"results": [{"name": "dummy", "best": 1.0}]}))
+    output = tmp_path / "results.json"
+
+    assert benchmarks.__main__.main(["--quick", "--output", str(output), "--compare", str(before)]) == 0
+    report = json.loads(output.read_text())
+    assert report["results"] == [{"name": "dummy", "calls": 1, "best": 2.0, "median": 2.0, "operations": 1}]
+    assert report["compare"] == {"dummy": 2.0}
+    assert "python" in report["environment"]
+
+    with pytest.raises(SystemExit):
+        benchmarks.__main__.main(["unknown"])
+
+
+def test_compare() -> None:
+    """Test comparing results ignores benchmarks not in both runs."""
+    old = {"results": [{"name": "a", "best": 2.0}, {"name": "b", "best": 1.0}]}
+    new = {"results": [{"name": "a", "best": 1.0}, {"name": "c", "best": 1.0}]}
+    assert compare(old, new) == {"a": 0.5}
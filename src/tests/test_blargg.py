@@ -0,0 +1,57 @@
+"""This is part of PyGameBoy, a Game Boy emulator written in Python 3.
+Source: https://github.com/BoboTiG/PyGameBoy
+"""
+
+from pathlib import Path
+
+from gameboy import offset
+from gameboy.blargg import run, run_rom
+from gameboy.cartridge import compute_header_checksum
+from gameboy.emulator import CYCLES_PER_FRAME
+
+
+def test_run(roms: Path) -> None:
+    """Test ROMs run in a pool of processes, results being read from the serial port, or the cartridge RAM."""
+    files = [
+        roms / "cpu" / "06-ld r,r.gb",
+        roms / "memory" / "02-write_timing.gb",
+        roms / "sound" / "01-registers.gb",
+    ]
+    results = list(run(files, workers=1))
+    assert [result.path for result in results] == [str(file) for file in files]
+    assert [result.passed for result in results] == [True, False, True]
+    assert results[0].output.endswith("Passed\n")
+    assert results[1].output.endswith("Failed\n")
+    assert results[2].output.startswith("01-registers")
+    assert all(0 < result.cycles < 100 * CYCLES_PER_FRAME for result in results)
+    assert all(result.seconds > 0 for result in results)
+
+    # The same, in parallel
+    parallel = list(run(files, workers=2))
+    assert [result[:4] for result in parallel] == [result[:4] for result in results]
+
+
+def test_budget(roms: Path) -> None:
+    """Test ROMs stop at their cycles budget, without any result."""
+    result = run_rom(roms / "other" / "halt_bug.gb", cycles=5 * CYCLES_PER_FRAME, blocks=False)
+    assert result.passed is None
+    assert result.cycles >= 5 * CYCLES_PER_FRAME
+
+    # Still running, its output so far is in the cartridge RAM
+    (result,) = run([roms / "sound" / "03-trigger.gb"], cycles=30 * CYCLES_PER_FRAME)
+    assert result.passed is None
+    assert result.output.startswith("03-trigger")
+
+
+def test_errors(roms: Path, tmp_path: Path) -> None:
+    """Test invalid ROMs, and emulation errors, are failures."""
+    assert run_rom(roms / "invalid.gb").passed is False
+
+    data = bytearray(0x8000)
+    data[0x100] = 0xD3  # Illegal opcode
+    data[offset.HEADER_CHECKSUM] = compute_header_checksum(bytes(data))
+    rom = tmp_path / "illegal.gb"
+    rom.write_bytes(data)
+    result = run_rom(rom)
+    assert result.passed is False
+    assert "illegal opcode D3h at 0100h" in result.output
@@ -0,0 +1,200 @@
+"""This is part of PyGameBoy, a Game Boy emulator written in Python 3.
+Source: https://github.com/BoboTiG/PyGameBoy
+"""
+
+from pathlib import Path
+
+import pytest
+
+from gameboy import offset
+from gameboy.blargg import run_rom
+from gameboy.blocks import MAX_INVALIDATIONS, BlockCache, accesses_io, worst_cycles
+from gameboy.cartridge import Cartridge
+from gameboy.cpu import CPU, INSTRUCTIONS
+from gameboy.emulator import CYCLES_PER_FRAME, Emulator
+from gameboy.exceptions import InvalidOpcodeError
+
+
+def translator(code: bytes, bank: bytes = b"") -> BlockCache:
+    """Blocks of an emulator running *code* from the entry point, *bank* is the content of the ROM bank 2 (MBC1)."""
+    data = bytearray(0x10000)
+    data[offset.TYPE] = 0x01  # MBC1
+    data[0x100 : 0x100 + len(code)] = code
+    data[0x8000 : 0x8000 + len(bank)] = bank
+    blocks = Emulator(Cartridge(bytes(data)), blocks=True).blocks
+    assert blocks is not None
+    return blocks
+
+
+def run(blocks: BlockCache, count: int) -> None:
+    """Execute *count* blocks."""
+    for _ in range(count):
+        blocks.step()
+
+
+def test_source() -> None:
+    """Test a block is a straight-line run of instructions, with constant operands."""
+    blocks = translator(bytes([0x3E, 0x42, 0xCB, 0x37, 0x18, 0xFE]))  # LD A,42h; SWAP A; JR -2
+    source, end, cycles = blocks.source(0x100)
+    assert (end, cycles) == (0x106, 28)
+    assert "# 0100: LD A,n\n    n = 66\n    cpu.a = n\n" in source
+    assert "# 0102: SWAP A\n" in source
+    assert "# 0104: JR e\n    e = -2\n    cpu.pc = 262\n" in source
+    assert source.endswith("return 16 + 12\n")
+
+
+def test_execute() -> None:
+    """Test blocks are executed, and cached."""
+    blocks = translator(bytes([0x3E, 0x42, 0x3C, 0x18, 0xFE]))  # LD A,42h; INC A; JR -2
+    assert blocks.step() == 24
+    assert (blocks.cpu.a, blocks.cpu.pc) == (0x43, 0x103)
+    assert blocks.step() == 12
+    assert len(blocks) == 2
+    run(blocks, 100)
+    assert len(blocks) == 2
+
+
+def test_deadline() -> None:
+    """Test blocks do not run past the next event, instructions are interpreted up to it."""
+    blocks = translator(bytes([0x3C, 0x3C, 0x3C, 0x18, 0xFB]))  # INC A; INC A; INC A; JR -5
+    scheduler = blocks.mmu.scheduler
+    events: list[int] = []
+    scheduler.schedule(blocks.cpu.cycles + 20, events.append)
+    assert blocks.step() == 4
+    assert blocks.cpu.pc == 0x101
+    scheduler.cancel(events.append)
+    scheduler.run(blocks.cpu.cycles + 20)
+    assert blocks.step() == 20
+    assert not events
+
+
+@pytest.mark.parametrize(
+    ("opcode", "expected"),
+    [
+        (0x18, 12),  # JR e
+        (0x20, 12),  # JR NZ,e
+        (0xC4, 24),  # CALL NZ,nn
+        (0xC0, 20),  # RET NZ
+        (0xFB, 28),  # EI
+        (0x76, 28),  # HALT
+    ],
+)
+def test_worst_cycles(opcode: int, expected: int) -> None:
+    """Test cycles of branch instructions, at worst."""
+    instruction = INSTRUCTIONS[opcode]
+    assert instruction
+    assert worst_cycles(instruction) == expected
+
+
+def test_bank_switch() -> None:
+    """Test blocks are cached by ROM bank."""
+    # LD A,2; LD (2000h),A; JP 4000h
+    blocks = translator(bytes([0x3E, 0x02, 0xEA, 0x00, 0x20, 0xC3, 0x00, 0x40]), bank=bytes([0x3C, 0x18, 0xFD]))
+    run(blocks, 20)
+    assert blocks.mmu.mbc.rom_bank == 2
+    assert set(blocks.banks[2]) == {0x4000}
+    assert blocks.cpu.a > 2
+    blocks.switch(1)
+    assert not blocks.switchable
+
+
+def test_bank_switch_indirect() -> None:
+    """Test blocks are left after a write to MBC registers through a register pair."""
+    # LD A,2; LD (2000h),A; JP 4000h, then from bank 2: LD HL,2000h; LD (HL),3; LD A,42h; JR -2
+    code = bytes([0x3E, 0x02, 0xEA, 0x00, 0x20, 0xC3, 0x00, 0x40])
+    blocks = translator(code, bank=bytes([0x21, 0x00, 0x20, 0x36, 0x03, 0x3E, 0x42, 0x18, 0xFE]))
+    run(blocks, 3)
+    assert blocks.mmu.mbc.rom_bank == 3
+    assert (blocks.cpu.a, blocks.cpu.pc) == (2, 0x4005)
+
+    # Other writes do not end the block: LD HL,C000h; LD (HL),A; INC A; LD (DE),A (DE is 00D8h); INC A; JR -2
+    blocks = translator(bytes([0x21, 0x00, 0xC0, 0x77, 0x3C, 0x12, 0x3C, 0x18, 0xFE]))
+    source, end, _ = blocks.source(0x100)
+    assert end == 0x109
+    assert "mbc = cpu.h < 0x80" in source
+    assert "mbc = cpu.d < 0x80" in source
+    blocks.step()
+    assert (blocks.cpu.a, blocks.cpu.pc) == (2, 0x106)
+
+
+@pytest.mark.parametrize(
+    ("opcode", "operand", "expected"),
+    [
+        (0xE0, 0x0F, True),
+        (0xE0, 0x80, False),
+        (0xF0, 0xFF, True),
+        (0xE2, 0x00, True),
+        (0xEA, 0xFF40, True),
+        (0xFA, 0xFF90, False),
+        (0xFA, 0xC000, False),
+        (0x3E, 0x0F, False),
+    ],
+)
+def test_accesses_io(opcode: int, operand: int, expected: bool) -> None:
+    """Test I/O accesses detection."""
+    assert accesses_io(opcode, operand) is expected
+
+
+def test_io_alone() -> None:
+    """Test an instruction accessing I/O registers is alone in its block."""
+    blocks = translator(bytes([0x3C, 0xF0, 0x44, 0x3C]))  # INC A; LDH A,(LY); INC A
+    assert blocks.source(0x100)[1] == 0x101
+    assert blocks.source(0x101)[1] == 0x103
+
+
+def test_wram_invalidation() -> None:
+    """Test blocks of the work RAM are dropped when their code is overwritten."""
+    blocks = translator(b"")
+    blocks.mmu.wram[0x80:0x83] = bytes([0x3C, 0x18, 0xFD])  # INC A; JR -3
+    blocks.cpu.pc = 0xC080
+    blocks.step()
+    assert 0xC080 in blocks.wram
+    assert blocks.mmu.write_pages[0xC0] is not blocks.mmu.read_pages[0xC0]
+
+    # Data next to the code is fine
+    blocks.cpu.write(0xC040, 0x42)
+    assert 0xC080 in blocks.wram
+
+    blocks.cpu.write(0xC080, 0x3D)  # DEC A
+    assert not blocks.wram
+    assert blocks.mmu.write_pages[0xC0] is blocks.mmu.read_pages[0xC0]
+    a = blocks.cpu.a
+    blocks.cpu.pc = 0xC080
+    blocks.step()
+    assert blocks.cpu.a == (a - 1) & 0xFF
+
+    # Through the echo RAM, and too many times: the chunk is considered as data
+    for _ in range(MAX_INVALIDATIONS):
+        blocks.cpu.write(0xE081, 0x18)
+        blocks.cpu.pc = 0xC080
+        blocks.step()
+    assert blocks.wram[0xC080] == (CPU.step, 0)
+    assert blocks.source(0xC060, wram=True)[1] == 0xC080
+
+
+def test_illegal_opcode() -> None:
+    """Test illegal opcodes are interpreted."""
+    blocks = translator(bytes([0xD3]))
+    with pytest.raises(InvalidOpcodeError):
+        blocks.step()
+
+
+def test_interpreted() -> None:
+    """Test the interpreter is used when halted, and outside ROM and work RAM."""
+    blocks = translator(bytes([0x76]))  # HALT
+    blocks.step()
+    assert blocks.cpu.halted
+    events: list[int] = []
+    blocks.mmu.scheduler.schedule(blocks.cpu.cycles + 40, events.append)
+    assert blocks.step() == 40
+    blocks.cpu.halted = False
+    blocks.cpu.pc = 0xFF80
+    blocks.step()
+    assert blocks.cpu.pc == 0xFF81
+
+
+@pytest.mark.parametrize("name", ["cpu/02-interrupts.gb", "cpu/03-op sp,hl.gb", "other/instr_timing.gb"])
+def test_blargg(roms: Path, name: str) -> None:
+    """Test instructions, interrupts, and timings, with blocks."""
+    result = run_rom(roms / name, cycles=300 * CYCLES_PER_FRAME, blocks=True)
+    assert result.passed, result.output
@@ -2,14 +2,17 @@
 Source: https://github.com/BoboTiG/PyGameBoy
 """
 
+import hashlib
+import pickle
+import zlib
 from pathlib import Path
-from types import SimpleNamespace
 
 import pytest
 
-from gameboy.cartridge import Cartridge
+from gameboy.cartridge import Cartridge, CartridgeHeader
+from gameboy.emulator import Emulator
 from gameboy.exceptions import InvalidRomError, InvalidZipError
-from gameboy.offset import GLOBAL_CHECKSUM
+from gameboy.offset import GLOBAL_CHECKSUM, HEADER
 
 
 @pytest.mark.parametrize(
@@ -48,7 +51,7 @@ def test_logo(cartridge: Cartridge) -> None:
 def test_parse(cartridge: Cartridge) -> None:
     """Test cartridge parse()."""
     details = cartridge.parse()
-    assert isinstance(details, SimpleNamespace)
+    assert isinstance(details, CartridgeHeader)
     assert details.cgb is False
     assert details.destination == "Japan"
     assert details.file == cartridge.rom
@@ -137,3 +140,157 @@ def test_rom_is_zip_but_contains_no_rom(roms: Path) -> None:
     with pytest.raises(InvalidZipError) as exc:
         Cartridge(rom)
     assert str(exc.value)
+
+
+def test_rom_is_memory_mapped(mario: Path) -> None:
+    """Test the emulator can use a memory-mapped ROM file."""
+    with Cartridge(mario, memory_map=True) as cartridge:
+        assert isinstance(cartridge.data, memoryview)
+        assert cartridge.data.readonly
+        assert cartridge.title == "SUPER MARIOLAND"
+        assert cartridge.logo == Cartridge(mario).logo
+        assert cartridge.is_valid(complete=True)
+
+    # The mapping is released
+    with pytest.raises(ValueError, match="released"):
+        cartridge.data[0]
+
+    # Closing twice is harmless
+    cartridge.close()
+
+
+def test_rom_is_memory_mapped_in_use(roms: Path) -> None:
+    """Test closing a memory-mapped ROM still used by an emulator."""
+    with Cartridge(roms / "cpu" / "06-ld r,r.gb", memory_map=True) as cartridge:
+        emulator = Emulator(cartridge)
+        emulator.run_frames(1)
+    emulator.run_frames(40)
+    assert emulator.serial.endswith(b"Passed\n")
+
+
+def test_rom_is_memory_mapped_empty(tmp_path: Path) -> None:
+    """Test an empty file is read, as it cannot be memory-mapped."""
+    rom = tmp_path / "empty.gb"
+    rom.write_bytes(b"")
+    with Cartridge(rom, memory_map=True) as cartridge:
+        assert cartridge.data == b""
+
+
+def test_rom_is_zip_memory_mapped(roms: Path) -> None:
+    """Test ZIP files are still read in memory when asking for a memory-mapped ROM."""
+    rom = roms / "Super Mario Land (W) (V1.1).zip"
+    with Cartridge(rom, memory_map=True) as cartridge:
+        assert isinstance(cartridge.data, bytes)
+        assert cartridge.is_valid(complete=True)
+
+
+@pytest.mark.parametrize("name", ["Super Mario Land (JUE) (V1.1) [!].gb", "Super Mario Land (W) (V1.1).zip"])
+def test_rom_is_lazy(name: str, roms: Path) -> None:
+    """Test only the header is read at first with a lazy cartridge."""
+    cartridge = Cartridge(roms / name, lazy=True)
+    assert len(cartridge.header) == HEADER.stop
+    assert cartridge.is_valid()
+    assert cartridge.title == "SUPER MARIOLAND"
+    assert "data" not in vars(cartridge)
+
+    # The whole ROM is needed for that one, but it is streamed
+    assert cartridge.global_checksum
+    assert "data" not in vars(cartridge)
+    assert len(cartridge.data) == 65536
+
+
+@pytest.mark.parametrize(
+    "name",
+    [
+        "Super Mario Land (JUE) (V1.1) [!].gb",
+        "Gameboy Camera Gold - Zelda Edition (U) (S).zip",
+        "Pocket Monsters Yellow (J) (V1.0) (S)(T+Eng_BinHN).zip",
+        "cpu/cpu_instrs.gb",
+    ],
+)
+def test_parse_matches_properties(name: str, roms: Path) -> None:
+    """Test the single-pass header decoding gives the same results as properties."""
+    cartridge = Cartridge(roms / name)
+    details = cartridge.parse()
+    assert details.title == cartridge.title
+    assert details.cgb is cartridge.cgb_flag
+    assert details.sgb is cartridge.sgb_flag
+    assert details.licensee == cartridge.licensee
+    assert details.old_licensee == cartridge.old_licensee
+    assert details.publisher == cartridge.publisher
+    assert details.type == cartridge.type
+    assert details.rom_size == cartridge.rom_size
+    assert details.ram_size == cartridge.ram_size
+    assert details.destination == cartridge.destination
+    assert details.version == cartridge.version
+    assert details.valid is cartridge.header_checksum
+    assert details.valid_complete is cartridge.global_checksum
+
+
+def test_parse_header_only(mario: Path) -> None:
+    """Test parsing a lazy cartridge without the global checksum reads the header only."""
+    cartridge = Cartridge(mario, lazy=True)
+    details = cartridge.parse(complete=False)
+    assert details.valid_complete is None
+    assert details.title == "SUPER MARIOLAND"
+    assert "data" not in vars(cartridge)
+    assert "global_checksum" not in vars(cartridge)
+
+
+def test_parse_pickle(cartridge: Cartridge) -> None:
+    """Test parsed details can be sent back from worker processes."""
+    details = cartridge.parse()
+    assert pickle.loads(pickle.dumps(details)) == details  # noqa: S301
+
+
+@pytest.mark.parametrize("lazy", [False, True])
+@pytest.mark.parametrize("name", ["Super Mario Land (JUE) (V1.1) [!].gb", "Super Mario Land (W) (V1.1).zip"])
+def test_checksums(name: str, lazy: bool, mario: Path, roms: Path) -> None:
+    """Test digests computed in the same pass as the global checksum."""
+    data = mario.read_bytes()
+    cartridge = Cartridge(roms / name, lazy=lazy)
+    assert cartridge.checksums("crc32", "sha1") == {
+        "crc32": f"{zlib.crc32(data):08x}",
+        "sha1": hashlib.sha1(data).hexdigest(),  # noqa: S324
+    }
+    assert cartridge.__dict__["global_checksum"] is True
+    assert ("data" in vars(cartridge)) is not lazy
+
+
+@pytest.mark.parametrize(("lazy", "workers"), [(True, None), (False, 1), (False, 4)])
+def test_iter_zip(lazy: bool, workers: int | None, roms: Path) -> None:
+    """Test all ROMs of a ZIP file are available."""
+    rom = roms / "cpu" / "cpu_instrs.zip"
+    cartridges = list(Cartridge.iter_zip(rom, lazy=lazy, workers=workers))
+    assert len(cartridges) == 12
+    # Lazy ROMs are streamed from the archive, and not kept in memory
+    assert all(("data" in vars(cartridge)) is not lazy for cartridge in cartridges)
+    assert [cartridge.member for cartridge in cartridges][:2] == [
+        "cpu_instrs/cpu_instrs.gb",
+        "cpu_instrs/individual/01-special.gb",
+    ]
+    assert all(cartridge.rom == rom for cartridge in cartridges)
+    assert cartridges[0].title == "CPU_INSTRS"
+    assert [cartridge.is_valid(complete=True) for cartridge in cartridges] == [False] + [True] * 11
+
+
+def test_iter_zip_stopped_early(roms: Path) -> None:
+    """Test ROMs not loaded yet are cancelled when the consumer stops."""
+    cartridges = Cartridge.iter_zip(roms / "cpu" / "cpu_instrs.zip", lazy=False, workers=2)
+    assert next(cartridges).member == "cpu_instrs/cpu_instrs.gb"
+    cartridges.close()
+    assert next(cartridges, None) is None
+
+
+def test_zip_member(roms: Path) -> None:
+    """Test a given ROM of a ZIP file."""
+    rom = roms / "cpu" / "cpu_instrs.zip"
+    cartridge = Cartridge(rom, member="cpu_instrs/individual/01-special.gb")
+    assert cartridge.member == "cpu_instrs/individual/01-special.gb"
+    assert cartridge.is_valid(complete=True)
+
+
+def test_iter_zip_but_contains_no_rom(roms: Path) -> None:
+    """Test a ZIP file containing no ROM."""
+    with pytest.raises(InvalidZipError):
+        next(Cartridge.iter_zip(roms / "README.md.zip"))
@@ -0,0 +1,89 @@
+"""This is part of PyGameBoy, a Game Boy emulator written in Python 3.
+Source: https://github.com/BoboTiG/PyGameBoy
+"""
+
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from gameboy.cartridge import Cartridge
+from gameboy.catalog import Catalog
+from gameboy.library import find_roms
+
+
+@pytest.fixture(scope="module")
+def catalog(roms: Path) -> Catalog:
+    """All test ROMs, but the invalid one."""
+    files = [file for file in find_roms(roms) if file.name not in {"invalid.gb", "README.md.zip"}]
+    return Catalog.from_files(files)
+
+
+def test_columns(catalog: Catalog) -> None:
+    """Test all columns against the single cartridge implementation."""
+    for idx, name in enumerate(catalog.files):
+        file, _, member = name.partition(":")
+        if member:
+            cartridge = next(cartridge for cartridge in Cartridge.iter_zip(file) if cartridge.member == member)
+        else:
+            cartridge = Cartridge(Path(file), lazy=True)
+        assert catalog.title[idx] == cartridge.title
+        assert catalog.code[idx] == cartridge.code
+        assert catalog.cgb[idx] == cartridge.cgb_flag
+        assert catalog.sgb[idx] == cartridge.sgb_flag
+        assert catalog.licensee[idx] == cartridge.licensee
+        assert catalog.old_licensee[idx] == cartridge.old_licensee
+        assert catalog.publisher[idx] == cartridge.publisher
+        assert catalog.type[idx] == cartridge.type
+        assert catalog.rom_size[idx] == cartridge.rom_size
+        assert catalog.ram_size[idx] == cartridge.ram_size
+        assert catalog.destination[idx] == cartridge.destination
+        assert catalog.version[idx] == cartridge.version
+        assert catalog.header_checksum[idx] == cartridge.header_checksum
+        assert catalog.logo[idx]
+
+
+def test_query(catalog: Catalog) -> None:
+    """Test combining masks to query the catalog."""
+    assert len(catalog[catalog.type == "MBC1"]) > 1
+    assert not len(catalog[np.char.startswith(catalog.type, "MBC3+TIMER") & ~catalog.header_checksum])
+
+    battery = catalog[np.char.endswith(catalog.type, "+BATTERY") & (catalog.type != "MBC5+RAM+BATTERY")]
+    assert len(battery) == 18
+    assert all("oam_bug" in file for file in battery.files)
+    assert repr(battery) == "Catalog<18 ROMs>"
+
+
+def test_invalid_roms(roms: Path, mario: Path) -> None:
+    """Test truncated or unknown headers."""
+    data = bytearray(mario.read_bytes())
+    data[0x147] = 0x42  # Unknown type
+    data[0x14B] = 0x33  # New licensee code
+    data[0x144:0x146] = b"??"  # Unknown licensee
+    catalog = Catalog.from_cartridges([Cartridge(roms / "invalid.gb"), Cartridge(bytes(data))])
+    assert catalog.files.tolist() == [str(roms / "invalid.gb"), "."]
+    assert catalog.type.tolist() == ["", ""]
+    assert catalog.publisher[1] == ""
+    assert catalog.header_checksum.tolist() == [False, False]
+    assert catalog.logo.tolist() == [False, True]
+
+
+def test_save_and_load(catalog: Catalog, tmp_path: Path) -> None:
+    """Test the catalog persistence."""
+    file = tmp_path / "catalog.npz"
+    catalog.save(file)
+    loaded = Catalog.load(file)
+    assert np.array_equal(loaded.blocks, catalog.blocks)
+    assert loaded.files.tolist() == catalog.files.tolist()
+
+    # Nothing is pickled
+    with np.load(file, allow_pickle=False) as content:
+        assert content["files"].dtype.kind == "U"
+
+
+def test_zip_members(catalog: Catalog, roms: Path) -> None:
+    """Test every ROM of a ZIP file is part of the catalog."""
+    rom = roms / "cpu" / "cpu_instrs.zip"
+    members = [file for file in catalog.files if file.startswith(f"{rom}:")]
+    assert members == [f"{rom}:{cartridge.member}" for cartridge in Cartridge.iter_zip(rom)]
+    assert len(members) == 12
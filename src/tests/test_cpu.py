@@ -0,0 +1,129 @@
+"""This is part of PyGameBoy, a Game Boy emulator written in Python 3.
+Source: https://github.com/BoboTiG/PyGameBoy
+"""
+
+import pytest
+
+from gameboy.cpu import CB_OPCODES, CPU, INSTRUCTIONS, JOYPAD, OPCODES, TIMER, VBLANK
+from gameboy.exceptions import InvalidOpcodeError
+
+
+def load(program: bytes, address: int = 0x100) -> CPU:
+    """A CPU on a flat memory, about to execute *program*."""
+    memory = bytearray(0x10000)
+    memory[address : address + len(program)] = program
+    cpu = CPU(memory)
+    cpu.pc = address
+    return cpu
+
+
+def test_dispatch_tables() -> None:
+    """Test all opcodes are dispatched, and lengths match mnemonics."""
+    assert len(OPCODES) == len(CB_OPCODES) == 256
+    for instruction in filter(None, INSTRUCTIONS):
+        operands = {"": 0, "n": 1, "e": 1, "nn": 2}[instruction.operand]
+        assert instruction.length == 1 + operands, instruction
+
+
+@pytest.mark.parametrize("opcode", [0xD3, 0xDB, 0xDD, 0xE3, 0xE4, 0xEB, 0xEC, 0xED, 0xF4, 0xFC, 0xFD])
+def test_illegal_opcode(opcode: int) -> None:
+    """Test illegal opcodes stop the emulation."""
+    cpu = load(bytes([opcode]))
+    with pytest.raises(InvalidOpcodeError) as exc:
+        cpu.step()
+    assert str(exc.value) == f"InvalidOpcodeError: illegal opcode {opcode:02X}h at 0100h."
+
+
+def test_cycles() -> None:
+    """Test cycles of conditional branches, taken or not."""
+    cpu = load(bytes([0xAF, 0x20, 0x10, 0x28, 0x10]))  # XOR A; JR NZ,+16; JR Z,+16
+    assert [cpu.step(), cpu.step(), cpu.step()] == [4, 8, 12]
+    assert cpu.pc == 0x115
+
+
+def test_alu_flags() -> None:
+    """Test half-carry and carry flags."""
+    cpu = load(bytes([0x3E, 0x0F, 0xC6, 0xF1, 0x27, 0xCB, 0x37]))  # LD A,0Fh; ADD A,F1h; DAA; SWAP A
+    cpu.step()
+    cpu.step()
+    assert (cpu.a, cpu.f) == (0x00, 0xB0)
+    cpu.step()
+    assert (cpu.a, cpu.f) == (0x66, 0x10)
+    assert cpu.step() == 8
+    assert (cpu.a, cpu.f) == (0x66, 0x00)
+
+
+def test_push_pop_af() -> None:
+    """Test the lower nibble of F always reads as zero."""
+    cpu = load(bytes([0x01, 0xFF, 0x12, 0xC5, 0xF1]))  # LD BC,12FFh; PUSH BC; POP AF
+    cpu.step()
+    cpu.step()
+    cpu.step()
+    assert (cpu.a, cpu.f, cpu.sp) == (0x12, 0xF0, 0xFFFE)
+
+
+def test_interrupt() -> None:
+    """Test the highest priority interrupt is serviced first."""
+    cpu = load(bytes([0x00]))
+    cpu.ime = True
+    cpu.interrupt_enable = TIMER | VBLANK
+    cpu.interrupt_flag = TIMER | VBLANK
+    assert cpu.step() == 20
+    assert (cpu.pc, cpu.sp, cpu.ime, cpu.interrupt_flag) == (0x40, 0xFFFC, False, TIMER)
+    assert (cpu.read(0xFFFC), cpu.read(0xFFFD)) == (0x00, 0x01)
+
+
+def test_ei_delay() -> None:
+    """Test interrupts are enabled after the instruction following EI, unless it is DI."""
+    cpu = load(bytes([0xFB, 0x00, 0xFB, 0xF3]))  # EI; NOP; EI; DI
+    assert cpu.step() == 8
+    assert cpu.ime
+    assert cpu.pc == 0x102
+    cpu.step()
+    assert not cpu.ime
+
+
+def test_halt() -> None:
+    """Test HALT sleeps until an interrupt is pending, even when they are disabled."""
+    cpu = load(bytes([0x76, 0x3C]))  # HALT; INC A
+    cpu.interrupt_enable = TIMER
+    cpu.step()
+    assert cpu.halted
+    assert cpu.step() == 4
+    cpu.interrupt_flag |= TIMER
+    cpu.step()
+    assert not cpu.halted
+    assert (cpu.a, cpu.pc) == (0x02, 0x102)
+
+
+def test_halt_bug() -> None:
+    """Test the byte following HALT is read twice, when an interrupt is pending but disabled."""
+    cpu = load(bytes([0x76, 0x3C]))  # HALT; INC A
+    cpu.interrupt_enable = cpu.interrupt_flag = TIMER
+    assert cpu.step() == 8
+    assert not cpu.halted
+    cpu.step()
+    assert (cpu.a, cpu.pc) == (0x03, 0x102)
+
+
+def test_stop() -> None:
+    """Test STOP sleeps until a button is pressed."""
+    cpu = load(bytes([0x10, 0x00, 0x3C]))  # STOP; INC A
+    cpu.step()
+    assert cpu.stopped
+    assert cpu.halted
+    assert cpu.pc == 0x102
+
+    # The joypad interrupt wakes it up
+    cpu.interrupt_enable = cpu.interrupt_flag = JOYPAD
+    cpu.step()
+    assert not cpu.stopped
+    assert not cpu.halted
+
+
+def test_run() -> None:
+    """Test running until a given cycle."""
+    cpu = load(bytes([0x18, 0xFE]))  # JR -2
+    cpu.run(100)
+    assert cpu.cycles == 108
+    assert repr(cpu) == ("CPU<AF=01B0 BC=0013 DE=00D8 HL=014D SP=FFFE PC=0100 IME=0 IE=00 IF=01 cycles=108>")
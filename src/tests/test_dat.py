@@ -0,0 +1,87 @@
+"""This is part of PyGameBoy, a Game Boy emulator written in Python 3.
+Source: https://github.com/BoboTiG/PyGameBoy
+"""
+
+import hashlib
+import shutil
+import zlib
+from pathlib import Path
+
+import pytest
+
+from gameboy.cartridge import Cartridge
+from gameboy.dat import Dat, HashIndex, RomHashes, hash_cartridge, hash_file
+
+DAT = """<?xml version="1.0"?>
+<!DOCTYPE datafile PUBLIC "-//Logiqx//DTD ROM Management Datafile//EN" "http://www.logiqx.com/Dats/datafile.dtd">
+<datafile>
+    <header>
+        <name>Nintendo - Game Boy</name>
+        <description>Nintendo - Game Boy</description>
+    </header>
+    <game name="Super Mario Land (World) (Rev 1)">
+        <description>Super Mario Land (World) (Rev 1)</description>
+        <rom name="Super Mario Land (World) (Rev 1).gb" size="65536" crc="{crc32}" md5="{md5}" sha1="{sha1}"/>
+    </game>
+    <game name="Only CRC">
+        <rom name="Only CRC.gb" size="32768" crc="DEADBEEF"/>
+    </game>
+</datafile>
+"""
+
+
+@pytest.fixture
+def dat(mario: Path, tmp_path: Path) -> Path:
+    """A DAT file knowing Super Mario Land, hashes are uppercase like in real files."""
+    data = mario.read_bytes()
+    file = tmp_path / "gb.dat"
+    file.write_text(
+        DAT.format(
+            crc32=f"{zlib.crc32(data):08X}",
+            md5=hashlib.md5(data).hexdigest().upper(),  # noqa: S324
+            sha1=hashlib.sha1(data).hexdigest().upper(),  # noqa: S324
+        )
+    )
+    return file
+
+
+def test_hash_cartridge(mario: Path) -> None:
+    """Test all hashes are computed, along with the global checksum."""
+    data = mario.read_bytes()
+    cartridge = Cartridge(mario, lazy=True)
+    rom = hash_cartridge(cartridge)
+    assert rom.file == str(mario)
+    assert rom.crc32 == f"{zlib.crc32(data):08x}"
+    assert rom.md5 == hashlib.md5(data).hexdigest()  # noqa: S324
+    assert rom.sha1 == hashlib.sha1(data).hexdigest()  # noqa: S324
+    assert cartridge.__dict__["global_checksum"] is True
+    assert "data" not in vars(cartridge)
+
+
+def test_hash_file_zip(roms: Path) -> None:
+    """Test all ROMs of a ZIP file are hashed."""
+    hashes = list(hash_file(roms / "cpu" / "cpu_instrs.zip"))
+    assert len(hashes) == 12
+    assert hashes[0].file.endswith("cpu_instrs.zip:cpu_instrs/cpu_instrs.gb")
+
+
+def test_duplicates(mario: Path, roms: Path, tmp_path: Path) -> None:
+    """Test duplicates detection."""
+    shutil.copy(mario, tmp_path / "copy.gb")
+    index = HashIndex.from_files([mario, tmp_path / "copy.gb", roms / "cpu" / "cpu_instrs.zip"])
+    assert len(index) == 14
+    assert index.duplicates() == [[str(mario), str(tmp_path / "copy.gb")]]
+
+
+def test_dat(dat: Path, mario: Path, roms: Path) -> None:
+    """Test matching ROMs against a DAT file."""
+    games = Dat(dat)
+    assert games.name == "Nintendo - Game Boy"
+
+    index = HashIndex.from_files([mario, roms / "cpu" / "01-special.gb"])
+    known, unknown = games.match_all(index)
+    assert known == {str(mario): "Super Mario Land (World) (Rev 1)"}
+    assert unknown == [str(roms / "cpu" / "01-special.gb")]
+
+    # Some entries only have a CRC
+    assert games.match(RomHashes(file="", crc32="deadbeef", md5="", sha1="")) == "Only CRC"
@@ -0,0 +1,69 @@
+"""This is part of PyGameBoy, a Game Boy emulator written in Python 3.
+Source: https://github.com/BoboTiG/PyGameBoy
+"""
+
+from pathlib import Path
+
+import pytest
+
+from gameboy import offset
+from gameboy.apu import APU
+from gameboy.cartridge import Cartridge
+from gameboy.cpu import CPU
+from gameboy.dma import DMA_CYCLES
+from gameboy.memory import Handlers
+from gameboy.mmu import MMU
+from gameboy.ppu import PPU
+from gameboy.scheduler import Scheduler
+from gameboy.timer import Timer
+
+
+@pytest.fixture
+def mmu(roms: Path) -> MMU:
+    """The memory map of a 64 KiB MBC1 cartridge."""
+    cpu = CPU()
+    scheduler = Scheduler()
+    timer = Timer(cpu, scheduler)
+    return MMU(
+        Cartridge(roms / "cpu" / "cpu_instrs.gb"),
+        cpu,
+        timer,
+        scheduler,
+        PPU(cpu, scheduler),
+        APU(cpu, scheduler, timer),
+    )
+
+
+def test_dma(mmu: MMU) -> None:
+    """Test the OAM is copied, and not accessible until the transfer ends."""
+    data = bytes(range(0xA0))
+    mmu.wram[0x100:0x1A0] = data
+    mmu.write(offset.DMA, 0xC1)
+    assert mmu.ppu.oam == data
+    assert mmu.read(offset.DMA) == 0xC1
+
+    assert mmu.dma.active
+    assert mmu.read(0xFE00) == 0xFF
+    mmu.write(0xFE00, 0x42)
+    assert mmu.ppu.oam[0] == 0x00
+
+    mmu.cpu.cycles += DMA_CYCLES
+    mmu.scheduler.run(mmu.cpu.cycles)
+    assert not mmu.dma.active
+    assert mmu.read(0xFE01) == 0x01
+
+
+def test_dma_sources(mmu: MMU) -> None:
+    """Test sources are read through the page tables: mirrors of the work RAM, and registers."""
+    mmu.wram[0x1E00:0x1EA0] = bytes(range(0x5F, 0xFF))
+    mmu.write(offset.DMA, 0xFE)
+    assert mmu.ppu.oam == mmu.wram[0x1E00:0x1EA0]
+
+    mmu.read_pages[0xA0] = Handlers(0xA000, lambda address: address & 0x7F, mmu.write)
+    mmu.write(offset.DMA, 0xA0)
+    assert mmu.ppu.oam == bytes(index & 0x7F for index in range(0xA0))
+
+    # The same sprites, again
+    selection = mmu.ppu.index()
+    mmu.write(offset.DMA, 0xA0)
+    assert mmu.ppu.selection is selection
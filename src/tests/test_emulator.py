@@ -0,0 +1,76 @@
+"""This is part of PyGameBoy, a Game Boy emulator written in Python 3.
+Source: https://github.com/BoboTiG/PyGameBoy
+"""
+
+from pathlib import Path
+
+import pytest
+
+from gameboy.blargg import run_rom
+from gameboy.cartridge import Cartridge
+from gameboy.cpu import TIMER
+from gameboy.emulator import CYCLES_PER_FRAME, FPS, Emulator, headless
+
+
+@pytest.mark.parametrize(
+    ("name", "frames"),
+    [
+        ("cpu/01-special.gb", 200),
+        ("cpu/02-interrupts.gb", 50),
+        ("cpu/03-op sp,hl.gb", 200),
+        ("cpu/04-op r,imm.gb", 250),
+        ("cpu/05-op rp.gb", 300),
+        ("cpu/06-ld r,r.gb", 50),
+        ("cpu/07-jr,jp,call,ret,rst.gb", 50),
+        ("cpu/08-misc instrs.gb", 50),
+        ("cpu/09-op r,r.gb", 700),
+        pytest.param("cpu/10-bit ops.gb", 1000, marks=pytest.mark.slow),
+        pytest.param("cpu/11-op a,(hl).gb", 1300, marks=pytest.mark.slow),
+        pytest.param("cpu/cpu_instrs.gb", 4000, marks=pytest.mark.slow),
+        ("other/instr_timing.gb", 50),
+    ],
+)
+def test_blargg(roms: Path, name: str, frames: int) -> None:
+    """Test CPU instructions, and their timings."""
+    result = run_rom(roms / name, cycles=frames * CYCLES_PER_FRAME, blocks=False)
+    assert result.passed, result.output
+
+
+def test_serial(roms: Path) -> None:
+    """Test bytes sent through the serial port are captured."""
+    emulator = Emulator(Cartridge(roms / "cpu" / "06-ld r,r.gb"))
+    emulator.run_frames(10)
+    assert emulator.serial.startswith(b"06-ld r,r\n")
+
+
+def test_headless(roms: Path) -> None:
+    """Test a headless run, and its report."""
+    report = headless(Cartridge(roms / "cpu" / "06-ld r,r.gb"), frames=2, cycles=100, sampling=0, blocks=True)
+    assert (report.frames, report.cycles) == (2, 2 * 70224 + 100)
+    assert report.fps > 0
+    assert report.speed == report.fps / FPS
+    assert report._replace(seconds=0).fps == 0
+
+
+def test_halt_fast_forward() -> None:
+    """Test the clock jumps to the next event while halted, instead of stepping idle cycles."""
+    data = bytearray(0x8000)
+    # LD A,05h; LDH (TAC),A; LD A,04h; LDH (IE),A; XOR A; LDH (IF),A; HALT; INC B
+    code = bytes([0x3E, 0x05, 0xE0, 0x07, 0x3E, 0x04, 0xE0, 0xFF, 0xAF, 0xE0, 0x0F, 0x76, 0x04])
+    data[0x100 : 0x100 + len(code)] = code
+    emulator = Emulator(Cartridge(bytes(data)))
+    cpu = emulator.cpu
+    while not cpu.halted:
+        elapsed = cpu.step()
+        cpu.cycles += elapsed
+
+    # TIMA overflows after 256 increments, every 16 cycles
+    elapsed = cpu.step()
+    assert 0x100 * 16 - 64 < elapsed <= 0x100 * 16
+    assert elapsed % 4 == 0
+    assert cpu.cycles + elapsed >= emulator.scheduler.deadline
+
+    emulator.run(elapsed + 4)
+    assert cpu.interrupt_flag & TIMER
+    assert not cpu.halted
+    assert cpu.b == 0x01
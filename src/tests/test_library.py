@@ -0,0 +1,154 @@
+"""This is part of PyGameBoy, a Game Boy emulator written in Python 3.
+Source: https://github.com/BoboTiG/PyGameBoy
+"""
+
+import os
+import shutil
+import sqlite3
+from pathlib import Path
+
+import pytest
+
+from gameboy.library import ScanResult, evict, find_roms, inspect, scan, validity
+
+
+def test_find_roms(roms: Path) -> None:
+    """Test ROM files discovery, ZIP files included."""
+    files = list(find_roms(roms))
+    assert roms / "Super Mario Land (JUE) (V1.1) [!].gb" in files
+    assert roms / "cpu" / "cpu_instrs.zip" in files
+    assert roms / "README.md" not in files
+
+
+def test_inspect(mario: Path) -> None:
+    """Test the details of one ROM."""
+    (row,) = inspect(mario)
+    assert row["path"] == str(mario)
+    assert row["member"] == ""
+    assert row["title"] == "SUPER MARIOLAND"
+    assert row["valid_complete"] is True
+    assert row["header_checksum"] == 0x9D
+    assert row["global_checksum"] == 0x5ECF
+    assert row["error"] == ""
+
+
+def test_inspect_zip(roms: Path) -> None:
+    """Test the details of one ROM inside a ZIP file."""
+    (row,) = inspect(roms / "Super Mario Land (W) (V1.1).zip")
+    assert row["member"].endswith(".gb")
+    assert row["title"] == "SUPER MARIOLAND"
+    assert row["crc"] == 0x2C27EC70
+
+
+def test_inspect_zip_several_roms(roms: Path) -> None:
+    """Test the details of all ROMs inside a ZIP file."""
+    rows = inspect(roms / "cpu" / "cpu_instrs.zip")
+    assert len(rows) == 12
+    assert rows[0]["member"] == "cpu_instrs/cpu_instrs.gb"
+    assert rows[1]["member"] == "cpu_instrs/individual/01-special.gb"
+    assert all(row["valid"] for row in rows)
+
+
+def test_inspect_error(roms: Path) -> None:
+    """Test a ZIP file without ROM is reported, not raised."""
+    (row,) = inspect(roms / "README.md.zip")
+    assert row["title"] is None
+    assert "InvalidZipError" in row["error"]
+
+
+def test_inspect_missing(tmp_path: Path) -> None:
+    """Test a file that disappeared is reported, not raised."""
+    (row,) = inspect(tmp_path / "gone.gb")
+    assert row["size"] is None
+    assert "No such file" in row["error"]
+
+
+def test_scan(roms: Path, tmp_path: Path) -> None:
+    """Test a whole folder indexation."""
+    index = tmp_path / "index.db"
+    count = len(list(find_roms(roms)))
+    assert scan(roms, index, workers=2) == ScanResult(found=count, parsed=count, evicted=0)
+
+    with sqlite3.connect(index) as db:
+        # Some ZIP files contain several ROMs
+        rows = sum(len(inspect(file)) for file in find_roms(roms))
+        assert db.execute("SELECT COUNT(*) FROM roms").fetchone() == (rows,)
+        (title,) = db.execute("SELECT title FROM roms WHERE path = ?", (str(roms / "invalid.gb"),)).fetchone()
+        assert title is None
+
+    # Nothing changed, nothing to parse
+    assert scan(roms, index, workers=1) == ScanResult(found=count, parsed=0, evicted=0)
+
+
+@pytest.fixture
+def library(roms: Path, tmp_path: Path) -> Path:
+    """A small ROM library that can be altered."""
+    folder = tmp_path / "library"
+    folder.mkdir()
+    shutil.copy(roms / "Super Mario Land (JUE) (V1.1) [!].gb", folder / "mario.gb")
+    shutil.copy(roms / "Super Mario Land (W) (V1.1).zip", folder / "mario.zip")
+    shutil.copy(roms / "invalid.gb", folder / "invalid.gb")
+    return folder
+
+
+def test_scan_incremental(library: Path, tmp_path: Path) -> None:
+    """Test only modified files are parsed again."""
+    index = tmp_path / "index.db"
+    assert scan(library, index) == ScanResult(found=3, parsed=3, evicted=0)
+
+    # Metadata changes of a ZIP file are not enough, its ROM CRC must change too
+    os.utime(library / "mario.zip", ns=(1, 1))
+    assert scan(library, index) == ScanResult(found=3, parsed=0, evicted=0)
+    assert scan(library, index) == ScanResult(found=3, parsed=0, evicted=0)
+
+    # But it is enough for a ROM file
+    os.utime(library / "mario.gb", ns=(1, 1))
+    assert scan(library, index) == ScanResult(found=3, parsed=1, evicted=0)
+
+    # Removed files are evicted
+    (library / "invalid.gb").unlink()
+    assert scan(library, index) == ScanResult(found=2, parsed=0, evicted=1)
+    assert [valid for *_, valid in validity(index, library)] == [True, True]
+
+
+def test_scan_corrupted(library: Path, tmp_path: Path) -> None:
+    """Test a ZIP file corrupted after its indexation is parsed again, and reported."""
+    index = tmp_path / "index.db"
+    scan(library, index)
+    (library / "mario.zip").write_bytes(b"garbage")
+    assert scan(library, index) == ScanResult(found=3, parsed=1, evicted=0)
+
+    with sqlite3.connect(index) as db:
+        (error,) = db.execute("SELECT error FROM roms WHERE path = ?", (str(library / "mario.zip"),)).fetchone()
+    assert "not a zip file" in error.lower()
+
+
+def test_scan_relative(library: Path, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test paths are resolved, relative and absolute ones are the same files."""
+    index = tmp_path / "index.db"
+    monkeypatch.chdir(library)
+    assert scan(Path(), index) == ScanResult(found=3, parsed=3, evicted=0)
+    assert scan(library, index) == ScanResult(found=3, parsed=0, evicted=0)
+    assert len(list(validity(index, Path()))) == 3
+
+    with sqlite3.connect(index) as db:
+        assert db.execute("SELECT COUNT(*) FROM roms").fetchone() == (3,)
+
+
+def test_evict(library: Path, tmp_path: Path) -> None:
+    """Test the explicit eviction of files that disappeared."""
+    index = tmp_path / "index.db"
+    scan(library, index)
+    assert evict(index) == 0
+
+    shutil.rmtree(library)
+    assert evict(index) == 3
+    assert not list(validity(index, library))
+
+
+def test_index_version(library: Path, tmp_path: Path) -> None:
+    """Test an index created by another version is rebuilt."""
+    index = tmp_path / "index.db"
+    with sqlite3.connect(index) as db:
+        db.execute("CREATE TABLE roms (path, member)")
+    assert scan(library, index).parsed == 3
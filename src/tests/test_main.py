@@ -30,6 +30,62 @@ def test_check_bad(roms: Path) -> None:
     assert main(roms / "invalid.gb", "check") == 1
 
 
-def test_dump(mario: Path) -> None:
-    """Test the ROM 'dump' argument."""
+def test_check_zip(roms: Path, capsys: pytest.CaptureFixture) -> None:
+    """Test the ROM 'check' argument with a ZIP file containing several ROMs."""
+    assert main(roms / "cpu" / "cpu_instrs.zip", "check") == 1
+    lines = capsys.readouterr().out.splitlines()
+    assert len(lines) == 12
+    assert "NG" in lines[0]
+
+
+def test_dump(mario: Path, capsys: pytest.CaptureFixture) -> None:
+    """Test the ROM 'dump' argument, the global checksum is not verified."""
     assert main(mario, "dump") == 0
+    output = capsys.readouterr().out
+    assert "title" in output
+    assert "valid_complete" not in output
+
+
+def test_dump_zip(roms: Path, capsys: pytest.CaptureFixture) -> None:
+    """Test the ROM 'dump' argument with a ZIP file containing several ROMs."""
+    assert main(roms / "cpu" / "cpu_instrs.zip", "dump") == 0
+    assert capsys.readouterr().out.count("member") == 12
+
+
+def test_scan(roms: Path, tmp_path: Path) -> None:
+    """Test the folder 'scan' argument."""
+    index = tmp_path / "index.db"
+    assert main(roms / "cpu", "scan", str(index)) == 0
+    assert index.is_file()
+
+
+def test_check_folder(roms: Path, tmp_path: Path) -> None:
+    """Test the 'check' argument with a folder, 'invalid.gb' is part of it."""
+    index = tmp_path / "index.db"
+    assert main(roms, "check", str(index)) == 1
+    assert main(roms / "other", "check", str(index)) == 0
+
+
+def test_run(roms: Path, capsys: pytest.CaptureFixture) -> None:
+    """Test the ROM 'run' argument."""
+    rom = roms / "cpu" / "cpu_instrs.gb"
+    assert main(rom, "run", "--frames", "2", "--headless", "--sampling", "0") == 0
+    assert "2 frames in" in capsys.readouterr().out
+
+    with pytest.raises(SystemExit):
+        main(rom, "run", "--headless")
+
+
+def test_test(roms: Path, tmp_path: Path, capsys: pytest.CaptureFixture) -> None:
+    """Test the ROM 'test' argument, with a file, and a folder."""
+    assert main(roms / "cpu" / "06-ld r,r.gb", "test") == 0
+    assert "06-ld r,r.gb" in capsys.readouterr().out
+
+    for name in ("06-ld r,r.gb", "07-jr,jp,call,ret,rst.gb"):
+        (tmp_path / name).write_bytes((roms / "cpu" / name).read_bytes())
+    (tmp_path / "invalid.gb").write_bytes((roms / "invalid.gb").read_bytes())
+    assert main(tmp_path, "test", "--frames", "5", "--workers", "1") == 1
+    lines = capsys.readouterr().out.splitlines()
+    assert len(lines) == 3
+    assert "??" in lines[0]
+    assert "NG" in lines[2]
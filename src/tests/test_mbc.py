@@ -0,0 +1,211 @@
+"""This is part of PyGameBoy, a Game Boy emulator written in Python 3.
+Source: https://github.com/BoboTiG/PyGameBoy
+"""
+
+import pytest
+
+from gameboy import offset
+from gameboy.apu import APU
+from gameboy.cartridge import Cartridge
+from gameboy.cpu import CPU, FREQUENCY
+from gameboy.exceptions import UnsupportedCartridgeError
+from gameboy.mbc import MBC, MBC1, MBC2, MBC3, MBC5
+from gameboy.mmu import MMU
+from gameboy.ppu import PPU
+from gameboy.scheduler import Scheduler
+from gameboy.timer import Timer
+
+
+def memory(kind: int, banks: int = 4, ram: int = 0x00) -> MMU:
+    """The memory map of a cartridge of *kind*, with *banks* ROM banks starting with their number,
+    and the *ram* size code.
+    """
+    data = bytearray(banks * 0x4000)
+    for bank in range(banks):
+        data[bank * 0x4000 : bank * 0x4000 + 2] = bank.to_bytes(2, "little")
+    data[offset.TYPE] = kind
+    data[offset.RAM_SIZE] = ram
+    cpu = CPU()
+    scheduler = Scheduler()
+    timer = Timer(cpu, scheduler)
+    return MMU(Cartridge(bytes(data)), cpu, timer, scheduler, PPU(cpu, scheduler), APU(cpu, scheduler, timer))
+
+
+def bank(mmu: MMU) -> int:
+    """The ROM bank mapped at 4000h."""
+    return mmu.read(0x4000) | mmu.read(0x4001) << 8
+
+
+def test_zero_copy() -> None:
+    """Test banks are views on the cartridge data, switching banks swaps references."""
+    mmu = memory(0x01, banks=8)
+    mmu.write(0x2000, 5)
+    page = mmu.read_pages[0x40]
+    assert page is mmu.mbc.rom_banks[5][0]
+    assert isinstance(page, memoryview)
+    assert page.obj is mmu.mbc.rom
+
+
+def test_padding() -> None:
+    """Test small ROMs are padded to whole banks."""
+    cpu = CPU()
+    scheduler = Scheduler()
+    timer = Timer(cpu, scheduler)
+    mmu = MMU(Cartridge(bytes(0x5000)), cpu, timer, scheduler, PPU(cpu, scheduler), APU(cpu, scheduler, timer))
+    assert len(mmu.mbc.rom) == 0x8000
+    assert mmu.read(0x7FFF) == 0xFF
+
+
+def test_unsupported() -> None:
+    """Test unsupported controllers."""
+    with pytest.raises(UnsupportedCartridgeError) as exc:
+        memory(0x0B)
+    assert str(exc.value) == "UnsupportedCartridgeError: MMM01 cartridges are not supported."
+
+
+def test_rom_only() -> None:
+    """Test cartridges without a controller: nothing to switch, RAM always enabled."""
+    mmu = memory(0x08, banks=2, ram=0x01)
+    assert type(mmu.mbc) is MBC
+    mmu.write(0x2000, 1)
+    assert bank(mmu) == 1
+    # 2 KiB of RAM, mirrored
+    mmu.write(0xA000, 0x42)
+    assert mmu.read(0xA800) == 0x42
+    assert memory(0x00, banks=2).read(0xA000) == 0xFF
+
+
+def test_mbc1_rom_banks() -> None:
+    """Test MBC1 ROM banks switching."""
+    mmu = memory(0x01, banks=64)
+    assert isinstance(mmu.mbc, MBC1)
+    assert bank(mmu) == 1
+    mmu.write(0x2000, 3)
+    assert bank(mmu) == 3
+    # Bank 0 cannot be selected, and out of range banks are wrapped
+    mmu.write(0x2000, 0)
+    assert bank(mmu) == 1
+    mmu.write(0x2000, 0x45)
+    assert bank(mmu) == 5
+    mmu.write(0x4000, 1)
+    assert bank(mmu) == 0x25
+    assert mmu.read(0x0000) == 0
+
+    # In advanced mode, the fixed bank follows the upper bits too
+    mmu.write(0x6000, 1)
+    assert mmu.read(0x0000) == 0x20
+    assert mmu.mbc.ram_bank == 1
+
+
+def test_mbc1_ram_banks() -> None:
+    """Test MBC1 RAM enabling, and banks switching."""
+    mmu = memory(0x03, ram=0x03)
+    mmu.write(0xA000, 0x42)
+    assert mmu.read(0xA000) == 0xFF
+    mmu.write(0x0000, 0x0A)
+    mmu.write(0x6000, 1)
+    mmu.write(0x4000, 2)
+    mmu.write(0xA000, 0x42)
+    assert mmu.read(0xA000) == 0x42
+    assert mmu.mbc.ram[2 * 0x2000] == 0x42
+    mmu.write(0x0000, 0x00)
+    assert mmu.read(0xA000) == 0xFF
+
+
+def test_mbc2() -> None:
+    """Test MBC2 registers, selected by bit 8 of the address, and its RAM of half-bytes."""
+    mmu = memory(0x06, banks=16)
+    assert isinstance(mmu.mbc, MBC2)
+    mmu.write(0x2100, 7)
+    assert bank(mmu) == 7
+    mmu.write(0x0100, 0)
+    assert bank(mmu) == 1
+    mmu.write(0x6000, 1)
+    assert bank(mmu) == 1
+
+    mmu.write(0x0000, 0x0A)
+    mmu.write(0xA001, 0x42)
+    assert (mmu.read(0xA001), mmu.read(0xA201), mmu.read(0xBE01)) == (0xF2, 0xF2, 0xF2)
+    mmu.write(0x0000, 0x00)
+    assert mmu.read(0xA001) == 0xFF
+
+
+def test_mbc3() -> None:
+    """Test MBC3 ROM and RAM banks switching."""
+    mmu = memory(0x13, banks=128, ram=0x03)
+    assert isinstance(mmu.mbc, MBC3)
+    mmu.write(0x2000, 0x7F)
+    assert bank(mmu) == 0x7F
+    mmu.write(0x2000, 0)
+    assert bank(mmu) == 1
+
+    mmu.write(0x0000, 0x0A)
+    mmu.write(0x4000, 3)
+    mmu.write(0xA000, 0x42)
+    assert mmu.mbc.ram[3 * 0x2000] == 0x42
+    # Not a RAM bank, nor a RTC register
+    mmu.write(0x4000, 5)
+    assert mmu.mbc.ram_bank == 3
+
+
+def test_mbc3_rtc() -> None:
+    """Test the real time clock of MBC3 cartridges, latched, and running on the emulated time."""
+    mmu = memory(0x10, ram=0x03)
+    cpu = mmu.cpu
+    mmu.write(0x0000, 0x0A)
+
+    def latch() -> bytes:
+        mmu.write(0x6000, 0)
+        mmu.write(0x6000, 1)
+        registers = []
+        for register in range(0x08, 0x0D):
+            mmu.write(0x4000, register)
+            registers.append(mmu.read(0xA000))
+        return bytes(registers)
+
+    cpu.cycles += (((1 * 24 + 2) * 60 + 3) * 60 + 4) * FREQUENCY
+    assert latch() == bytes([4, 3, 2, 1, 0])
+    # Not latched
+    cpu.cycles += FREQUENCY
+    assert mmu.read(0xA000) == 0
+    mmu.write(0x6000, 1)
+    assert mmu.read(0xA000) == 0
+
+    # Set the day counter, and halt the clock
+    mmu.write(0x4000, 0x0B)
+    mmu.write(0xA000, 0xFF)
+    mmu.write(0x4000, 0x0C)
+    mmu.write(0xA000, 0x41)
+    cpu.cycles += FREQUENCY
+    assert latch() == bytes([5, 3, 2, 0xFF, 0x41])
+
+    # Set the time, resume, and overflow the day counter
+    for register, value in zip(range(0x08, 0x0B), (59, 59, 23), strict=True):
+        mmu.write(0x4000, register)
+        mmu.write(0xA000, value)
+    mmu.write(0x4000, 0x0C)
+    mmu.write(0xA000, 0x01)
+    cpu.cycles += FREQUENCY
+    assert latch() == bytes([0, 0, 0, 0, 0x80])
+    mmu.write(0xA000, 0x00)
+    assert latch() == bytes([0, 0, 0, 0, 0])
+
+
+def test_mbc5() -> None:
+    """Test MBC5 9-bit ROM bank, bank 0 included, and RAM banks."""
+    mmu = memory(0x1B, banks=512, ram=0x04)
+    assert isinstance(mmu.mbc, MBC5)
+    mmu.write(0x2000, 0)
+    assert bank(mmu) == 0
+    mmu.write(0x2000, 0x42)
+    mmu.write(0x3000, 1)
+    assert bank(mmu) == 0x142
+    mmu.write(0x2000, 0x10)
+    assert bank(mmu) == 0x110
+
+    mmu.write(0x0000, 0x0A)
+    mmu.write(0x4000, 0x0F)
+    mmu.write(0xA000, 0x42)
+    assert mmu.mbc.ram[15 * 0x2000] == 0x42
+    mmu.write(0x6000, 1)
+    assert mmu.mbc.ram_bank == 0x0F
@@ -0,0 +1,132 @@
+"""This is part of PyGameBoy, a Game Boy emulator written in Python 3.
+Source: https://github.com/BoboTiG/PyGameBoy
+"""
+
+from pathlib import Path
+
+import pytest
+
+from gameboy import offset
+from gameboy.apu import APU
+from gameboy.cartridge import Cartridge
+from gameboy.cpu import CPU, SERIAL, TIMER
+from gameboy.memory import Handlers
+from gameboy.mmu import MMU, SERIAL_CYCLES
+from gameboy.ppu import PPU
+from gameboy.scheduler import Scheduler
+from gameboy.timer import Timer
+
+
+@pytest.fixture
+def mmu(roms: Path) -> MMU:
+    """The memory map of a 64 KiB MBC1 cartridge."""
+    cpu = CPU()
+    scheduler = Scheduler()
+    timer = Timer(cpu, scheduler)
+    return MMU(
+        Cartridge(roms / "cpu" / "cpu_instrs.gb"),
+        cpu,
+        timer,
+        scheduler,
+        PPU(cpu, scheduler),
+        APU(cpu, scheduler, timer),
+    )
+
+
+def test_plugged(mmu: MMU) -> None:
+    """Test the CPU uses the MMU."""
+    assert mmu.cpu.read == mmu.read
+    assert mmu.cpu.write == mmu.write
+
+
+@pytest.mark.parametrize("address", [0x8000, 0x9FFF, 0xC000, 0xDFFF, 0xFE00, 0xFE9F, 0xFF80, 0xFFFE])
+def test_ram(mmu: MMU, address: int) -> None:
+    """Test RAMs are readable and writable."""
+    mmu.write(address, 0x42)
+    assert mmu.read(address) == 0x42
+
+
+def test_echo_ram(mmu: MMU) -> None:
+    """Test echo RAM mirrors the work RAM."""
+    mmu.write(0xE010, 0x42)
+    assert mmu.read(0xC010) == 0x42
+    assert mmu.read(0xE010) == 0x42
+
+
+def test_not_usable(mmu: MMU) -> None:
+    """Test the not usable area is ignored."""
+    mmu.write(0xFEA0, 0x42)
+    assert mmu.read(0xFEA0) == 0xFF
+
+
+def test_page_tables(mmu: MMU) -> None:
+    """Test plain memory pages are views on buffers, registers pages are handlers."""
+    page = mmu.read_pages[0x00]
+    assert isinstance(page, memoryview)
+    assert page.obj is mmu.mbc.rom
+    assert mmu.read_pages[0xC0] is mmu.write_pages[0xC0] is mmu.read_pages[0xE0]
+    assert isinstance(mmu.write_pages[0x20], Handlers)
+    assert isinstance(mmu.read_pages[0xFE], Handlers)
+
+
+def test_watch(mmu: MMU) -> None:
+    """Test writes to a watched work RAM page, echo RAM included, are reported until unwatched."""
+    offsets: list[int] = []
+    mmu.watch(0x01, offsets.append)
+    mmu.write(0xC142, 1)
+    mmu.write(0xE1FF, 2)
+    assert offsets == [0x142, 0x1FF]
+    assert (mmu.read(0xC142), mmu.read(0xC1FF)) == (1, 2)
+
+    mmu.unwatch(0x01)
+    mmu.write(0xC142, 3)
+    assert offsets == [0x142, 0x1FF]
+    assert mmu.read(0xE142) == 3
+
+    # The last pages have no echo
+    mmu.watch(0x1F, offsets.append)
+    mmu.write(0xDF00, 4)
+    mmu.unwatch(0x1F)
+    assert offsets[-1] == 0x1F00
+
+
+def test_interrupt_registers(mmu: MMU) -> None:
+    """Test IE and IF are CPU registers."""
+    mmu.write(offset.IE, 0x1F)
+    mmu.write(offset.IF, 0xFF)
+    assert (mmu.cpu.interrupt_enable, mmu.cpu.interrupt_flag) == (0x1F, 0x1F)
+    assert (mmu.read(offset.IE), mmu.read(offset.IF)) == (0x1F, 0xFF)
+
+
+def test_io(mmu: MMU) -> None:
+    """Test I/O registers, unused bits read as 1."""
+    mmu.write(offset.TAC, 0x05)
+    mmu.write(offset.TMA, 0x10)
+    mmu.write(offset.TIMA, 0x20)
+    assert (mmu.read(offset.TAC), mmu.read(offset.TMA), mmu.read(offset.TIMA)) == (0xFD, 0x10, 0x20)
+    mmu.write(offset.DIV, 0x42)
+    assert mmu.read(offset.DIV) == 0
+    mmu.write(offset.LY, 0x42)
+    assert mmu.read(offset.LY) == 0
+    assert mmu.read(offset.LCDC) == 0x91
+    mmu.write(offset.NR50, 0x42)
+    mmu.write(offset.WAVE.start, 0x42)
+    assert (mmu.read(offset.NR50), mmu.read(offset.WAVE.start), mmu.read(offset.NR52)) == (0x42, 0x42, 0xF1)
+    assert mmu.read(0xFF4D) == 0xFF
+    assert mmu.cpu.interrupt_flag & TIMER == 0
+
+
+def test_serial(mmu: MMU) -> None:
+    """Test serial transfers."""
+    mmu.cpu.interrupt_flag = 0
+    mmu.write(offset.SB, ord("A"))
+    mmu.write(offset.SC, 0x81)
+    assert not mmu.serial
+    assert mmu.read(offset.SC) == 0xFF
+    # The byte is sent at 8192 Hz
+    mmu.scheduler.run(mmu.cpu.cycles + SERIAL_CYCLES - 1)
+    assert not mmu.serial
+    mmu.scheduler.run(mmu.cpu.cycles + SERIAL_CYCLES)
+    assert mmu.serial == b"A"
+    assert (mmu.read(offset.SB), mmu.read(offset.SC)) == (0xFF, 0x7F)
+    assert mmu.cpu.interrupt_flag == SERIAL
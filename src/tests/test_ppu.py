@@ -0,0 +1,325 @@
+"""This is part of PyGameBoy, a Game Boy emulator written in Python 3.
+Source: https://github.com/BoboTiG/PyGameBoy
+"""
+
+import numpy as np
+import pytest
+
+from gameboy import offset
+from gameboy.cpu import CPU, STAT, VBLANK
+from gameboy.ppu import CYCLES_PER_FRAME, PPU
+from gameboy.scheduler import Scheduler
+
+
+@pytest.fixture
+def ppu() -> PPU:
+    """A PPU with an empty VRAM, the LCD on, the identity palette, and no interrupt requested."""
+    cpu = CPU()
+    cpu.interrupt_flag = 0
+    ppu = PPU(cpu, Scheduler())
+    ppu.write(offset.BGP, 0xE4)
+    ppu.write(offset.OBP0, 0xE4)
+    ppu.write(offset.OBP1, 0x1B)
+    return ppu
+
+
+def solid(ppu: PPU, tile: int, color: int) -> None:
+    """Fill the *tile* (at 8000h) with a single *color*."""
+    for row in range(8):
+        ppu.write_vram(0x8000 + tile * 16 + row * 2, 0xFF if color & 1 else 0x00)
+        ppu.write_vram(0x8000 + tile * 16 + row * 2 + 1, 0xFF if color & 2 else 0x00)
+
+
+def sprite(ppu: PPU, index: int, y: int, x: int, tile: int, attributes: int = 0) -> None:  # noqa: PLR0913
+    """Set the sprite *index*, at screen coordinates."""
+    for idx, value in enumerate((y + 16, x + 8, tile, attributes)):
+        ppu.write_oam(0xFE00 + index * 4 + idx, value)
+
+
+def frame(ppu: PPU) -> np.ndarray:
+    """Run until the next VBlank, and return the frame."""
+    ppu.cpu.cycles = ppu.scheduler.deadline
+    ppu.scheduler.run(ppu.cpu.cycles)
+    return ppu.frame
+
+
+def test_registers(ppu: PPU) -> None:
+    """Test registers are readable, and writable (but LY)."""
+    for address, value in zip(
+        (offset.SCY, offset.SCX, offset.LYC, offset.BGP, offset.OBP0, offset.OBP1, offset.WY, offset.WX),
+        range(1, 9),
+        strict=True,
+    ):
+        ppu.write(address, value)
+        assert ppu.read(address) == value
+    assert ppu.read(offset.LCDC) == 0x91
+    ppu.write(offset.STAT, 0xFF)
+    assert ppu.read(offset.STAT) & 0xF8 == 0xF8
+
+
+def test_modes(ppu: PPU) -> None:
+    """Test LY, and the mode of the LCD, follow the clock."""
+    cpu = ppu.cpu
+    assert (ppu.read(offset.LY), ppu.read(offset.STAT) & 0x07) == (0, 0b110)
+    cpu.cycles += 80
+    assert ppu.read(offset.STAT) & 0x03 == 3
+    cpu.cycles += 172
+    assert ppu.read(offset.STAT) & 0x03 == 0
+    cpu.cycles += 204 + 456 * 143
+    assert (ppu.read(offset.LY), ppu.read(offset.STAT) & 0x03) == (144, 1)
+    cpu.cycles += 456 * 10
+    assert ppu.read(offset.LY) == 0
+
+
+def test_lcd_off(ppu: PPU) -> None:
+    """Test turning the LCD off stops the PPU, turning it on starts a new frame."""
+    cpu = ppu.cpu
+    cpu.cycles += 1000
+    ppu.write(offset.LCDC, 0x11)
+    assert (ppu.read(offset.LY), ppu.read(offset.STAT) & 0x03) == (0, 0)
+    assert ppu.vblank not in ppu.scheduler
+    ppu.write(offset.LCDC, 0x11)
+    ppu.write(offset.STAT, 0x08)
+    assert ppu.stat_event not in ppu.scheduler
+
+    ppu.write(offset.LCDC, 0x91)
+    assert ppu.scheduler.pending[ppu.vblank] == cpu.cycles + 144 * 456
+
+
+def test_vblank(ppu: PPU) -> None:
+    """Test the VBlank interrupt is requested once per frame."""
+    frame(ppu)
+    assert (ppu.frames, ppu.cpu.interrupt_flag) == (1, VBLANK)
+    assert ppu.scheduler.deadline == ppu.cpu.cycles + CYCLES_PER_FRAME
+
+
+def test_stat_interrupts(ppu: PPU) -> None:
+    """Test STAT interrupts are requested on rising edges of enabled sources."""
+    cpu = ppu.cpu
+    scheduler = ppu.scheduler
+    ppu.write(offset.STAT, 0x08)  # HBlank
+    assert scheduler.deadline == cpu.cycles + 80
+    cpu.cycles = scheduler.deadline
+    scheduler.run(cpu.cycles)
+    cpu.cycles = scheduler.deadline
+    scheduler.run(cpu.cycles)
+    assert cpu.interrupt_flag == STAT
+
+    # LY=LYC, on the next line
+    cpu.interrupt_flag = 0
+    ppu.write(offset.LYC, 1)
+    ppu.write(offset.STAT, 0x40)
+    assert not cpu.interrupt_flag
+    cpu.cycles = scheduler.deadline
+    scheduler.run(cpu.cycles)
+    assert ppu.read(offset.LY) == 1
+    assert cpu.interrupt_flag == STAT
+    assert ppu.read(offset.STAT) & 0x04
+
+    # Mode 2 and VBlank, until sources are disabled
+    ppu.write(offset.STAT, 0x30)
+    for _ in range(154 * 3):
+        cpu.cycles = scheduler.deadline
+        scheduler.run(cpu.cycles)
+    ppu.write(offset.STAT, 0x00)
+    assert ppu.stat_event not in scheduler
+
+
+def test_background(ppu: PPU) -> None:
+    """Test the background, scrolled."""
+    solid(ppu, 1, 3)
+    ppu.write_vram(0x9800, 1)  # Top-left tile
+    screen = frame(ppu)
+    assert (screen[:8, :8] == 3).all()
+    assert screen[8:, :].sum() == 0
+    assert screen[:, 8:].sum() == 0
+
+    ppu.write(offset.SCX, 4)
+    ppu.write(offset.SCY, 252)
+    screen = frame(ppu)
+    assert (screen[4:12, :4] == 3).all()
+    assert screen[:4].sum() == screen[12:].sum() == 0
+    assert (screen[4:12, 252 - 4 :] == 3).sum() == 0
+
+
+def test_tile_data(ppu: PPU) -> None:
+    """Test tiles of the signed addressing mode, and pixels of a tile row."""
+    ppu.write_vram(0x8800, 0b1010_0000)  # Tile -128, first row
+    ppu.write_vram(0x8801, 0b1100_0000)
+    ppu.write_vram(0x9800, 0x80)
+    ppu.write(offset.LCDC, 0x81)
+    assert list(frame(ppu)[0, :4]) == [3, 2, 1, 0]
+
+
+def test_tile_cache(ppu: PPU) -> None:
+    """Test tiles are decoded again only when their data changes."""
+    ppu.write_vram(0x8010, 0b1010_0000)
+    ppu.write_vram(0x8011, 0b1100_0000)
+    ppu.write_vram(0x9800, 1)  # The tile map is not tile data
+    assert ppu.dirty == {1}
+    frame(ppu)
+    assert not ppu.dirty
+    assert list(ppu.decoded[1, 0, :4]) == [3, 2, 1, 0]
+    assert not ppu.decoded[[0, *range(2, 384)]].any()
+
+    ppu.write_vram(0x8011, 0b1100_0000)
+    assert not ppu.dirty
+    ppu.write_vram(0x97FF, 0xFF)
+    assert ppu.dirty == {383}
+
+
+def test_palette(ppu: PPU) -> None:
+    """Test background colors are mapped to shades."""
+    solid(ppu, 0, 1)
+    ppu.write(offset.BGP, 0b11_10_00_01)
+    assert (frame(ppu) == 0).all()
+    ppu.write(offset.BGP, 0b00_00_11_00)
+    assert (frame(ppu) == 3).all()
+
+
+def test_background_disabled(ppu: PPU) -> None:
+    """Test the background is white when disabled."""
+    solid(ppu, 0, 3)
+    ppu.write(offset.LCDC, 0x90)
+    assert (frame(ppu) == 0).all()
+
+    # Color 0 is not mapped through the palette
+    ppu.write(offset.BGP, 0x1B)
+    assert (frame(ppu) == 0).all()
+
+
+def test_window(ppu: PPU) -> None:
+    """Test the window, drawn over the background with its own line counter."""
+    solid(ppu, 1, 2)
+    for tile in range(0x400):
+        ppu.write_vram(0x9C00 + tile, 1)
+    ppu.write(offset.WY, 100)
+    ppu.write(offset.WX, 7 + 150)
+    ppu.write(offset.LCDC, 0xF1)
+    ppu.cpu.cycles += 50 * 456
+    ppu.write(offset.SCX, 0)
+    screen = frame(ppu)
+    assert (screen[100:, 150:] == 2).all()
+    assert screen[:100].sum() == screen[:, :150].sum() == 0
+    assert ppu.window_line == 44
+
+    # Hidden, off screen
+    ppu.write(offset.WX, 200)
+    assert frame(ppu).sum() == 0
+
+
+def test_window_counter(ppu: PPU) -> None:
+    """Test the window line counter only moves on lines where the window is drawn."""
+    ppu.write_vram(0x8010 + 2 * 2, 0xFF)  # Tile 1, third row only
+    ppu.write_vram(0x9C00, 1)
+    ppu.write_vram(0x9C20, 1)
+    ppu.write(offset.WX, 7)
+    ppu.write(offset.LCDC, 0xF1)
+    ppu.cpu.cycles += 10 * 456
+    ppu.write(offset.WX, 200)
+    ppu.cpu.cycles += 10 * 456
+    ppu.write(offset.WX, 7)
+    screen = frame(ppu)
+    assert screen[:, 0].nonzero()[0].tolist() == [2, 20]
+
+
+def test_sprites(ppu: PPU) -> None:
+    """Test sprites: flips, palettes, transparency, and screen edges."""
+    ppu.write_vram(0x8010, 0b1000_0000)  # Tile 1, top-left pixel only
+    ppu.write_vram(0x8011, 0b1000_0000)
+    ppu.write(offset.LCDC, 0x93)
+    sprite(ppu, 0, 10, 10, 1)
+    sprite(ppu, 1, 20, 20, 1, 0x60)  # Flipped both ways
+    sprite(ppu, 2, 30, 30, 1, 0x10)  # OBP1
+    sprite(ppu, 3, 40, -4, 1, 0x20)  # Half out of the screen
+    screen = frame(ppu)
+    assert screen[10, 10] == screen[27, 27] == 3
+    assert screen[30, 30] == 0
+    assert screen[40, 3] == 3
+    assert screen.sum() == 9
+
+
+def test_sprites_index(ppu: PPU) -> None:
+    """Test sprites of every line are selected again only when the OAM, or their size, changes."""
+    ppu.write(offset.LCDC, 0x93)
+    sprite(ppu, 0, 10, 10, 1)
+    frame(ppu)
+    assert ppu.selection is not None
+    selection, order = ppu.selection
+    assert selection[:, 0].nonzero()[0].tolist() == list(range(10, 18))
+    assert order[0] == 0  # The rightmost one, drawn first
+
+    sprite(ppu, 0, 10, 10, 1)
+    frame(ppu)
+    assert ppu.selection[0] is selection
+
+    ppu.write(offset.LCDC, 0x97)
+    assert ppu.selection is None
+    frame(ppu)
+    assert ppu.selection[0][:, 0].sum() == 16
+
+    ppu.write_oam(0xFE00, 0)
+    assert ppu.selection is None
+
+
+def test_sprites_priority(ppu: PPU) -> None:
+    """Test the leftmost sprite wins, then the first one in OAM, and the background priority."""
+    solid(ppu, 1, 1)
+    solid(ppu, 2, 2)
+    ppu.write(offset.LCDC, 0x93)
+    sprite(ppu, 0, 0, 4, 2)
+    sprite(ppu, 1, 0, 2, 1)
+    sprite(ppu, 2, 0, 2, 2)
+    screen = frame(ppu)
+    assert list(screen[0, :12]) == [0, 0, 1, 1, 1, 1, 1, 1, 1, 1, 2, 2]
+
+    # Behind the background colors 1-3: the winning sprite is hidden, but not by color 0
+    solid(ppu, 0, 1)
+    ppu.write_vram(0x9800, 3)
+    sprite(ppu, 1, 0, 2, 1, 0x80)
+    screen = frame(ppu)
+    assert list(screen[0, :12]) == [0, 0, 1, 1, 1, 1, 1, 1, 1, 1, 2, 2]
+    assert screen[0, 12] == 1
+
+
+def test_sprites_per_line(ppu: PPU) -> None:
+    """Test ten sprites per line at most, in OAM order, and tall sprites."""
+    solid(ppu, 2, 3)
+    solid(ppu, 3, 3)
+    ppu.write(offset.LCDC, 0x97)
+    for index in range(12):
+        sprite(ppu, index, 0, index * 8, 3)
+    screen = frame(ppu)
+    assert (screen[:16, :80] == 3).all()
+    assert screen[:, 80:].sum() == 0
+    assert screen[16:].sum() == 0
+
+
+def test_mid_frame(ppu: PPU) -> None:
+    """Test lines drawn before a change are rendered with former values."""
+    solid(ppu, 1, 3)
+    for tile in range(0x400):
+        ppu.write_vram(0x9800 + tile, 1)
+    ppu.write(offset.LCDC, 0x93)  # No sprite in sight
+    ppu.cpu.cycles += 100 * 456 + 300  # HBlank of line 100
+    ppu.write(offset.BGP, 0x00)
+    screen = frame(ppu)
+    assert (screen[:101] == 3).all()
+    assert (screen[101:] == 0).all()
+
+
+def test_sampling(ppu: PPU) -> None:
+    """Test only sampled frames are rendered, others keep the last rendered one."""
+    ppu.sampling = 2
+    solid(ppu, 1, 3)
+    ppu.write_vram(0x9800, 1)
+    assert frame(ppu)[0, 0] == 3
+
+    ppu.write(offset.BGP, 0x00)
+    assert frame(ppu)[0, 0] == 3
+    assert frame(ppu)[0, 0] == 0
+    assert ppu.frames == 3
+
+    ppu.sampling = 0
+    ppu.write(offset.BGP, 0xE4)
+    assert frame(ppu)[0, 0] == 0
@@ -0,0 +1,112 @@
+"""This is part of PyGameBoy, a Game Boy emulator written in Python 3.
+Source: https://github.com/BoboTiG/PyGameBoy
+"""
+
+from pathlib import Path
+
+import pytest
+
+from gameboy.cartridge import Cartridge
+from gameboy.emulator import Emulator
+from gameboy.exceptions import InvalidStateError
+from gameboy.savestate import Rewind, SaveState
+
+
+def fingerprint(emulator: Emulator) -> tuple[object, ...]:
+    """Some of the machine state."""
+    cpu = emulator.cpu
+    return cpu.cycles, cpu.pc, cpu.a, bytes(emulator.mmu.wram), bytes(emulator.ppu.vram), emulator.ppu.frame.tobytes()
+
+
+def test_save_load(mario: Path) -> None:
+    """Test the emulation goes on the same way from a loaded state."""
+    emulator = Emulator(Cartridge(mario))
+    emulator.run_frames(60)
+    state = SaveState(emulator)
+    saved = state.save()
+    assert len(saved) == state.size
+
+    emulator.run_frames(60)
+    expected = fingerprint(emulator)
+    state.load(saved)
+    assert emulator.cpu.cycles == 60 * 70224
+    emulator.run_frames(60)
+    assert fingerprint(emulator) == expected
+
+
+def test_blocks(roms: Path) -> None:
+    """Test compiled blocks of the work RAM are dropped, as it is replaced."""
+    emulator = Emulator(Cartridge(roms / "cpu" / "06-ld r,r.gb"), blocks=True)
+    emulator.run_frames(5)
+    state = SaveState(emulator)
+    saved = state.save()
+    emulator.run_frames(5)
+    assert emulator.blocks is not None
+    assert emulator.blocks.chunks
+
+    state.load(saved)
+    assert not emulator.blocks.chunks
+    assert not emulator.blocks.wram
+    emulator.run_frames(40)
+    assert emulator.serial.endswith(b"Passed\n")
+
+
+def test_invalid(roms: Path, mario: Path) -> None:
+    """Test states of another machine are refused."""
+    state = SaveState(Emulator(Cartridge(mario)))
+    saved = state.save()
+    with pytest.raises(InvalidStateError):
+        state.load(saved[:-1])
+    with pytest.raises(InvalidStateError):
+        state.load(b"PGB0" + saved[4:])
+
+    other = SaveState(Emulator(Cartridge(roms / "cpu" / "cpu_instrs.gb")))
+    with pytest.raises(InvalidStateError, match="does not match"):
+        other.load(other.save()[:4] + bytes(other.size - 4))
+
+
+@pytest.mark.parametrize("patch", [b"MARIO", b""])
+def test_invalid_revision(mario: Path, patch: bytes) -> None:
+    """Test states of another revision of the game are refused, despite the same checksums."""
+    saved = SaveState(Emulator(Cartridge(mario))).save()
+    data = mario.read_bytes()
+    # Another title, or a bigger ROM
+    data = data[:0x134] + patch + data[0x134 + len(patch) :] if patch else data + bytes(0x4000)
+    state = SaveState(Emulator(Cartridge(data)))
+    with pytest.raises(InvalidStateError):
+        state.load(saved)
+
+
+@pytest.mark.parametrize("capacity", [0, -1])
+def test_rewind_capacity(mario: Path, capacity: int) -> None:
+    """Test the rewind ring holds one state at least."""
+    with pytest.raises(ValueError, match="capacity"):
+        Rewind(SaveState(Emulator(Cartridge(mario))), capacity=capacity)
+
+
+def test_rewind(mario: Path) -> None:
+    """Test the rewind ring, its capacity, and keyframes."""
+    emulator = Emulator(Cartridge(mario))
+    rewind = Rewind(SaveState(emulator), capacity=5, interval=2)
+    history = []
+    for _ in range(7):
+        emulator.run_frames(1)
+        history.append(fingerprint(emulator))
+        rewind.push()
+    assert len(rewind) == 5
+    assert sorted(rewind.keyframes) == [1, 2, 3]
+    assert 0 < rewind.nbytes < 5 * rewind.state.size
+
+    assert rewind.rewind(2)
+    assert fingerprint(emulator) == history[5]
+    assert len(rewind) == 3
+    assert not rewind.rewind(4)
+
+    # A new keyframe is taken after a rewind
+    emulator.run_frames(1)
+    rewind.push()
+    assert sorted(rewind.keyframes) == [1, 2, 4]
+
+    assert rewind.rewind(4)
+    assert fingerprint(emulator) == history[2]
+    assert not rewind.keyframes
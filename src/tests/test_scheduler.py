@@ -0,0 +1,43 @@
+"""This is part of PyGameBoy, a Game Boy emulator written in Python 3.
+Source: https://github.com/BoboTiG/PyGameBoy
+"""
+
+from gameboy.scheduler import NEVER, Scheduler
+
+
+def test_schedule() -> None:
+    """Test events are called in order, once due."""
+    scheduler = Scheduler()
+    assert scheduler.deadline == NEVER
+    events: list[tuple[str, int]] = []
+    scheduler.schedule(20, lambda cycle: events.append(("b", cycle)))
+    scheduler.schedule(10, lambda cycle: events.append(("a", cycle)))
+    scheduler.schedule(20, lambda cycle: events.append(("c", cycle)))
+    assert scheduler.deadline == 10
+
+    scheduler.run(9)
+    assert not events
+    scheduler.run(25)
+    assert events == [("a", 10), ("b", 20), ("c", 20)]
+    assert scheduler.deadline == NEVER
+
+
+def test_move_and_cancel() -> None:
+    """Test scheduling an event again moves it, and cancelled events are skipped."""
+    scheduler = Scheduler()
+    events: list[int] = []
+    scheduler.schedule(10, events.append)
+    scheduler.schedule(30, events.append)
+    assert events.append in scheduler
+    scheduler.run(20)
+    assert not events
+    assert scheduler.deadline == 30
+    scheduler.run(30)
+    assert events == [30]
+    assert events.append not in scheduler
+
+    scheduler.schedule(40, events.append)
+    scheduler.cancel(events.append)
+    scheduler.cancel(events.append)
+    scheduler.run(50)
+    assert events == [30]
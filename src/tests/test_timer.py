@@ -0,0 +1,75 @@
+"""This is part of PyGameBoy, a Game Boy emulator written in Python 3.
+Source: https://github.com/BoboTiG/PyGameBoy
+"""
+
+import pytest
+
+from gameboy import offset
+from gameboy.cpu import CPU, TIMER
+from gameboy.scheduler import Scheduler
+from gameboy.timer import Timer
+
+
+@pytest.fixture
+def timer() -> Timer:
+    """A timer, with its counter at 0, and no interrupt requested."""
+    cpu = CPU()
+    cpu.interrupt_flag = 0
+    timer = Timer(cpu, Scheduler())
+    timer.write(offset.DIV, 0)
+    return timer
+
+
+def test_div(timer: Timer) -> None:
+    """Test DIV is incremented every 256 cycles."""
+    timer.cpu.cycles += 255
+    assert timer.read(offset.DIV) == 0
+    timer.cpu.cycles += 1
+    assert timer.read(offset.DIV) == 1
+
+
+def test_registers(timer: Timer) -> None:
+    """Test registers, unused bits of TAC read as 1."""
+    timer.write(offset.TMA, 0x42)
+    timer.write(offset.TIMA, 0x24)
+    timer.write(offset.TAC, 0xFA)
+    assert (timer.read(offset.TMA), timer.read(offset.TIMA), timer.read(offset.TAC)) == (0x42, 0x24, 0xFA)
+
+
+def test_tima_overflow(timer: Timer) -> None:
+    """Test TIMA is reloaded with TMA on overflow, and an interrupt is requested."""
+    cpu = timer.cpu
+    timer.write(offset.TMA, 0xF0)
+    timer.write(offset.TIMA, 0xFE)
+    timer.write(offset.TAC, 0x05)  # Enabled, every 16 cycles
+    cpu.cycles += 16
+    assert timer.read(offset.TIMA) == 0xFF
+    cpu.cycles += 16 * 18
+    assert (timer.read(offset.TIMA), cpu.interrupt_flag) == (0xF1, TIMER)
+
+
+def test_overflow_event(timer: Timer) -> None:
+    """Test the overflow is scheduled, without TIMA being read."""
+    cpu = timer.cpu
+    scheduler = timer.scheduler
+    timer.write(offset.TIMA, 0xFE)
+    timer.write(offset.TAC, 0x05)
+    assert scheduler.deadline == cpu.cycles + 16 * 2
+    cpu.cycles = scheduler.deadline
+    scheduler.run(cpu.cycles)
+    assert (timer.tima, cpu.interrupt_flag) == (0, TIMER)
+    assert scheduler.deadline == cpu.cycles + 16 * 0x100
+
+    # Stopped timers do not overflow
+    timer.write(offset.TAC, 0x01)
+    assert timer.overflow not in scheduler
+
+
+def test_div_reset(timer: Timer) -> None:
+    """Test resetting DIV increments TIMA, when the selected bit falls."""
+    timer.write(offset.TAC, 0x05)
+    timer.cpu.cycles += 0b1000
+    timer.write(offset.DIV, 0)
+    assert (timer.counter, timer.read(offset.TIMA)) == (0, 1)
+    timer.write(offset.DIV, 0)
+    assert timer.tima == 1